@@ -1,5 +1,51 @@
 import copy
-from typing import List, Union
+import ctypes
+import ctypes.util
+import hashlib
+import hmac
+import mmap
+import os
+import random
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+# 分组加解密实现：pure 为逐步骤的教学实现，ttable 为查表实现，numpy 为多分组批量向量化实现，
+# openssl 通过 ctypes 调用系统 libcrypto 的 EVP 接口（不可用时回退到 numpy）。各实现输出逐位相同
+BACKENDS = ('pure', 'ttable', 'numpy', 'openssl')
+DEFAULT_BACKEND = 'ttable'
+FALLBACK_BACKEND = 'numpy'    # openssl 不可用时使用的实现
+NUMPY_BATCH_BLOCKS = 1 << 16  # numpy 实现每批处理的分组数（限制中间数组的内存占用）
+OPENSSL_CHUNK = 1 << 24       # 单次 EVP_*Update 处理的最大字节数（长度参数为 int）
+VERIFY_SAMPLES = 4            # 校验模式下每次调用用 pure 实现抽查的分组数
+
+# 工作模式：ECB + PKCS#7 填充 / CTR（计数器模式，无需填充，加解密为同一运算）/ GCM（CTR 加密 + GHASH 认证标签）
+MODES = ('ecb', 'ctr', 'gcm')
+NONCE_SIZES = {'ctr': 8, 'gcm': 12}  # 调用方未提供 nonce 时随机生成的长度（字节）
+CTR_PARALLEL_THRESHOLD = 1 << 20  # CTR 数据达到该大小（字节）且 workers > 1 时才启用进程池
+CTR_POOL_BACKENDS = ('pure', 'ttable')  # 未指定 workers 时才默认启用进程池的实现（numpy/openssl 串行更快）
+CTR_SEGMENT = 1 << 16             # CTR 每次生成并异或的密钥流长度（字节）
+_COUNTER_MASK = (1 << 128) - 1
+GCM_TAG_SIZE = 16                 # GCM 认证标签长度，附加在密文末尾
+GCM_MAX_BLOCKS = (1 << 32) - 2    # GCM 单条消息的最大分组数（SP 800-38D）
+_LOW32 = 0xFFFFFFFF               # GCM 计数器只在低 32 位递增
+_GHASH_R = 0xE1 << 120            # GF(2^128) 约简多项式 x^128 + x^7 + x^2 + x + 1（GCM 位序）
+
+KEY_CACHE_SIZE = 64  # 缓存的密钥扩展结果数量（LRU）
+BATCH_MAX_ITEMS = 10000  # 单次批量加解密的最大消息数
+FILE_CHUNK = 1 << 22     # 文件加解密每次经流式接口处理的字节数
+
+_BLOCK = struct.Struct('>4I')  # 16 字节分组 <-> 四个大端 32 位列字
+
+
+class InvalidTag(ValueError):
+    """GCM 认证失败：密文、附加数据、nonce 或密钥与加密时不一致"""
+
 
 class AES128:
     # ---------- AES 常量：S-box / 逆 S-box / Rcon ----------
@@ -176,6 +222,135 @@ class AES128:
         AES128.AddRoundKey(state, round_keys[0])
         return AES128.state2bytes(state)
 
+    # ---------- T 表实现：SubBytes + ShiftRows + MixColumns 合并为按列字查表 ----------
+    # Te0[x] = (02·S[x], S[x], S[x], 03·S[x])，Te1..Te3 为其依次循环右移 8 位；Td 同理对应逆变换。
+    # 表在类定义之后由 _build_ttables 生成。
+    Te0 = Te1 = Te2 = Te3 = Td0 = Td1 = Td2 = Td3 = None
+
+    @staticmethod
+    def ttable_key_schedule(round_keys: List[List[int]]) -> Tuple[List[int], List[int]]:
+        """
+        把轮密钥转换为 T 表实现使用的 32 位字
+
+        Returns:
+            (加密轮密钥字, 解密轮密钥字)。解密使用等价逆密码：轮次逆序排列，
+            第 1~9 轮的轮密钥预先做 InvMixColumns
+        """
+        ek = []
+        for rk in round_keys:
+            ek.extend(_BLOCK.unpack(bytes(rk)))
+        S, Td0, Td1, Td2, Td3 = AES128.Sbox, AES128.Td0, AES128.Td1, AES128.Td2, AES128.Td3
+        dk = []
+        Nr = 10
+        for rnd in range(Nr, -1, -1):
+            words = ek[rnd*4:rnd*4 + 4]
+            if 0 < rnd < Nr:
+                # Td[S[b]] 恰好消去 InvSbox，只剩 InvMixColumns
+                words = [Td0[S[w >> 24]] ^ Td1[S[(w >> 16) & 0xFF]] ^ Td2[S[(w >> 8) & 0xFF]] ^ Td3[S[w & 0xFF]]
+                         for w in words]
+            dk.extend(words)
+        return ek, dk
+
+    @staticmethod
+    def encrypt_block_ttable(block: bytes, ek: List[int]) -> bytes:
+        Te0, Te1, Te2, Te3, S = AES128.Te0, AES128.Te1, AES128.Te2, AES128.Te3, AES128.Sbox
+        s0, s1, s2, s3 = _BLOCK.unpack(block)
+        s0 ^= ek[0]
+        s1 ^= ek[1]
+        s2 ^= ek[2]
+        s3 ^= ek[3]
+        for k in range(4, 40, 4):
+            t0 = Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xFF] ^ Te2[(s2 >> 8) & 0xFF] ^ Te3[s3 & 0xFF] ^ ek[k]
+            t1 = Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xFF] ^ Te2[(s3 >> 8) & 0xFF] ^ Te3[s0 & 0xFF] ^ ek[k+1]
+            t2 = Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xFF] ^ Te2[(s0 >> 8) & 0xFF] ^ Te3[s1 & 0xFF] ^ ek[k+2]
+            t3 = Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xFF] ^ Te2[(s1 >> 8) & 0xFF] ^ Te3[s2 & 0xFF] ^ ek[k+3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+        # 最后一轮没有 MixColumns：直接查 S 盒
+        return _BLOCK.pack(
+            (S[s0 >> 24] << 24 | S[(s1 >> 16) & 0xFF] << 16 | S[(s2 >> 8) & 0xFF] << 8 | S[s3 & 0xFF]) ^ ek[40],
+            (S[s1 >> 24] << 24 | S[(s2 >> 16) & 0xFF] << 16 | S[(s3 >> 8) & 0xFF] << 8 | S[s0 & 0xFF]) ^ ek[41],
+            (S[s2 >> 24] << 24 | S[(s3 >> 16) & 0xFF] << 16 | S[(s0 >> 8) & 0xFF] << 8 | S[s1 & 0xFF]) ^ ek[42],
+            (S[s3 >> 24] << 24 | S[(s0 >> 16) & 0xFF] << 16 | S[(s1 >> 8) & 0xFF] << 8 | S[s2 & 0xFF]) ^ ek[43],
+        )
+
+    @staticmethod
+    def decrypt_block_ttable(block: bytes, dk: List[int]) -> bytes:
+        Td0, Td1, Td2, Td3, Si = AES128.Td0, AES128.Td1, AES128.Td2, AES128.Td3, AES128.InvSbox
+        s0, s1, s2, s3 = _BLOCK.unpack(block)
+        s0 ^= dk[0]
+        s1 ^= dk[1]
+        s2 ^= dk[2]
+        s3 ^= dk[3]
+        for k in range(4, 40, 4):
+            t0 = Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xFF] ^ Td2[(s2 >> 8) & 0xFF] ^ Td3[s1 & 0xFF] ^ dk[k]
+            t1 = Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xFF] ^ Td2[(s3 >> 8) & 0xFF] ^ Td3[s2 & 0xFF] ^ dk[k+1]
+            t2 = Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xFF] ^ Td2[(s0 >> 8) & 0xFF] ^ Td3[s3 & 0xFF] ^ dk[k+2]
+            t3 = Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xFF] ^ Td2[(s1 >> 8) & 0xFF] ^ Td3[s0 & 0xFF] ^ dk[k+3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+        return _BLOCK.pack(
+            (Si[s0 >> 24] << 24 | Si[(s3 >> 16) & 0xFF] << 16 | Si[(s2 >> 8) & 0xFF] << 8 | Si[s1 & 0xFF]) ^ dk[40],
+            (Si[s1 >> 24] << 24 | Si[(s0 >> 16) & 0xFF] << 16 | Si[(s3 >> 8) & 0xFF] << 8 | Si[s2 & 0xFF]) ^ dk[41],
+            (Si[s2 >> 24] << 24 | Si[(s1 >> 16) & 0xFF] << 16 | Si[(s0 >> 8) & 0xFF] << 8 | Si[s3 & 0xFF]) ^ dk[42],
+            (Si[s3 >> 24] << 24 | Si[(s2 >> 16) & 0xFF] << 16 | Si[(s1 >> 8) & 0xFF] << 8 | Si[s0 & 0xFF]) ^ dk[43],
+        )
+
+    # ---------- NumPy 批量实现：N 个分组堆叠为 (N, 16) 的 uint8 数组同时处理 ----------
+    # 分组内字节下标 i = 4*列 + 行；SubBytes 为 S 盒花式索引，ShiftRows 为固定的列置换，
+    # MixColumns 查 xtime 表，AddRoundKey 为广播异或。表在 _build_ttables 中生成。
+    SboxArray = InvSboxArray = XtimeArray = ShiftRowsPerm = InvShiftRowsPerm = None
+
+    @staticmethod
+    def _mix_columns_numpy(state: np.ndarray) -> np.ndarray:
+        xt = AES128.XtimeArray
+        a = state.reshape(-1, 4, 4)
+        a0, a1, a2, a3 = a[:, :, 0], a[:, :, 1], a[:, :, 2], a[:, :, 3]
+        t = a0 ^ a1 ^ a2 ^ a3
+        out = np.empty_like(a)
+        # b_r = a_r ^ t ^ xtime(a_r ^ a_{r+1})，与 02·a_r ^ 03·a_{r+1} ^ a_{r+2} ^ a_{r+3} 等价
+        out[:, :, 0] = a0 ^ t ^ xt[a0 ^ a1]
+        out[:, :, 1] = a1 ^ t ^ xt[a1 ^ a2]
+        out[:, :, 2] = a2 ^ t ^ xt[a2 ^ a3]
+        out[:, :, 3] = a3 ^ t ^ xt[a3 ^ a0]
+        return out.reshape(-1, 16)
+
+    @staticmethod
+    def _inv_mix_columns_numpy(state: np.ndarray) -> np.ndarray:
+        xt = AES128.XtimeArray
+        a = state.reshape(-1, 4, 4).copy()
+        # InvMixColumns = MixColumns ∘ 预处理（a0,a2 ^= 04·(a0^a2)；a1,a3 ^= 04·(a1^a3)）
+        u = xt[xt[a[:, :, 0] ^ a[:, :, 2]]]
+        v = xt[xt[a[:, :, 1] ^ a[:, :, 3]]]
+        a[:, :, 0] ^= u
+        a[:, :, 2] ^= u
+        a[:, :, 1] ^= v
+        a[:, :, 3] ^= v
+        return AES128._mix_columns_numpy(a)
+
+    @staticmethod
+    def encrypt_blocks_numpy(blocks: np.ndarray, round_keys: np.ndarray) -> np.ndarray:
+        """blocks: (N, 16) uint8；round_keys: (11, 16) uint8"""
+        S, perm = AES128.SboxArray, AES128.ShiftRowsPerm
+        state = blocks ^ round_keys[0]
+        for rnd in range(1, 10):
+            state = S[state[:, perm]]  # ShiftRows 与 SubBytes 可交换，合并为一次置换 + 一次查表
+            state = AES128._mix_columns_numpy(state)
+            state ^= round_keys[rnd]
+        state = S[state[:, perm]]
+        state ^= round_keys[10]
+        return state
+
+    @staticmethod
+    def decrypt_blocks_numpy(blocks: np.ndarray, round_keys: np.ndarray) -> np.ndarray:
+        Si, perm = AES128.InvSboxArray, AES128.InvShiftRowsPerm
+        state = blocks ^ round_keys[10]
+        state = Si[state[:, perm]]
+        for rnd in range(9, 0, -1):
+            state ^= round_keys[rnd]
+            state = AES128._inv_mix_columns_numpy(state)
+            state = Si[state[:, perm]]
+        state ^= round_keys[0]
+        return state
+
     @staticmethod
     def pkcs7_pad(data: bytes) -> bytes:
         pad_len = 16 - (len(data) % 16)
@@ -192,31 +367,829 @@ class AES128:
             raise ValueError("填充校验失败")
         return data[:-pad_len]
 
-    def __init__(self, key: bytes):
+    def __init__(self, key: bytes, backend: str = None, verify: bool = False):
+        """
+        Args:
+            key: 16 字节密钥
+            backend: 分组加解密实现（见 BACKENDS，默认 DEFAULT_BACKEND）；openssl 不可用时回退到
+                FALLBACK_BACKEND，实际使用的实现记录在 self.backend
+            verify: 校验模式，每次加解密后用 pure 实现抽查 VERIFY_SAMPLES 个分组，不一致时抛出 RuntimeError
+        """
         assert isinstance(key, (bytes, bytearray)) and len(key) == 16, "key 必须为 16 字节"
+        backend = backend or DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的 AES 实现: {backend}，可选 {list(BACKENDS)}")
+        self.requested_backend = backend
+        if backend == 'openssl' and not openssl_available():
+            backend = FALLBACK_BACKEND
         self.key = bytes(key)
+        self.backend = backend
+        self.verify = verify
         self.round_keys = AES128.key_expansion(self.key)
+        if backend == 'ttable':
+            self._ek, self._dk = AES128.ttable_key_schedule(self.round_keys)
+        elif backend == 'numpy':
+            self._rk_array = np.array(self.round_keys, dtype=np.uint8)
+        self._ghash = None  # GHASH 查表，首次使用 GCM 时按 H 构建
+
+    def _encrypt_block(self, block: bytes) -> bytes:
+        if self.backend == 'ttable':
+            return AES128.encrypt_block_ttable(block, self._ek)
+        if self.backend == 'numpy':
+            return self._crypt_array(np.frombuffer(block, dtype=np.uint8).reshape(1, 16)).tobytes()
+        if self.backend == 'openssl':
+            out = bytearray(16)
+            self._openssl_crypt(memoryview(block).cast('B'), memoryview(out))
+            return bytes(out)
+        return AES128.encrypt_block(block, self.round_keys)
+
+    def _decrypt_block(self, block: bytes) -> bytes:
+        if self.backend == 'ttable':
+            return AES128.decrypt_block_ttable(block, self._dk)
+        if self.backend == 'numpy':
+            return self._crypt_array(np.frombuffer(block, dtype=np.uint8).reshape(1, 16), decrypt=True).tobytes()
+        if self.backend == 'openssl':
+            out = bytearray(16)
+            self._openssl_crypt(memoryview(block).cast('B'), memoryview(out), decrypt=True)
+            return bytes(out)
+        return AES128.decrypt_block(block, self.round_keys)
+
+    def _openssl_crypt(self, src: memoryview, out: memoryview, decrypt: bool = False,
+                       counter: Optional[int] = None) -> None:
+        """
+        通过 EVP 接口处理 src 并写入 out：counter 为 None 时为无填充 ECB，否则为以 counter 为初始计数器块的 CTR
+        （OpenSSL 的 CTR 同样按 128 位整数递增计数器）。每次调用使用独立的 EVP_CIPHER_CTX，线程安全
+        """
+        lib = _load_libcrypto()
+        ctx = lib.EVP_CIPHER_CTX_new()
+        if not ctx:
+            raise MemoryError("EVP_CIPHER_CTX_new 失败")
+        try:
+            if counter is None:
+                cipher, iv = lib.EVP_aes_128_ecb(), None
+            else:
+                cipher, iv = lib.EVP_aes_128_ctr(), (counter & _COUNTER_MASK).to_bytes(16, 'big')
+            init, update = ((lib.EVP_DecryptInit_ex, lib.EVP_DecryptUpdate) if decrypt
+                            else (lib.EVP_EncryptInit_ex, lib.EVP_EncryptUpdate))
+            if init(ctx, cipher, None, self.key, iv) != 1:
+                raise RuntimeError("OpenSSL 初始化失败")
+            lib.EVP_CIPHER_CTX_set_padding(ctx, 0)  # 填充由本类处理
+            written = ctypes.c_int()
+            for start in range(0, len(src), OPENSSL_CHUNK):
+                chunk = bytes(src[start:start + OPENSSL_CHUNK])
+                target = (ctypes.c_char * len(chunk)).from_buffer(out[start:start + len(chunk)])
+                ok = update(ctx, target, ctypes.byref(written), chunk, len(chunk))
+                del target  # 释放对 out 的缓冲区引用
+                if ok != 1 or written.value != len(chunk):
+                    raise RuntimeError("OpenSSL 加解密失败")
+        finally:
+            lib.EVP_CIPHER_CTX_free(ctx)
+
+    def _verify_blocks(self, src: memoryview, out: memoryview, decrypt: bool = False,
+                       counter: Optional[int] = None) -> None:
+        """校验模式：用 pure 实现抽查若干分组（ECB 反向运算比对输入，CTR 重新生成该分组的密钥流）"""
+        if not self.verify or self.backend == 'pure' or len(src) == 0:
+            return
+        num_blocks = (len(src) + 15) // 16
+        for i in random.sample(range(num_blocks), min(VERIFY_SAMPLES, num_blocks)):
+            block_in, block_out = bytes(src[i*16:i*16+16]), bytes(out[i*16:i*16+16])
+            if counter is not None:
+                keystream = AES128.encrypt_block(((counter + i) & _COUNTER_MASK).to_bytes(16, 'big'), self.round_keys)
+                ok = bytes(a ^ b for a, b in zip(block_in, keystream)) == block_out
+            elif decrypt:
+                ok = AES128.encrypt_block(block_out, self.round_keys) == block_in
+            else:
+                ok = AES128.decrypt_block(block_out, self.round_keys) == block_in
+            if not ok:
+                raise RuntimeError(f"AES 实现 {self.backend} 与参考实现不一致（分组 {i}）")
 
-    def encrypt(self, plaintext: Union[str, bytes]) -> bytes:
+    def _crypt_array(self, blocks: np.ndarray, decrypt: bool = False) -> np.ndarray:
+        """numpy 实现：(N, 16) uint8 分组批量加解密"""
+        if decrypt:
+            return AES128.decrypt_blocks_numpy(blocks, self._rk_array)
+        return AES128.encrypt_blocks_numpy(blocks, self._rk_array)
+
+    def crypt_blocks(self, src: memoryview, out: memoryview, decrypt: bool = False) -> None:
+        """逐块处理 src（长度为 16 的倍数）并写入等长的 out；输入按 memoryview 切片读取，不复制"""
+        if self.backend == 'numpy':
+            step = NUMPY_BATCH_BLOCKS * 16
+            for start in range(0, len(src), step):
+                blocks = np.frombuffer(src[start:start + step], dtype=np.uint8).reshape(-1, 16)
+                out[start:start + len(blocks) * 16] = self._crypt_array(blocks, decrypt).tobytes()
+        elif self.backend == 'openssl':
+            self._openssl_crypt(src, out, decrypt)
+        else:
+            crypt = self._decrypt_block if decrypt else self._encrypt_block
+            for i in range(0, len(src), 16):
+                out[i:i+16] = crypt(src[i:i+16])
+        self._verify_blocks(src, out, decrypt)
+
+    def encrypt(self, plaintext: Union[str, bytes], mode: str = 'ecb', nonce: Optional[bytes] = None,
+                workers: Optional[int] = None, aad: Optional[bytes] = None) -> bytes:
         if isinstance(plaintext, str):
             plaintext = plaintext.encode('utf-8')
-        padded = AES128.pkcs7_pad(plaintext)
-        out = b''
-        for i in range(0, len(padded), 16):
-            blk = padded[i:i+16]
-            out += AES128.encrypt_block(blk, self.round_keys)
-        return out
-
-    def decrypt(self, ciphertext: bytes) -> bytes:
-        if not isinstance(ciphertext, (bytes, bytearray)):
+        if mode == 'ctr':
+            return self.ctr_crypt(plaintext, nonce, workers)
+        if mode == 'gcm':
+            ciphertext, tag = self.gcm_encrypt(plaintext, nonce, aad, workers)
+            return ciphertext + tag
+        if mode != 'ecb':
+            raise ValueError(f"未知的工作模式: {mode}")
+        data = memoryview(plaintext).cast('B')
+        full = len(data) - len(data) % 16
+        out = bytearray(full + 16)  # 输出一次性分配：完整分组 + 填充分组
+        view = memoryview(out)
+        self.crypt_blocks(data[:full], view[:full])
+        view[full:] = self._encrypt_block(AES128.pkcs7_pad(bytes(data[full:])))
+        return bytes(out)
+
+    def decrypt(self, ciphertext: bytes, mode: str = 'ecb', nonce: Optional[bytes] = None,
+                workers: Optional[int] = None, aad: Optional[bytes] = None) -> bytes:
+        if not isinstance(ciphertext, (bytes, bytearray, memoryview)):
             raise ValueError("ciphertext 必须是 bytes")
+        if mode == 'ctr':
+            return self.ctr_crypt(ciphertext, nonce, workers)
+        if mode == 'gcm':
+            if len(ciphertext) < GCM_TAG_SIZE:
+                raise ValueError("GCM 密文长度不足（缺少认证标签）")
+            data = memoryview(ciphertext).cast('B')
+            return self.gcm_decrypt(data[:-GCM_TAG_SIZE], nonce, bytes(data[-GCM_TAG_SIZE:]), aad, workers)
+        if mode != 'ecb':
+            raise ValueError(f"未知的工作模式: {mode}")
         if len(ciphertext) % 16 != 0:
             raise ValueError("密文长度不为 16 的倍数")
-        out = b''
-        for i in range(0, len(ciphertext), 16):
-            blk = ciphertext[i:i+16]
-            out += AES128.decrypt_block(blk, self.round_keys)
-        return AES128.pkcs7_unpad(out)
+        out = bytearray(len(ciphertext))
+        self.crypt_blocks(memoryview(ciphertext).cast('B'), memoryview(out), decrypt=True)
+        return bytes(AES128.pkcs7_unpad(out))
+
+    # ---------- CTR 模式 ----------
+
+    @staticmethod
+    def initial_counter(nonce: bytes) -> int:
+        """nonce（8~16 字节）右侧补零得到 128 位初始计数器块；之后按 128 位整数逐块加一"""
+        if not isinstance(nonce, (bytes, bytearray)) or not 8 <= len(nonce) <= 16:
+            raise ValueError("CTR 模式需要 8~16 字节的 nonce")
+        return int.from_bytes(bytes(nonce).ljust(16, b'\x00'), 'big')
+
+    @staticmethod
+    def counter_blocks(counter: int, count: int) -> np.ndarray:
+        """从 counter 起连续 count 个计数器块，(count, 16) uint8（按 128 位整数递增、模 2^128 回绕）"""
+        mask64 = (1 << 64) - 1
+        hi, lo = (counter >> 64) & mask64, counter & mask64
+        low = np.uint64(lo) + np.arange(count, dtype=np.uint64)  # uint64 数组加法自然回绕
+        high = np.full(count, hi, dtype=np.uint64) + (low < np.uint64(lo)).astype(np.uint64)
+        words = np.empty((count, 2), dtype='>u8')
+        words[:, 0] = high
+        words[:, 1] = low
+        return words.view(np.uint8).reshape(count, 16)
+
+    def ctr_xor(self, src: memoryview, out: memoryview, counter: int) -> None:
+        """从计数器 counter 开始生成密钥流并与 src 异或写入 out（允许 src 与 out 为同一缓冲区）"""
+        if self.verify and src.obj is out.obj:
+            src = memoryview(bytes(src))  # 原地处理时保留输入副本用于抽查
+        if self.backend == 'numpy':
+            step = NUMPY_BATCH_BLOCKS * 16
+            for start in range(0, len(src), step):
+                segment = np.frombuffer(src[start:start + step], dtype=np.uint8)
+                n = segment.size
+                counters = AES128.counter_blocks(counter + start // 16, (n + 15) // 16)
+                keystream = self._crypt_array(counters).reshape(-1)
+                out[start:start + n] = (segment ^ keystream[:n]).tobytes()
+        elif self.backend == 'openssl':
+            self._openssl_crypt(src, out, counter=counter)
+        else:
+            self._ctr_xor_blocks(src, out, counter)
+        self._verify_blocks(src, out, counter=counter)
+
+    def _ctr_xor_blocks(self, src: memoryview, out: memoryview, counter: int) -> None:
+        encrypt_block = self._encrypt_block
+        for start in range(0, len(src), CTR_SEGMENT):
+            segment = src[start:start + CTR_SEGMENT]
+            n = len(segment)
+            blocks = (n + 15) // 16
+            keystream = bytearray(blocks * 16)
+            ks = memoryview(keystream)
+            first = counter + start // 16
+            for i in range(blocks):
+                ks[i*16:i*16+16] = encrypt_block(((first + i) & _COUNTER_MASK).to_bytes(16, 'big'))
+            # 整段按大整数异或（在 C 层完成），避免逐字节循环
+            mixed = int.from_bytes(segment, 'little') ^ int.from_bytes(ks[:n], 'little')
+            out[start:start + n] = mixed.to_bytes(n, 'little')
+
+    def ctr_crypt(self, data: bytes, nonce: bytes, workers: Optional[int] = None) -> bytes:
+        """
+        CTR 模式加密/解密（同一运算）
+
+        Args:
+            data: 明文或密文（任意长度）
+            nonce: 8~16 字节 nonce，同一密钥下不可重复使用
+            workers: 进程数。默认对 CTR_POOL_BACKENDS 中的实现取 CPU 核数，numpy/openssl 取 1
+                （创建进程池的开销远大于其串行耗时）。workers > 1 且数据不小于 CTR_PARALLEL_THRESHOLD
+                时按分组区间切分到进程池，各进程在共享内存上原地异或；否则在当前进程内处理
+        """
+        if nonce is None:
+            raise ValueError("CTR 模式需要 nonce")
+        return self._ctr_apply(memoryview(data).cast('B'), AES128.initial_counter(nonce), workers)
+
+    def _ctr_apply(self, src: memoryview, counter: int, workers: Optional[int] = None) -> bytes:
+        """从计数器 counter 开始对 src 做 CTR 异或，返回新的 bytes；大数据按 workers 切分到进程池"""
+        n = len(src)
+        if workers is None:
+            workers = (os.cpu_count() or 1) if self.backend in CTR_POOL_BACKENDS else 1
+        workers = max(1, min(int(workers), -(-n // CTR_SEGMENT)))
+        if workers == 1 or n < CTR_PARALLEL_THRESHOLD:
+            out = bytearray(n)
+            self.ctr_xor(src, memoryview(out), counter)
+            return bytes(out)
+
+        shm = shared_memory.SharedMemory(create=True, size=n)
+        try:
+            shm.buf[:n] = src
+            # 按分组边界均分给各进程；密钥流互不依赖，各区间从各自的计数器开始
+            per_worker = -(-n // (workers * 16)) * 16
+            tasks = [(shm.name, start, min(start + per_worker, n), self.key, self.backend, counter)
+                     for start in range(0, n, per_worker)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_ctr_task, tasks))
+            return bytes(shm.buf[:n])
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # ---------- GCM 模式 ----------
+
+    def ghash(self) -> 'GHash':
+        """以 H = E_K(0^128) 为键的 GHASH 查表（首次调用时构建并随实例缓存，get_cipher 缓存实例即按 H 复用）"""
+        if self._ghash is None:
+            self._ghash = GHash(self._encrypt_block(bytes(16)))
+        return self._ghash
+
+    def gcm_j0(self, iv: bytes) -> int:
+        """预计数器块 J0：12 字节 IV 时为 IV || 0^31 || 1，其他长度为 GHASH(IV 补零 || [len(IV)]_128)"""
+        if not isinstance(iv, (bytes, bytearray)) or len(iv) == 0:
+            raise ValueError("GCM 模式需要非空的 nonce（推荐 12 字节）")
+        if len(iv) == 12:
+            return int.from_bytes(iv, 'big') << 32 | 1
+        ghash = self.ghash()
+        return ghash.update(ghash.update(0, iv), (len(iv) * 8).to_bytes(16, 'big'))
+
+    @staticmethod
+    def inc32(counter: int, n: int = 1) -> int:
+        """计数器块的低 32 位加 n（模 2^32），高 96 位不变"""
+        return (counter & ~_LOW32) | ((counter + n) & _LOW32)
+
+    @staticmethod
+    def gcm_counter_blocks(counter: int, count: int) -> np.ndarray:
+        """从 counter 起按 inc32 递增的 count 个计数器块，(count, 16) uint8"""
+        words = np.empty((count, 4), dtype='>u4')
+        words[:, :3] = np.frombuffer((counter >> 32).to_bytes(12, 'big'), dtype='>u4')
+        words[:, 3] = np.uint32(counter & _LOW32) + np.arange(count, dtype=np.uint32)  # uint32 加法自然回绕
+        return words.view(np.uint8).reshape(count, 16)
+
+    @staticmethod
+    def _inc32_segments(counter: int, nbytes: int) -> List[Tuple[int, int, int]]:
+        """
+        按 inc32 递增的区间在低 32 位回绕处拆开，每段内与 128 位递增一致，可直接交给 CTR 实现
+
+        Returns:
+            [(起始字节, 结束字节, 该段的初始计数器), ...]（单条消息不超过 GCM_MAX_BLOCKS，最多回绕一次）
+        """
+        head = ((1 << 32) - (counter & _LOW32)) * 16
+        if nbytes <= head:
+            return [(0, nbytes, counter)]
+        return [(0, head, counter), (head, nbytes, counter & ~_LOW32)]
+
+    def gctr_xor(self, src: memoryview, out: memoryview, counter: int) -> None:
+        """GCTR：与 ctr_xor 相同，但计数器按 inc32 递增"""
+        for start, stop, first in AES128._inc32_segments(counter, len(src)):
+            self.ctr_xor(src[start:stop], out[start:stop], first)
+
+    def _gctr(self, data, counter: int, workers: Optional[int] = None) -> bytes:
+        src = memoryview(data).cast('B')
+        if (len(src) + 15) // 16 > GCM_MAX_BLOCKS:
+            raise ValueError("GCM 单条消息不能超过 2^32 - 2 个分组")
+        parts = [self._ctr_apply(src[start:stop], first, workers)
+                 for start, stop, first in AES128._inc32_segments(counter, len(src))]
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    @staticmethod
+    def _gcm_final(ghash: 'GHash', y: int, ek0: bytes, aad_len: int, data_len: int) -> bytes:
+        """吸收长度分组 [len(A)]_64 || [len(C)]_64 后与 E_K(J0) 异或得到标签"""
+        s = ghash.update(y, ((aad_len * 8) << 64 | data_len * 8).to_bytes(16, 'big'))
+        return (s ^ int.from_bytes(ek0, 'big')).to_bytes(16, 'big')
+
+    def _gcm_tag(self, j0: int, aad: bytes, ciphertext) -> bytes:
+        ghash = self.ghash()
+        y = ghash.update(ghash.update(0, aad), ciphertext)
+        return AES128._gcm_final(ghash, y, self._encrypt_block(j0.to_bytes(16, 'big')), len(aad), len(ciphertext))
+
+    def gcm_encrypt(self, data: bytes, iv: bytes, aad: Optional[bytes] = None,
+                    workers: Optional[int] = None) -> Tuple[bytes, bytes]:
+        """
+        GCM 加密（NIST SP 800-38D）：数据部分即从 inc32(J0) 开始的 CTR，可沿用各实现与进程池；标签由查表 GHASH 计算
+
+        Args:
+            data: 明文
+            iv: nonce（推荐 12 字节），同一密钥下不可重复使用
+            aad: 只认证、不加密的附加数据
+            workers: CTR 部分的进程数（同 ctr_crypt）
+
+        Returns:
+            (密文, 16 字节认证标签)
+        """
+        aad = bytes(aad or b'')
+        j0 = self.gcm_j0(iv)
+        ciphertext = self._gctr(data, AES128.inc32(j0), workers)
+        return ciphertext, self._gcm_tag(j0, aad, ciphertext)
+
+    def gcm_decrypt(self, ciphertext: bytes, iv: bytes, tag: bytes, aad: Optional[bytes] = None,
+                    workers: Optional[int] = None) -> bytes:
+        """GCM 解密：先按常数时间比较校验标签，通过后才解密；失败时抛出 InvalidTag，不返回任何明文"""
+        aad = bytes(aad or b'')
+        j0 = self.gcm_j0(iv)
+        if len(tag) != GCM_TAG_SIZE or not hmac.compare_digest(self._gcm_tag(j0, aad, ciphertext), bytes(tag)):
+            raise InvalidTag("GCM 认证失败：密文或附加数据已被篡改，或密钥 / nonce 不匹配")
+        return self._gctr(ciphertext, AES128.inc32(j0), workers)
+
+    def crypt_batch(self, items: List[bytes], decrypt: bool = False, mode: str = 'ecb',
+                    nonces: Optional[List[bytes]] = None,
+                    aads: Optional[List[bytes]] = None) -> List[Tuple[Optional[bytes], Optional[str]]]:
+        """
+        多条消息批量加解密：所有消息的分组拼接后只调用一次底层实现（numpy / openssl 时为一次批量运算）
+
+        CTR / GCM 模式下先为每条消息生成各自的计数器块，拼接后统一做一次 ECB 加密得到全部密钥流；
+        GCM 每条消息多加密一个 J0 分组用于标签，GHASH 逐条计算（解密时密文末尾 16 字节为标签）。
+
+        Args:
+            items: 明文或密文列表
+            decrypt: 是否解密
+            mode: 'ecb' | 'ctr' | 'gcm'
+            nonces: CTR / GCM 模式下与 items 一一对应的 nonce
+            aads: GCM 模式下与 items 一一对应的附加认证数据（默认均为空，其他模式忽略）
+
+        Returns:
+            与 items 顺序一致的 [(结果, 错误信息), ...]，单条消息出错不影响其他消息
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的工作模式: {mode}")
+        if mode != 'ecb' and (nonces is None or len(nonces) != len(items)):
+            raise ValueError(f"{mode.upper()} 模式需要与消息一一对应的 nonce")
+        if aads is not None and len(aads) != len(items):
+            raise ValueError("aads 需要与消息一一对应")
+
+        results = [None] * len(items)
+        segments = []  # (消息下标, 在拼接缓冲区中的偏移, 消息长度)
+        chunks = []
+        offset = 0
+        j0s = {}  # GCM：消息下标 -> J0
+        for i, item in enumerate(items):
+            if mode == 'gcm':
+                length = len(item) - GCM_TAG_SIZE if decrypt else len(item)
+                try:
+                    if length < 0:
+                        raise ValueError("GCM 密文长度不足（缺少认证标签）")
+                    if (length + 15) // 16 > GCM_MAX_BLOCKS:
+                        raise ValueError("GCM 单条消息不能超过 2^32 - 2 个分组")
+                    j0s[i] = self.gcm_j0(nonces[i])
+                except ValueError as e:
+                    results[i] = (None, str(e))
+                    continue
+                # 第一个分组为 J0（E_K(J0) 用于标签），之后是数据部分的计数器块
+                chunk = AES128.gcm_counter_blocks(j0s[i], (length + 15) // 16 + 1).tobytes()
+                segments.append((i, offset, length))
+                chunks.append(chunk)
+                offset += len(chunk)
+                continue
+            if mode == 'ctr':
+                try:
+                    counter = AES128.initial_counter(nonces[i])
+                except ValueError as e:
+                    results[i] = (None, str(e))
+                    continue
+                blocks = AES128.counter_blocks(counter, (len(item) + 15) // 16)
+                chunk = blocks.tobytes()
+            elif decrypt:
+                if len(item) == 0 or len(item) % 16 != 0:
+                    results[i] = (None, "密文长度不为 16 的倍数")
+                    continue
+                chunk = item
+            else:
+                chunk = AES128.pkcs7_pad(bytes(item))
+            segments.append((i, offset, len(item)))
+            chunks.append(chunk)
+            offset += len(chunk)
+
+        src = b''.join(chunks)
+        out = bytearray(len(src))
+        # CTR / GCM 的密钥流是计数器块的 ECB 加密，与消息方向无关
+        self.crypt_blocks(memoryview(src), memoryview(out), decrypt=decrypt and mode == 'ecb')
+
+        if mode == 'gcm':
+            ghash = self.ghash()
+            for i, start, length in segments:
+                data = memoryview(items[i]).cast('B')
+                ek0 = bytes(out[start:start + 16])
+                keystream = np.frombuffer(out, dtype=np.uint8, count=length, offset=start + 16)
+                converted = (np.frombuffer(data[:length], dtype=np.uint8) ^ keystream).tobytes()
+                ciphertext = data[:length] if decrypt else converted
+                aad = aads[i] if aads is not None else b''
+                y = ghash.update(ghash.update(0, aad), ciphertext)
+                tag = AES128._gcm_final(ghash, y, ek0, len(aad), length)
+                if not decrypt:
+                    results[i] = (converted + tag, None)
+                elif hmac.compare_digest(tag, bytes(data[length:])):
+                    results[i] = (converted, None)
+                else:
+                    results[i] = (None, "GCM 认证失败")
+        elif mode == 'ctr':
+            for i, start, length in segments:
+                keystream = np.frombuffer(out, dtype=np.uint8, count=length, offset=start)
+                results[i] = ((np.frombuffer(items[i], dtype=np.uint8) ^ keystream).tobytes(), None)
+        elif decrypt:
+            for i, start, length in segments:
+                try:
+                    results[i] = (bytes(AES128.pkcs7_unpad(out[start:start + length])), None)
+                except ValueError as e:
+                    results[i] = (None, str(e))
+        else:
+            for i, start, length in segments:
+                results[i] = (bytes(out[start:start + (length // 16 + 1) * 16]), None)
+        return results
+
+    def encryptor(self, mode: str = 'ecb', nonce: Optional[bytes] = None, aad: Optional[bytes] = None) -> 'AESStream':
+        """分块流式加密：update(chunk) 返回已完成分组的密文，finalize() 输出最后一组（ECB 带填充，GCM 附加标签）"""
+        return AESStream(self, decrypt=False, mode=mode, nonce=nonce, aad=aad)
+
+    def decryptor(self, mode: str = 'ecb', nonce: Optional[bytes] = None, aad: Optional[bytes] = None) -> 'AESStream':
+        """
+        分块流式解密：ECB 始终保留最后一个分组，finalize() 时校验并去除填充；
+        GCM 始终保留末尾 16 字节标签，finalize() 时校验，失败抛出 InvalidTag（此前输出的明文必须丢弃）
+        """
+        return AESStream(self, decrypt=True, mode=mode, nonce=nonce, aad=aad)
+
+
+class GHash:
+    """
+    GCM 的 GHASH_H，按 Shoup 的 8 位查表法为每个 H 预计算
+
+    乘以 H 是 GF(2) 上的线性运算：把 X 拆成 16 个字节 x_0..x_15，则 X·H = T_0[x_0] ⊕ ... ⊕ T_15[x_15]，
+    其中 T_i[b] 是"字节 b 位于第 i 个字节"的元素乘以 H。16 张 256 项表只依赖 H，之后每个分组只需
+    16 次查表与异或，不再逐位移位、约简。
+    """
+
+    def __init__(self, h: bytes):
+        self.tables = GHash.build_tables(int.from_bytes(h, 'big'))
+
+    @staticmethod
+    def build_tables(h: int) -> List[List[int]]:
+        # GCM 位序：最高位是 x^0，乘以 x 即右移一位，移出的位为 1 时异或约简多项式
+        powers = []  # H·x^j，j = 0..127
+        v = h
+        for _ in range(128):
+            powers.append(v)
+            v = (v >> 1) ^ _GHASH_R if v & 1 else v >> 1
+        tables = []
+        for i in range(16):
+            table = [0] * 256
+            for b in range(1, 256):
+                low = b & -b  # 最低置位；字节内的最高位对应 x^(8i)
+                table[b] = table[b ^ low] ^ powers[8 * i + 8 - low.bit_length()]
+            tables.append(table)
+        return tables
+
+    def update(self, y: int, data) -> int:
+        """把 data 按分组吸收进状态 y（y = (y ⊕ X)·H，最后不足一组时右侧补零），返回新状态"""
+        t0, t1, t2, t3, t4, t5, t6, t7, t8, t9, t10, t11, t12, t13, t14, t15 = self.tables
+        view = memoryview(data).cast('B')
+        n = len(view)
+        full = n - n % 16
+        from_bytes = int.from_bytes
+        for start in range(0, full + (16 if full < n else 0), 16):
+            x = from_bytes(view[start:start + 16], 'big')
+            if start + 16 > n:
+                x <<= 8 * (start + 16 - n)
+            b = (y ^ x).to_bytes(16, 'big')
+            y = (t0[b[0]] ^ t1[b[1]] ^ t2[b[2]] ^ t3[b[3]] ^ t4[b[4]] ^ t5[b[5]] ^ t6[b[6]] ^ t7[b[7]] ^
+                 t8[b[8]] ^ t9[b[9]] ^ t10[b[10]] ^ t11[b[11]] ^ t12[b[12]] ^ t13[b[13]] ^ t14[b[14]] ^ t15[b[15]])
+        return y
+
+
+class AESStream:
+    """ECB + PKCS#7 / CTR / GCM 的流式加解密器，内存占用只与单次 chunk 大小有关"""
+
+    def __init__(self, aes: AES128, decrypt: bool = False, mode: str = 'ecb', nonce: Optional[bytes] = None,
+                 aad: Optional[bytes] = None):
+        if mode not in MODES:
+            raise ValueError(f"未知的工作模式: {mode}")
+        self.aes = aes
+        self.decrypt = decrypt
+        self.mode = mode
+        self._counter = AES128.initial_counter(nonce) if mode == 'ctr' else None
+        self._j0 = None
+        if mode == 'gcm':
+            aad = bytes(aad or b'')
+            self._j0 = aes.gcm_j0(nonce)
+            self._counter = AES128.inc32(self._j0)
+            self._ghash = aes.ghash()
+            self._auth = self._ghash.update(0, aad)  # GHASH 状态（已吸收附加数据）
+            self._aad_len = len(aad)
+            self._length = 0  # 已认证的密文字节数
+        self._pending = bytearray()  # 尚未凑满（或解密时暂缓处理）的尾部字节
+        self._finalized = False
+
+    def _crypt(self, src: memoryview, out: memoryview) -> None:
+        if self._counter is None:
+            self.aes.crypt_blocks(src, out, self.decrypt)
+        elif self._j0 is None:
+            self.aes.ctr_xor(src, out, self._counter)
+            self._counter += len(src) // 16
+        else:
+            # GCM：除最后一次外 src 都是整分组，GHASH 可以边加解密边吸收密文
+            self._length += len(src)
+            if (self._length + 15) // 16 > GCM_MAX_BLOCKS:
+                raise ValueError("GCM 单条消息不能超过 2^32 - 2 个分组")
+            self.aes.gctr_xor(src, out, self._counter)
+            self._auth = self._ghash.update(self._auth, src if self.decrypt else out)
+            self._counter = AES128.inc32(self._counter, len(src) // 16)
+
+    def update_into(self, chunk: bytes, out: memoryview) -> int:
+        """
+        处理 chunk 并把已完成的分组直接写入 out（如输出文件的内存映射），返回写入的字节数
+
+        out 至少需要容纳 len(chunk) + 16 字节
+        """
+        if self._finalized:
+            raise ValueError("流已结束，不能继续写入")
+        data = memoryview(chunk).cast('B')
+        total = len(self._pending) + len(data)
+        # ECB 解密时至少保留一个分组（可能是带填充的最后一组），GCM 解密时保留末尾的标签，
+        # 其余情况只处理完整分组
+        if self.decrypt and self._j0 is not None:
+            ready = max(total - GCM_TAG_SIZE, 0) // 16 * 16
+        elif self.decrypt and self._counter is None:
+            ready = (total - 1) // 16 * 16
+        else:
+            ready = total // 16 * 16
+        if ready <= 0:
+            self._pending += data
+            return 0
+
+        done = 0
+        if self._pending:
+            # 先处理缓冲区中的字节（用 chunk 开头补齐到分组边界，且不超过 ready）
+            done = min(ready, -(-len(self._pending) // 16) * 16)
+            head = max(done - len(self._pending), 0)
+            buffered = self._pending + data[:head]
+            data = data[head:]
+            self._crypt(memoryview(buffered)[:done], out[:done])
+            self._pending = buffered[done:]
+        rest = ready - done
+        self._crypt(data[:rest], out[done:ready])
+        self._pending += data[rest:]
+        return ready
+
+    def update(self, chunk: bytes) -> bytes:
+        out = bytearray(len(self._pending) + len(chunk))
+        written = self.update_into(chunk, memoryview(out))
+        del out[written:]
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        if self._finalized:
+            raise ValueError("流已结束")
+        self._finalized = True
+        if self._j0 is not None:
+            return self._finalize_gcm()
+        if self._counter is not None:
+            # CTR：剩余不足一个分组的字节直接与密钥流异或
+            out = bytearray(len(self._pending))
+            self._crypt(memoryview(self._pending), memoryview(out))
+            return bytes(out)
+        if not self.decrypt:
+            return self.aes._encrypt_block(AES128.pkcs7_pad(bytes(self._pending)))
+        if len(self._pending) != 16:
+            raise ValueError("密文长度不为 16 的倍数")
+        return bytes(AES128.pkcs7_unpad(self.aes._decrypt_block(bytes(self._pending))))
+
+    def _finalize_gcm(self) -> bytes:
+        """处理剩余不足一个分组的数据并计算标签：加密时附加在输出末尾，解密时与收到的标签比较"""
+        pending = bytes(self._pending)
+        if self.decrypt:
+            if len(pending) < GCM_TAG_SIZE:
+                raise ValueError("GCM 密文长度不足（缺少认证标签）")
+            pending, received = pending[:-GCM_TAG_SIZE], pending[-GCM_TAG_SIZE:]
+        out = bytearray(len(pending))
+        self._crypt(memoryview(pending), memoryview(out))
+        ek0 = self.aes._encrypt_block(self._j0.to_bytes(16, 'big'))
+        tag = AES128._gcm_final(self._ghash, self._auth, ek0, self._aad_len, self._length)
+        if not self.decrypt:
+            return bytes(out) + tag
+        if not hmac.compare_digest(tag, received):
+            raise InvalidTag("GCM 认证失败：密文或附加数据已被篡改，或密钥 / nonce 不匹配")
+        return bytes(out)
+
+
+def crypt_file(aes: AES128, src_path: str, dst_path: str, decrypt: bool = False, mode: str = 'ecb',
+               nonce: Optional[bytes] = None, chunk_size: int = FILE_CHUNK,
+               aad: Optional[bytes] = None) -> Tuple[int, int]:
+    """
+    文件加解密：输入与输出都做内存映射，按 chunk_size 分块经流式接口处理，结果直接写入输出映射
+
+    Args:
+        aes: AES128 实例
+        src_path: 输入文件路径
+        dst_path: 输出文件路径（存在时覆盖；解密或认证失败时删除）
+        decrypt: 是否解密
+        mode: 'ecb' | 'ctr' | 'gcm'（GCM 加密输出末尾附加 16 字节标签，解密时校验）
+        nonce: CTR / GCM 模式的 nonce
+        aad: GCM 的附加认证数据
+
+    Returns:
+        (输入字节数, 输出字节数)
+    """
+    size = os.path.getsize(src_path)
+    stream = AESStream(aes, decrypt=decrypt, mode=mode, nonce=nonce, aad=aad)
+    if mode == 'gcm' and not decrypt:
+        capacity = size + GCM_TAG_SIZE
+    elif mode != 'ecb' or decrypt:
+        capacity = size  # 解密的实际长度要到去除填充 / 标签后才知道，先按输入长度分配再截断
+    else:
+        capacity = size - size % 16 + 16
+    try:
+        with open(src_path, 'rb') as src_file, open(dst_path, 'w+b') as dst_file:
+            dst_file.truncate(capacity)
+            src_map = mmap.mmap(src_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+            dst_map = mmap.mmap(dst_file.fileno(), capacity) if capacity else bytearray()
+            try:
+                written = _crypt_mapped(stream, src_map, dst_map, chunk_size)
+            finally:
+                if isinstance(src_map, mmap.mmap):
+                    src_map.close()
+                if isinstance(dst_map, mmap.mmap):
+                    dst_map.flush()
+                    dst_map.close()
+            dst_file.truncate(written)
+    except Exception:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        raise
+    return size, written
+
+
+def _crypt_mapped(stream: AESStream, src_map, dst_map, chunk_size: int) -> int:
+    """在两个内存映射之间分块运行流式接口，返回输出字节数；出错时先释放全部视图再抛出，保证映射可以关闭"""
+    src_view, dst_view = memoryview(src_map), memoryview(dst_map)
+    try:
+        written = 0
+        for start in range(0, len(src_view), chunk_size):
+            written += stream.update_into(src_view[start:start + chunk_size], dst_view[written:])
+        tail = stream.finalize()
+        dst_view[written:written + len(tail)] = tail
+        return written + len(tail)
+    except Exception as exc:
+        # 异常的回溯帧仍引用映射的切片，去掉回溯后才能释放视图
+        exc.__traceback__ = None
+        raise
+    finally:
+        src_view.release()
+        dst_view.release()
+
+
+# 密钥扩展缓存：以进程内随机密钥的 HMAC 作为缓存键，字典中不出现原始密钥
+_key_cache_secret = os.urandom(32)
+_key_cache = OrderedDict()
+_key_cache_lock = threading.Lock()
+_key_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cipher(key: bytes, backend: Optional[str] = None, verify: bool = False) -> AES128:
+    """
+    获取（或创建并缓存）密钥对应的 AES128 实例，同一密钥重复请求时跳过密钥扩展
+
+    实例创建后只读，可在多个线程间共享。
+    """
+    backend = backend or DEFAULT_BACKEND
+    message = bytes(key) + b'|' + backend.encode() + (b'|verify' if verify else b'')
+    cache_key = hmac.new(_key_cache_secret, message, hashlib.sha256).digest()
+    with _key_cache_lock:
+        cipher = _key_cache.get(cache_key)
+        if cipher is not None:
+            _key_cache.move_to_end(cache_key)
+            _key_cache_stats['hits'] += 1
+            return cipher
+        _key_cache_stats['misses'] += 1
+
+    cipher = AES128(key, backend, verify)
+    with _key_cache_lock:
+        _key_cache[cache_key] = cipher
+        _key_cache.move_to_end(cache_key)
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+    return cipher
+
+
+def key_cache_info() -> dict:
+    """密钥扩展缓存的命中统计"""
+    with _key_cache_lock:
+        hits, misses = _key_cache_stats['hits'], _key_cache_stats['misses']
+        return {
+            'size': len(_key_cache),
+            'capacity': KEY_CACHE_SIZE,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+# libcrypto 按需加载一次；找不到库或缺少 EVP 符号时视为不可用
+_libcrypto = None
+_libcrypto_loaded = False
+_libcrypto_lock = threading.Lock()
+
+
+def _load_libcrypto():
+    global _libcrypto, _libcrypto_loaded
+    with _libcrypto_lock:
+        if _libcrypto_loaded:
+            return _libcrypto
+        _libcrypto_loaded = True
+        try:
+            name = ctypes.util.find_library('crypto')
+            if name is None:
+                return None
+            lib = ctypes.CDLL(name)
+            vp, cp, ip = ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int
+            lib.EVP_CIPHER_CTX_new.restype = vp
+            lib.EVP_CIPHER_CTX_new.argtypes = []
+            lib.EVP_CIPHER_CTX_free.argtypes = [vp]
+            lib.EVP_CIPHER_CTX_set_padding.argtypes = [vp, ip]
+            for fn in (lib.EVP_aes_128_ecb, lib.EVP_aes_128_ctr):
+                fn.restype = vp
+                fn.argtypes = []
+            for fn in (lib.EVP_EncryptInit_ex, lib.EVP_DecryptInit_ex):
+                fn.restype = ip
+                fn.argtypes = [vp, vp, vp, cp, cp]
+            for fn in (lib.EVP_EncryptUpdate, lib.EVP_DecryptUpdate):
+                fn.restype = ip
+                fn.argtypes = [vp, vp, ctypes.POINTER(ip), cp, ip]
+        except (OSError, AttributeError):
+            return None
+        _libcrypto = lib
+        return lib
+
+
+def openssl_available() -> bool:
+    return _load_libcrypto() is not None
+
+
+def fastest_backend() -> str:
+    """当前环境下吞吐最高的实现"""
+    return 'openssl' if openssl_available() else FALLBACK_BACKEND
+
+
+def _ctr_task(args) -> None:
+    """进程池任务：在共享内存的 [start, stop) 区间上原地完成 CTR 异或"""
+    name, start, stop, key, backend, counter = args
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        view = shm.buf[start:stop]
+        AES128(key, backend).ctr_xor(view, view, counter + start // 16)
+        view.release()
+    finally:
+        shm.close()
+
+
+def _build_ttables() -> None:
+    """由 S 盒生成加密表 Te0..Te3、解密表 Td0..Td3（各 256 个 32 位字）以及 numpy 实现的查找表"""
+    mul = AES128.mul
+
+    def ror8(w: int) -> int:
+        return ((w >> 8) | (w << 24)) & 0xFFFFFFFF
+
+    Te0, Td0 = [], []
+    for x in range(256):
+        s = AES128.Sbox[x]
+        Te0.append(mul(0x02, s) << 24 | s << 16 | s << 8 | mul(0x03, s))
+        si = AES128.InvSbox[x]
+        Td0.append(mul(0x0e, si) << 24 | mul(0x09, si) << 16 | mul(0x0d, si) << 8 | mul(0x0b, si))
+    Te1 = [ror8(w) for w in Te0]
+    Te2 = [ror8(w) for w in Te1]
+    Te3 = [ror8(w) for w in Te2]
+    Td1 = [ror8(w) for w in Td0]
+    Td2 = [ror8(w) for w in Td1]
+    Td3 = [ror8(w) for w in Td2]
+    AES128.Te0, AES128.Te1, AES128.Te2, AES128.Te3 = Te0, Te1, Te2, Te3
+    AES128.Td0, AES128.Td1, AES128.Td2, AES128.Td3 = Td0, Td1, Td2, Td3
+
+    # numpy 实现的查找表与 ShiftRows 置换（输出位置 4*c + r 取自输入位置 4*((c±r) mod 4) + r）
+    AES128.SboxArray = np.array(AES128.Sbox, dtype=np.uint8)
+    AES128.InvSboxArray = np.array(AES128.InvSbox, dtype=np.uint8)
+    AES128.XtimeArray = np.array([AES128.xtime(x) for x in range(256)], dtype=np.uint8)
+    AES128.ShiftRowsPerm = np.array([4 * ((c + r) % 4) + r for c in range(4) for r in range(4)], dtype=np.intp)
+    AES128.InvShiftRowsPerm = np.array([4 * ((c - r) % 4) + r for c in range(4) for r in range(4)], dtype=np.intp)
+
+
+_build_ttables()
 
 # 示例：使用 AES 类进行测试（替换原有测试调用）
 if __name__ == "__main__":
@@ -0,0 +1,262 @@
+"""
+收缩层次（Contraction Hierarchies）最短路径索引
+
+针对大规模拓扑的预处理索引，按基础链路权重构建一次并按拓扑缓存：
+- 预处理：按边差值（edge difference）的惰性优先级逐个收缩节点，必要时添加捷径边
+- 查询：在"向上"的图上做双向 Dijkstra，相遇后展开捷径得到原始路径
+仅在链路利用率惩罚未生效（权重等于基础权重）时可用，否则应回退到覆盖权重上的普通搜索。
+"""
+
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+from algorithms.routing_graph import INF
+
+CH_CACHE_SIZE = 8            # 最多缓存的索引数量
+WITNESS_SETTLE_LIMIT = 60    # 见证路径搜索的节点结算上限（越小预处理越快，捷径越多）
+
+
+class ContractionHierarchy:
+    """基于 RoutingGraph 基础权重的收缩层次索引"""
+
+    def __init__(self, graph, weights=None):
+        """
+        Args:
+            graph: RoutingGraph 实例
+            weights: 每条弧的权重（默认使用 graph.weight）
+        """
+        start_time = time.perf_counter()
+        self.graph = graph
+        n = graph.num_nodes
+        w = (graph.weight if weights is None else weights).tolist()
+        src = graph.arc_src.tolist()
+        dst = graph.indices.tolist()
+
+        # 全部弧（原始弧 + 捷径）：{(u, v): (weight, mid)}，mid 为 None 表示原始弧
+        self._arcs = {}
+        out_adj = [dict() for _ in range(n)]
+        in_adj = [dict() for _ in range(n)]
+        for a in range(graph.num_arcs):
+            u, v, wa = src[a], dst[a], w[a]
+            if u == v or wa == INF:
+                continue
+            if wa < out_adj[u].get(v, INF):
+                out_adj[u][v] = wa
+                in_adj[v][u] = wa
+                self._arcs[(u, v)] = (wa, None)
+
+        contracted = [False] * n
+        contracted_neighbors = [0] * n
+        self.rank = [0] * n
+        self.num_shortcuts = 0
+
+        heap = [(self._priority(v, out_adj, in_adj, contracted_neighbors), v) for v in range(n)]
+        heapq.heapify(heap)
+        next_rank = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            if contracted[v]:
+                continue
+            # 惰性更新：重新计算优先级，若不再是最小则重新入堆
+            priority = self._priority(v, out_adj, in_adj, contracted_neighbors)
+            if heap and priority > heap[0][0]:
+                heapq.heappush(heap, (priority, v))
+                continue
+
+            for u, x, weight in self._shortcuts_needed(v, out_adj, in_adj):
+                if weight < out_adj[u].get(x, INF):
+                    out_adj[u][x] = weight
+                    in_adj[x][u] = weight
+                    self._arcs[(u, x)] = (weight, v)
+                    self.num_shortcuts += 1
+
+            # 从剩余图中移除 v
+            for x in out_adj[v]:
+                del in_adj[x][v]
+                contracted_neighbors[x] += 1
+            for u in in_adj[v]:
+                del out_adj[u][v]
+                contracted_neighbors[u] += 1
+            out_adj[v] = {}
+            in_adj[v] = {}
+            contracted[v] = True
+            self.rank[v] = next_rank
+            next_rank += 1
+
+        # 查询图：前向只走 rank 升高的弧，反向只走入弧中 rank 升高的一端
+        rank = self.rank
+        self._up_fwd = [[] for _ in range(n)]
+        self._up_bwd = [[] for _ in range(n)]
+        for (u, v), (weight, _) in self._arcs.items():
+            if rank[v] > rank[u]:
+                self._up_fwd[u].append((v, weight))
+            else:
+                self._up_bwd[v].append((u, weight))
+
+        self.build_time_ms = (time.perf_counter() - start_time) * 1000
+
+    @staticmethod
+    def _witness_search(source, excluded, max_dist, out_adj):
+        """从 source 出发、跳过 excluded 节点的受限 Dijkstra，返回距离字典"""
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap and settled < WITNESS_SETTLE_LIMIT:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if d > max_dist:
+                break
+            settled += 1
+            for x, wa in out_adj[u].items():
+                if x == excluded:
+                    continue
+                nd = d + wa
+                if nd < dist.get(x, INF):
+                    dist[x] = nd
+                    heapq.heappush(heap, (nd, x))
+        return dist
+
+    def _shortcuts_needed(self, v, out_adj, in_adj):
+        """收缩 v 时需要添加的捷径 [(u, x, weight), ...]"""
+        shortcuts = []
+        outs = out_adj[v]
+        if not outs:
+            return shortcuts
+        max_out = max(outs.values())
+        for u, w_uv in in_adj[v].items():
+            dist = self._witness_search(u, v, w_uv + max_out, out_adj)
+            for x, w_vx in outs.items():
+                if x == u:
+                    continue
+                weight = w_uv + w_vx
+                if dist.get(x, INF) > weight:
+                    shortcuts.append((u, x, weight))
+        return shortcuts
+
+    def _priority(self, v, out_adj, in_adj, contracted_neighbors):
+        """边差值 + 已收缩邻居数（越小越先收缩）"""
+        added = len(self._shortcuts_needed(v, out_adj, in_adj))
+        removed = len(out_adj[v]) + len(in_adj[v])
+        return added - removed + contracted_neighbors[v]
+
+    def _unpack(self, u, v):
+        """把弧 (u, v) 展开为原始节点序列（内部下标，包含两端）"""
+        result = [u]
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            mid = self._arcs[(a, b)][1]
+            if mid is None:
+                result.append(b)
+            else:
+                # 先处理 (a, mid)，再处理 (mid, b)
+                stack.append((mid, b))
+                stack.append((a, mid))
+        return result
+
+    def query(self, source, target):
+        """
+        双向 CH 查询
+
+        Returns:
+            (path, distance): 原始节点ID路径与距离；不可达时返回 (None, inf)
+        """
+        graph = self.graph
+        s = graph.index.get(source)
+        t = graph.index.get(target)
+        if s is None or t is None:
+            return None, INF
+        if s == t:
+            return [source], 0.0
+
+        dist = ({s: 0.0}, {t: 0.0})
+        pred = ({}, {})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        adjs = (self._up_fwd, self._up_bwd)
+        best, meet = INF, None
+        while True:
+            # 两个方向的最小键都不小于当前最优值时停止；否则扩展键较小的一侧
+            fwd_open = heaps[0] and heaps[0][0][0] < best
+            bwd_open = heaps[1] and heaps[1][0][0] < best
+            if not fwd_open and not bwd_open:
+                break
+            side = 0 if fwd_open and (not bwd_open or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            d, u = heapq.heappop(heaps[side])
+            if d > dist[side][u]:
+                continue
+            other = dist[side ^ 1].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+            for x, wa in adjs[side][u]:
+                nd = d + wa
+                if nd < dist[side].get(x, INF):
+                    dist[side][x] = nd
+                    pred[side][x] = u
+                    heapq.heappush(heaps[side], (nd, x))
+
+        if meet is None:
+            return None, INF
+
+        # 还原 s -> meet（前向弧）与 meet -> t（反向搜索中的弧方向为 x -> pred）
+        forward = [meet]
+        while forward[-1] != s:
+            forward.append(pred[0][forward[-1]])
+        forward.reverse()
+        backward = [meet]
+        while backward[-1] != t:
+            backward.append(pred[1][backward[-1]])
+
+        nodes = [s]
+        for chain in (forward, backward):
+            for i in range(len(chain) - 1):
+                nodes.extend(self._unpack(chain[i], chain[i + 1])[1:])
+        return [graph.node_ids[i] for i in nodes], best
+
+    def stats(self):
+        """索引规模与构建耗时"""
+        search_arcs = sum(len(a) for a in self._up_fwd) + sum(len(a) for a in self._up_bwd)
+        return {
+            'num_nodes': self.graph.num_nodes,
+            'num_arcs': self.graph.num_arcs,
+            'num_shortcuts': self.num_shortcuts,
+            'search_arcs': search_arcs,
+            # 粗略估计：每条查询弧 (node, weight) + 每条弧的展开信息 (u, v, weight, mid)
+            'estimated_bytes': search_arcs * 16 + len(self._arcs) * 32,
+            'build_time_ms': self.build_time_ms,
+        }
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def peek_contraction_hierarchy(graph):
+    """只查缓存：已构建过该拓扑的索引时返回，否则返回 None（不触发构建）"""
+    key = graph.key
+    with _cache_lock:
+        ch = _cache.get(key) if key is not None else None
+        if ch is not None:
+            _cache.move_to_end(key)
+        return ch
+
+
+def get_contraction_hierarchy(graph):
+    """按拓扑哈希获取（或构建并缓存）基础权重上的收缩层次索引"""
+    key = graph.key
+    with _cache_lock:
+        ch = _cache.get(key) if key is not None else None
+        if ch is not None:
+            _cache.move_to_end(key)
+            return ch
+
+    ch = ContractionHierarchy(graph)
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = ch
+            _cache.move_to_end(key)
+            while len(_cache) > CH_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return ch
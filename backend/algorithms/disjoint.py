@@ -0,0 +1,167 @@
+"""
+不相交多路径（Suurballe / Bhandari）
+
+在单位容量的流网络上做逐次最短路（successive shortest paths）：每一轮用带势能的 Dijkstra
+在残量网络上找一条增广路径，k 轮后把单位流分解为 k 条路径。得到的是总代价最小的 k 条
+边不相交路径（k=2 时即 Suurballe 算法），共需 k 次 Dijkstra。
+节点不相交模式把每个中间节点拆成 v_in -> v_out（容量 1）。
+"""
+
+import heapq
+
+from algorithms.routing_graph import INF
+
+
+class _ResidualNetwork:
+    """单位容量残量网络：弧 a 与 a ^ 1 互为反向弧"""
+
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        self.adj = [[] for _ in range(num_nodes)]
+        self.head = []
+        self.cap = []
+        self.cost = []
+
+    def add_arc(self, u, v, cost):
+        a = len(self.head)
+        self.head.extend((v, u))
+        self.cap.extend((1, 0))
+        self.cost.extend((cost, -cost))
+        self.adj[u].append(a)
+        self.adj[v].append(a + 1)
+        return a
+
+    def augment(self, s, t, potential):
+        """
+        按约化代价 cost + pi[u] - pi[v] 运行 Dijkstra 并沿最短路增广一个单位
+
+        Returns:
+            是否找到增广路径（找到时同时更新势能）
+        """
+        n = self.num_nodes
+        head, cap, cost, adj = self.head, self.cap, self.cost, self.adj
+        dist = [INF] * n
+        pred_arc = [-1] * n
+        dist[s] = 0.0
+        heap = [(0.0, s)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            pu = potential[u]
+            for a in adj[u]:
+                if cap[a] <= 0:
+                    continue
+                v = head[a]
+                # 约化代价非负；max 消除浮点误差造成的微小负值
+                nd = d + max(0.0, cost[a] + pu - potential[v])
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred_arc[v] = a
+                    heapq.heappush(heap, (nd, v))
+        if dist[t] == INF:
+            return False
+
+        for v in range(n):
+            if dist[v] < INF:
+                potential[v] += dist[v]
+        v = t
+        while v != s:
+            a = pred_arc[v]
+            cap[a] -= 1
+            cap[a ^ 1] += 1
+            v = head[a ^ 1]
+        return True
+
+
+def find_disjoint_paths(graph, source, target, k, weights=None, node_disjoint=False):
+    """
+    求 source -> target 之间总代价最小的 k 条不相交路径
+
+    Args:
+        graph: RoutingGraph 实例
+        source: 源节点ID
+        target: 目标节点ID
+        k: 路径数量上限（不足 k 条不相交路径时返回全部能找到的路径）
+        weights: 每条弧的权重（默认 graph.weight；inf 表示不可用）
+        node_disjoint: True 时要求中间节点也不相交（否则只要求链路不相交）
+
+    Returns:
+        路径列表（原始节点ID，按路径代价升序）
+    """
+    s = graph.index.get(source)
+    t = graph.index.get(target)
+    if s is None or t is None or k <= 0:
+        return []
+    if s == t:
+        return [[source]]
+
+    w = (graph.weight if weights is None else weights).tolist()
+    n = graph.num_nodes
+    src, dst = graph.arc_src.tolist(), graph.indices.tolist()
+
+    # 节点拆分：v_in = v，v_out = v + n（源/汇不拆分，直接使用 v）
+    def out_node(v):
+        return v + n if node_disjoint and v != s and v != t else v
+
+    net = _ResidualNetwork(2 * n if node_disjoint else n)
+    if node_disjoint:
+        for v in range(n):
+            if v != s and v != t:
+                net.add_arc(v, v + n, 0.0)
+
+    # 原始弧：记录网络弧下标 -> 路由图弧下标，用于分解
+    arc_of = {}
+    for a in range(graph.num_arcs):
+        u, v = src[a], dst[a]
+        if u == v or w[a] == INF or v == s or u == t:
+            continue  # 进入源点或离开汇点的弧对最小费用流没有用处
+        arc_of[net.add_arc(out_node(u), v, w[a])] = a
+
+    potential = [0.0] * net.num_nodes  # 初始权重非负，零势能即合法
+    found = 0
+    while found < k and net.augment(s, t, potential):
+        found += 1
+    if found == 0:
+        return []
+
+    # 收集有流量的原始弧，同一链路上相反方向的流相互抵消
+    flow_out = [[] for _ in range(n)]
+    used = set()
+    for net_arc, a in arc_of.items():
+        if net.cap[net_arc] == 0:
+            used.add(a)
+    reverse_arc = graph.reverse_arc
+    for a in sorted(used):
+        if int(reverse_arc[a]) in used:
+            continue
+        flow_out[src[a]].append(a)
+
+    # 从源点沿流量弧行走分解路径（遇到零代价环时直接擦除环）
+    paths = []
+    for _ in range(found):
+        path = [s]
+        position = {s: 0}
+        u = s
+        while u != t:
+            if not flow_out[u]:
+                break
+            v = dst[flow_out[u].pop()]
+            if v in position:
+                for x in path[position[v] + 1:]:
+                    del position[x]
+                del path[position[v] + 1:]
+            else:
+                position[v] = len(path)
+                path.append(v)
+            u = v
+        if u != t:
+            break
+        paths.append(path)
+
+    def path_cost(path):
+        return sum(w[graph.arc_index[(graph.node_ids[path[i]], graph.node_ids[path[i + 1]])]]
+                   for i in range(len(path) - 1))
+
+    paths.sort(key=path_cost)
+    return [[graph.node_ids[i] for i in path] for path in paths]
@@ -0,0 +1,216 @@
+"""
+链路/节点失效的 what-if 分析
+
+对当前活动流量逐个模拟失效场景（单链路、单节点、双链路），在去掉失效元素的路由图上
+重新运行 calculate_paths_with_allocation 的分配逻辑，统计丢失的流量与新的峰值利用率。
+各场景相互独立，场景较多时分发到进程池并行计算。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from algorithms.traffic import LoadBalancer, _allocate_on_balancer
+
+MAX_SCENARIOS = 2000         # 单次分析的场景数量硬上限
+PARALLEL_MIN_SCENARIOS = 16  # 场景数少于该值时在当前进程内串行计算
+LOSS_TOLERANCE = 1e-6        # 单条流的丢失量低于该值视为未丢失
+
+
+def _allocate_flows(balancer, flows, strategy, num_paths):
+    """在同一个账本上依次分配所有流，返回 (每条流的分配结果列表, 总分配流量)"""
+    results = []
+    total = 0.0
+    graph = balancer.graph
+    for flow in flows:
+        source, target, demand = flow['source'], flow['target'], flow['demand']
+        if source == target or not graph.has_node(source) or not graph.has_node(target):
+            results.append({'allocated': 0.0, 'paths': []})
+            continue
+        result = _allocate_on_balancer(balancer, source, target, demand, strategy, num_paths)
+        if 'error' in result:
+            results.append({'allocated': 0.0, 'paths': []})
+            continue
+        for path, allocation in zip(result['paths'], result['path_allocations']):
+            balancer.record_flow(path, allocation['flow'])
+        allocated = float(result['actual_flow'])
+        total += allocated
+        results.append({'allocated': allocated, 'paths': result['paths']})
+    return results, total
+
+
+def _peak_utilization(balancer):
+    """返回 (峰值利用率, 对应链路)"""
+    utilization = balancer.weight_overlay()[0]
+    if utilization.size == 0:
+        return 0.0, None
+    a = int(utilization.argmax())
+    u, v = balancer.graph.arc_keys[a]
+    return float(utilization[a]), {'from': u, 'to': v}
+
+
+# 进程池工作进程的共享上下文（由 initializer 设置，避免每个场景重复传输拓扑）
+_worker_context = {}
+
+
+def _make_context(nodes, edges, flows, strategy, num_paths, baseline):
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'flows': flows,
+        'strategy': strategy,
+        'num_paths': num_paths,
+        'baseline': baseline,
+    }
+
+
+def _init_worker(*args):
+    _worker_context.update(_make_context(*args))
+
+
+def _run_scenario(scenario, ctx=None):
+    """计算单个失效场景（可在工作进程或当前进程中执行）"""
+    if ctx is None:
+        ctx = _worker_context
+    failed_links = [tuple(link) for link in scenario.get('links', [])]
+    failed_nodes = scenario.get('nodes', [])
+    balancer = LoadBalancer(ctx['nodes'], ctx['edges'], {},
+                            failed_links=failed_links, failed_nodes=failed_nodes)
+    results, total = _allocate_flows(balancer, ctx['flows'], ctx['strategy'], ctx['num_paths'])
+
+    failed_pairs = {frozenset(link) for link in failed_links}
+    failed_node_set = set(failed_nodes)
+    affected = disconnected = 0
+    lost_demand = 0.0
+    for base, new, flow in zip(ctx['baseline'], results, ctx['flows']):
+        # 基线路径经过失效元素的流需要重路由
+        hit = False
+        for path in base['paths']:
+            if failed_node_set.intersection(path) or any(
+                    frozenset((path[i], path[i + 1])) in failed_pairs for i in range(len(path) - 1)):
+                hit = True
+                break
+        if hit:
+            affected += 1
+        if base['allocated'] > 0 and not new['paths']:
+            disconnected += 1
+        loss = base['allocated'] - new['allocated']
+        if loss > LOSS_TOLERANCE:  # 忽略浮点误差
+            lost_demand += loss
+
+    peak, peak_link = _peak_utilization(balancer)
+    return {
+        'type': scenario['type'],
+        'failed_links': [{'from': u, 'to': v} for u, v in failed_links],
+        'failed_nodes': list(failed_nodes),
+        'affected_flows': affected,
+        'disconnected_flows': disconnected,
+        'lost_demand': lost_demand,
+        'allocated_flow': total,
+        'peak_utilization': peak,
+        'peak_link': peak_link,
+    }
+
+
+def _build_scenarios(edges, baseline, include_nodes, include_double, max_scenarios):
+    """按优先级生成场景：单链路 -> 单节点 -> 双链路（优先包含承载基线流量的链路）"""
+    links = []
+    seen = set()
+    for edge in edges:
+        pair = frozenset((edge['from'], edge['to']))
+        if len(pair) == 2 and pair not in seen:
+            seen.add(pair)
+            links.append((edge['from'], edge['to']))
+
+    scenarios = [{'type': 'link', 'links': [link]} for link in links]
+    if include_nodes:
+        nodes_in_use = []
+        node_seen = set()
+        for edge in edges:
+            for n in (edge['from'], edge['to']):
+                if n not in node_seen:
+                    node_seen.add(n)
+                    nodes_in_use.append(n)
+        scenarios.extend({'type': 'node', 'nodes': [n]} for n in nodes_in_use)
+
+    if include_double and len(scenarios) < max_scenarios:
+        loaded = set()
+        for base in baseline:
+            for path in base['paths']:
+                for i in range(len(path) - 1):
+                    loaded.add(frozenset((path[i], path[i + 1])))
+        # 至少一条链路承载基线流量的组合排在前面
+        hot = [link for link in links if frozenset(link) in loaded]
+        cold = [link for link in links if frozenset(link) not in loaded]
+        pairs = list(combinations(hot, 2))
+        pairs.extend((a, b) for a in hot for b in cold)
+        for a, b in pairs:
+            if len(scenarios) >= max_scenarios:
+                break
+            scenarios.append({'type': 'double-link', 'links': [a, b]})
+
+    return scenarios[:max_scenarios]
+
+
+def analyze_failures(nodes, edges, flows, strategy='balanced', num_paths=3,
+                     include_nodes=True, include_double=False,
+                     max_scenarios=200, workers=None):
+    """
+    失效场景分析（供 /api/traffic/failure-analysis 使用）
+
+    Args:
+        nodes: 节点列表
+        edges: 边列表
+        flows: 活动流列表 [{'source': s, 'target': t, 'demand': d}, ...]（按顺序分配）
+        strategy: 分配策略 ('single' / 'balanced' / 'maxmin' / 'ecmp')
+        num_paths: 每条流的路径数量上限
+        include_nodes: 是否包含单节点失效场景
+        include_double: 是否包含双链路失效场景
+        max_scenarios: 场景数量上限（不超过 MAX_SCENARIOS）
+        workers: 进程池大小（默认且最多为 CPU 核数；为 1 时串行）
+
+    Returns:
+        包含基线结果、各场景结果（按丢失流量降序）与汇总的字典
+    """
+    start_time = time.perf_counter()
+    max_scenarios = max(0, min(int(max_scenarios), MAX_SCENARIOS))
+
+    # 基线：无失效时的分配
+    balancer = LoadBalancer(nodes, edges, {})
+    baseline, baseline_total = _allocate_flows(balancer, flows, strategy, num_paths)
+    baseline_peak, baseline_peak_link = _peak_utilization(balancer)
+
+    scenarios = _build_scenarios(edges, baseline, include_nodes, include_double, max_scenarios)
+
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = cpu_count
+    workers = max(1, min(int(workers), cpu_count, len(scenarios) or 1))
+    init_args = (nodes, edges, flows, strategy, num_paths, baseline)
+    if workers == 1 or len(scenarios) < PARALLEL_MIN_SCENARIOS:
+        ctx = _make_context(*init_args)
+        results = [_run_scenario(scenario, ctx) for scenario in scenarios]
+        workers = 1
+    else:
+        chunksize = max(1, len(scenarios) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            results = list(pool.map(_run_scenario, scenarios, chunksize=chunksize))
+
+    results.sort(key=lambda r: (-r['lost_demand'], -r['peak_utilization']))
+    return {
+        'baseline': {
+            'allocated_flow': baseline_total,
+            'requested_flow': sum(flow['demand'] for flow in flows),
+            'peak_utilization': baseline_peak,
+            'peak_link': baseline_peak_link,
+        },
+        'scenarios': results,
+        'summary': {
+            'num_scenarios': len(results),
+            'breaking_scenarios': sum(1 for r in results if r['lost_demand'] > 0),
+            'max_lost_demand': results[0]['lost_demand'] if results else 0.0,
+            'workers': workers,
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000,
+        },
+    }
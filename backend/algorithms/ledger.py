@@ -0,0 +1,339 @@
+"""
+链路使用账本（服务端保存，供仿真写入、仪表盘轮询）
+
+- 每条无向链路的已用流量与容量保存在 NumPy 数组中
+- 热点索引：按利用率排序的最大堆，随使用量变化增量维护（惰性删除过期条目）
+- 快照：逐链路利用率、直方图分桶与 Top-N 热点链路
+- 多用户共享：预留/释放为原子操作；路径计算在不持锁的只读副本上进行，
+  提交时按逐链路版本号做乐观校验，相关链路被他人修改过则重试
+账本同时提供 LoadBalancer 需要的 get / arc_array 接口，可直接作为 edge_usage 使用。
+"""
+
+import heapq
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from algorithms.routing_graph import topology_hash
+
+LEDGER_REGISTRY_SIZE = 16  # 服务端最多保留的账本数量
+LEDGER_IDLE_SECONDS = 600  # 登记表已满时，只有闲置超过该时长且无活动预留的账本才会被淘汰
+HEAP_COMPACT_FACTOR = 4    # 堆中条目超过链路数的该倍数时整体重建
+CAPACITY_TOLERANCE = 1e-9  # 预留容量校验的相对误差
+
+
+class LedgerConflict(Exception):
+    """预留失败：读取后相关链路已被其他请求修改，或预留量超过剩余容量"""
+
+
+class LedgerRegistryFull(Exception):
+    """登记表已满，且所有账本都仍在使用（有活动预留或最近被访问过）"""
+
+
+class LedgerView:
+    """账本在某一时刻的只读副本（附带逐链路版本号），分配计算期间无需持锁"""
+
+    def __init__(self, ledger, usage, link_version, version):
+        self.ledger = ledger
+        self.usage = usage
+        self.link_version = link_version
+        self.version = version
+
+    def get(self, key, default=0):
+        idx = self.ledger.link_index.get(key)
+        if idx is None:
+            return default
+        return float(self.usage[idx])
+
+    def __len__(self):
+        return len(self.ledger.link_index)
+
+    def arc_array(self, graph):
+        return self.usage[self.ledger.arc_links(graph)]
+
+
+class UsageLedger:
+    """按无向链路记录已用流量的账本"""
+
+    def __init__(self, nodes, edges, edge_usage=None):
+        """
+        Args:
+            nodes: 节点列表
+            edges: 边列表（同一对端点只保留一条链路，后出现的容量覆盖先出现的）
+            edge_usage: 初始使用情况字典 {(u,v): used_flow}
+        """
+        self.key = topology_hash(nodes, edges)
+        self.link_index = {}  # {(u,v): link_idx}，两个方向映射到同一条链路
+        self.links = []
+        capacities = []
+        for edge in edges:
+            u, v = edge['from'], edge['to']
+            idx = self.link_index.get((u, v))
+            if idx is None:
+                idx = len(self.links)
+                self.links.append((u, v))
+                capacities.append(edge.get('capacity', 1000))
+                self.link_index[(u, v)] = idx
+                self.link_index[(v, u)] = idx
+            else:
+                capacities[idx] = edge.get('capacity', 1000)
+        self.capacity = np.asarray(capacities, dtype=float)
+        self.usage = np.zeros(len(self.links), dtype=float)
+        self.version = 0
+        self.link_version = np.zeros(len(self.links), dtype=np.int64)  # 逐链路版本号，用于乐观校验
+        self.lock = threading.RLock()
+        self._reservations = {}  # {reservation_id: (链路下标数组, 流量数组)}
+        self._arc_links = {}  # {拓扑哈希: 弧下标 -> 链路下标数组}
+
+        for (u, v), flow in (edge_usage or {}).items():
+            idx = self.link_index.get((u, v))
+            if idx is not None:
+                # 与其他接口一致：两个方向取较大值
+                self.usage[idx] = max(self.usage[idx], flow)
+
+        self._stamp = [0] * len(self.links)  # 每条链路最新堆条目的版本
+        self._rebuild_heap()
+
+    # ---- LoadBalancer 使用的只读接口 ----
+
+    def get(self, key, default=0):
+        idx = self.link_index.get(key)
+        if idx is None:
+            return default
+        return float(self.usage[idx])
+
+    def __len__(self):
+        return len(self.link_index)
+
+    def arc_links(self, graph):
+        """RoutingGraph 弧下标 -> 链路下标数组（按拓扑缓存）"""
+        with self.lock:
+            arc_links = self._arc_links.get(graph.key)
+            if arc_links is None:
+                arc_links = np.fromiter((self.link_index[key] for key in graph.arc_keys), dtype=np.intp,
+                                        count=graph.num_arcs)
+                self._arc_links[graph.key] = arc_links
+            return arc_links
+
+    def arc_array(self, graph):
+        """按 RoutingGraph 弧下标对齐的使用量数组（一次花式索引完成）"""
+        return self.usage[self.arc_links(graph)]
+
+    def view(self):
+        """复制当前使用量与逐链路版本号，供不持锁的路径计算使用"""
+        with self.lock:
+            return LedgerView(self, self.usage.copy(), self.link_version.copy(), self.version)
+
+    # ---- 写入 ----
+
+    def utilization(self):
+        return np.divide(self.usage, self.capacity, out=np.zeros_like(self.usage), where=self.capacity > 0)
+
+    def _rebuild_heap(self):
+        util = self.utilization().tolist()
+        self._heap = [(-u, i, self._stamp[i]) for i, u in enumerate(util)]
+        heapq.heapify(self._heap)
+
+    def _touch(self, link_ids):
+        """为使用量发生变化的链路压入新的堆条目，旧条目在查询时惰性丢弃"""
+        link_ids = np.unique(link_ids)
+        util = (self.usage[link_ids] / np.where(self.capacity[link_ids] > 0, self.capacity[link_ids], np.inf))
+        for i, u in zip(link_ids.tolist(), util.tolist()):
+            self._stamp[i] += 1
+            heapq.heappush(self._heap, (-u, i, self._stamp[i]))
+        if len(self._heap) > HEAP_COMPACT_FACTOR * len(self.links) + 64:
+            self._rebuild_heap()
+
+    def add(self, link_ids, amounts):
+        """按链路下标累加流量（amounts 为负表示释放，结果截断到 0）"""
+        link_ids = np.asarray(link_ids, dtype=np.intp)
+        if link_ids.size == 0:
+            return
+        with self.lock:
+            np.add.at(self.usage, link_ids, amounts)
+            self.usage[link_ids] = np.maximum(self.usage[link_ids], 0)  # 消除浮点误差
+            self.version += 1
+            self.link_version[link_ids] += 1
+            self._touch(link_ids)
+
+    def path_links(self, paths, flows):
+        """把 (路径, 流量) 列表展开为 (链路下标数组, 流量数组)，零流量路径跳过"""
+        link_ids, amounts = [], []
+        for path, flow in zip(paths, flows):
+            if flow <= 0:
+                continue
+            for i in range(len(path) - 1):
+                idx = self.link_index.get((path[i], path[i + 1]))
+                if idx is None:
+                    raise ValueError(f"链路 ({path[i]}, {path[i + 1]}) 不存在")
+                link_ids.append(idx)
+                amounts.append(float(flow))
+        return np.asarray(link_ids, dtype=np.intp), np.asarray(amounts, dtype=float)
+
+    def add_path(self, path, flow):
+        """将一条路径上的流量记入账本"""
+        self.add(*self.path_links([path], [flow]))
+
+    def reserve(self, link_ids, amounts, expected_versions=None, enforce_capacity=True):
+        """
+        原子预留：全部链路校验通过后一次性记入账本，否则不做任何修改
+
+        Args:
+            link_ids: 链路下标数组（允许重复，同一链路的流量累加）
+            amounts: 各链路预留的流量
+            expected_versions: 读取时这些链路的版本号；任一链路版本已变化则视为冲突
+            enforce_capacity: 是否要求预留后不超过链路容量
+
+        Returns:
+            reservation_id，用于 release
+
+        Raises:
+            LedgerConflict: 版本校验或容量校验失败
+        """
+        link_ids = np.asarray(link_ids, dtype=np.intp)
+        amounts = np.asarray(amounts, dtype=float)
+        if link_ids.size == 0:
+            raise ValueError("预留的链路不能为空")
+        if (amounts < 0).any():
+            raise ValueError("预留流量不能为负数")
+        with self.lock:
+            if expected_versions is not None and \
+                    not np.array_equal(self.link_version[link_ids], np.asarray(expected_versions)):
+                raise LedgerConflict("链路使用量已被其他请求修改")
+            if enforce_capacity:
+                touched, position = np.unique(link_ids, return_inverse=True)
+                demand = np.bincount(position, weights=amounts)
+                capacity = self.capacity[touched]
+                if (self.usage[touched] + demand > capacity * (1 + CAPACITY_TOLERANCE)).any():
+                    raise LedgerConflict("预留流量超过链路剩余容量")
+            self.add(link_ids, amounts)
+            reservation_id = uuid.uuid4().hex
+            self._reservations[reservation_id] = (link_ids, amounts)
+            return reservation_id
+
+    def reservation_count(self):
+        """当前活动预留的数量"""
+        with self.lock:
+            return len(self._reservations)
+
+    def release(self, reservation_id):
+        """释放一次预留，返回是否存在该预留（重复释放不会重复扣减）"""
+        with self.lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is None:
+                return False
+            link_ids, amounts = reservation
+            self.add(link_ids, -amounts)
+            return True
+
+    # ---- 查询 ----
+
+    def hotspots(self, n=10):
+        """利用率最高的 n 条链路下标（从堆顶取出有效条目后再放回）"""
+        with self.lock:
+            result = []
+            valid = []
+            while self._heap and len(result) < n:
+                entry = heapq.heappop(self._heap)
+                if entry[2] != self._stamp[entry[1]]:
+                    continue  # 过期条目直接丢弃
+                valid.append(entry)
+                result.append(entry[1])
+            for entry in valid:
+                heapq.heappush(self._heap, entry)
+            return result
+
+    def snapshot(self, top_n=10, bins=10, include_links=True):
+        """
+        全网利用率快照
+
+        Args:
+            top_n: 返回的热点链路数量
+            bins: 直方图分桶数（[0, 1] 等分，超过 1 的计入最后一桶）
+            include_links: 是否返回逐链路利用率
+
+        Returns:
+            {'version', 'links', 'histogram', 'hotspots', 'summary'}
+        """
+        with self.lock:
+            usage = self.usage.copy()
+            version = self.version
+            hot = self.hotspots(top_n)
+        capacity = self.capacity
+        util = np.divide(usage, capacity, out=np.zeros_like(usage), where=capacity > 0)
+
+        def link_info(i):
+            u, v = self.links[i]
+            return {
+                'from': u,
+                'to': v,
+                'capacity': float(capacity[i]),
+                'usage': float(usage[i]),
+                'utilization': float(util[i]),
+            }
+
+        counts, bin_edges = np.histogram(np.clip(util, 0, 1), bins=bins, range=(0.0, 1.0))
+        result = {
+            'version': version,
+            'histogram': [
+                {'low': float(bin_edges[i]), 'high': float(bin_edges[i + 1]), 'count': int(counts[i])}
+                for i in range(len(counts))
+            ],
+            'hotspots': [link_info(i) for i in hot],
+            'summary': {
+                'num_links': len(self.links),
+                'total_usage': float(usage.sum()),
+                'mean_utilization': float(util.mean()) if util.size else 0.0,
+                'max_utilization': float(util.max()) if util.size else 0.0,
+                'over_capacity': int(np.count_nonzero(util > 1)),
+                'reservations': len(self._reservations),
+            },
+        }
+        if include_links:
+            result['links'] = [link_info(i) for i in range(len(self.links))]
+        return result
+
+
+_registry = OrderedDict()  # {ledger_id: (账本, 最近访问时间)}，按访问先后排列
+_registry_lock = threading.Lock()
+
+
+def create_ledger(nodes, edges, edge_usage=None):
+    """
+    创建账本并登记到服务端，返回 (ledger_id, ledger)
+
+    登记表已满时，从最久未访问的账本开始，淘汰一个闲置超过 LEDGER_IDLE_SECONDS 且没有活动预留的账本；
+    所有账本都仍在使用时抛出 LedgerRegistryFull，不会让其他用户的账本在使用中失效。
+    """
+    ledger = UsageLedger(nodes, edges, edge_usage)
+    ledger_id = uuid.uuid4().hex
+    now = time.monotonic()
+    with _registry_lock:
+        if len(_registry) >= LEDGER_REGISTRY_SIZE:
+            idle = next((key for key, (old, last_access) in _registry.items()
+                         if now - last_access > LEDGER_IDLE_SECONDS and old.reservation_count() == 0), None)
+            if idle is None:
+                raise LedgerRegistryFull(f"服务端账本已达上限 {LEDGER_REGISTRY_SIZE} 个且均在使用中")
+            del _registry[idle]
+        _registry[ledger_id] = (ledger, now)
+    return ledger_id, ledger
+
+
+def get_ledger(ledger_id):
+    """按ID获取账本（并刷新其访问时间），不存在时返回 None"""
+    with _registry_lock:
+        entry = _registry.get(ledger_id)
+        if entry is None:
+            return None
+        _registry[ledger_id] = (entry[0], time.monotonic())
+        _registry.move_to_end(ledger_id)
+        return entry[0]
+
+
+def delete_ledger(ledger_id):
+    """删除账本，返回是否存在该账本"""
+    with _registry_lock:
+        return _registry.pop(ledger_id, None) is not None
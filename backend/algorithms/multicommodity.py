@@ -0,0 +1,253 @@
+"""
+多商品流：最大并发流的 (1-ε) 近似求解（Garg–Könemann / Fleischer）
+
+与逐个分配需求不同，这里同时考虑整个需求矩阵，求所有需求能同时按同一比例 λ 满足的最大 λ：
+- 每条无向链路维护长度 l_e（初值 δ/c_e），在长度意义下的最短路上推送流量，
+  推送后按 l_e *= 1 + ε·f_e/c_e 增长；当 D(l) = Σ c_e·l_e ≥ 1 时停止
+- Fleischer 的分组：同一源节点的所有需求共用一棵最短路径树，一次推送一整棵树上的流
+- 最短路径使用 RoutingGraph 的数组化 Dijkstra；结束时按最大拥塞比例缩放得到可行流，
+  并用最终长度给出 λ 的对偶上界
+"""
+
+import heapq
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorithms.routing_graph import INF, get_routing_graph
+
+MIN_EPSILON = 0.05            # ε 过小时 δ 下溢且阶段数激增
+MAX_EPSILON = 0.5
+PARALLEL_MIN_SOURCES = 16     # 源节点少于该值时在当前进程内串行计算
+
+
+def _link_structure(graph):
+    """把有向弧映射到无向链路：返回 (弧 -> 链路下标数组, 链路容量数组, 链路代表弧数组)"""
+    arc_ids = np.arange(graph.num_arcs)
+    representative = np.minimum(arc_ids, graph.reverse_arc)
+    links, arc_link = np.unique(representative, return_inverse=True)
+    return arc_link, graph.capacity[links], links
+
+
+def _widest_paths(graph, source_idx):
+    """以链路容量为宽度的最宽路径（瓶颈最大路径），返回到各节点的瓶颈容量列表"""
+    capacity = graph.capacity.tolist()
+    indptr, indices = graph._indptr, graph._indices
+    width = [0.0] * graph.num_nodes
+    width[source_idx] = INF
+    heap = [(-INF, source_idx)]
+    while heap:
+        w, u = heapq.heappop(heap)
+        w = -w
+        if w < width[u]:
+            continue
+        for a in range(indptr[u], indptr[u + 1]):
+            nw = min(w, capacity[a])
+            v = indices[a]
+            if nw > width[v]:
+                width[v] = nw
+                heapq.heappush(heap, (-nw, v))
+    return width
+
+
+# 进程池工作进程的共享上下文（由 initializer 设置，避免每个任务重复传输拓扑）
+_worker_context = {}
+
+
+def _init_worker(nodes, edges):
+    _worker_context['graph'] = get_routing_graph(nodes, edges)
+
+
+def _widest_task(source_idx):
+    return _widest_paths(_worker_context['graph'], source_idx)
+
+
+def _distance_task(args):
+    source_idx, lengths = args
+    return _worker_context['graph'].dijkstra(source_idx, lengths)[0]
+
+
+def max_concurrent_flow(nodes, edges, demands, epsilon=0.1, workers=None):
+    """
+    最大并发多商品流的 (1-ε) 近似（供 /api/traffic/multicommodity 使用）
+
+    Args:
+        nodes: 节点列表
+        edges: 边列表（链路容量取 capacity，两个方向共享）
+        demands: 需求列表 [{'source': s, 'target': t, 'demand': d}, ...]
+        epsilon: 近似参数 ε（0.05 ~ 0.5，越小越精确、越慢）
+        workers: 进程池大小（默认且最多为 CPU 核数；为 1 时串行）。用于各源节点相互独立的
+            预处理（最宽路径）与对偶上界计算；长度更新的主循环本质上是顺序的
+
+    Returns:
+        包含一致缩放因子 scaling_factor（λ）、对偶上界、逐需求与逐链路流量的字典
+    """
+    start_time = time.perf_counter()
+    if not MIN_EPSILON <= epsilon <= MAX_EPSILON:
+        raise ValueError(f"epsilon 必须在 {MIN_EPSILON} 到 {MAX_EPSILON} 之间")
+
+    graph = get_routing_graph(nodes, edges)
+    index = graph.index
+    commodities = []
+    for item in demands:
+        s, t, d = item['source'], item['target'], float(item['demand'])
+        if s not in index or t not in index:
+            raise ValueError(f"需求 ({s}, {t}) 的端点不存在")
+        if s == t or d <= 0:
+            continue
+        commodities.append((index[s], index[t], d))
+    if not commodities:
+        raise ValueError("没有有效的需求")
+
+    arc_link, link_capacity, link_arcs = _link_structure(graph)
+    num_links = link_capacity.size
+    pair_arc = {(u, v): a for a, (u, v) in enumerate(zip(graph.arc_src.tolist(), graph.indices.tolist()))}
+
+    sources = sorted({s for s, _, _ in commodities})
+    by_source = {s: [] for s in sources}
+    for j, (s, t, _) in enumerate(commodities):
+        by_source[s].append(j)
+    targets = np.array([t for _, t, _ in commodities], dtype=np.intp)
+    demand = np.array([d for _, _, d in commodities], dtype=float)
+
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = cpu_count
+    workers = max(1, min(int(workers), cpu_count, len(sources)))
+    pool = None
+    if workers > 1 and len(sources) >= PARALLEL_MIN_SOURCES:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(nodes, edges))
+    else:
+        workers = 1
+
+    try:
+        # 预缩放：单独走最宽路径时 λ* ≥ min_j 宽度_j / (k·d_j)，据此把 λ* 调到不小于 1
+        if pool is None:
+            widths = [_widest_paths(graph, s) for s in sources]
+        else:
+            widths = list(pool.map(_widest_task, sources))
+        width_of = dict(zip(sources, widths))
+        bottleneck = np.array([width_of[s][t] for s, t, _ in commodities])
+        unreachable = [j for j in range(len(commodities)) if bottleneck[j] <= 0]
+        if unreachable:
+            return {
+                'scaling_factor': 0.0,
+                'upper_bound': 0.0,
+                'epsilon': epsilon,
+                'unreachable': [
+                    {'source': graph.node_ids[commodities[j][0]], 'target': graph.node_ids[commodities[j][1]]}
+                    for j in unreachable
+                ],
+                'commodities': [],
+                'link_loads': [],
+                'stats': {'phases': 0, 'elapsed_ms': (time.perf_counter() - start_time) * 1000},
+            }
+        zeta = float((bottleneck / demand).min()) / len(commodities)
+        scaled = demand * zeta
+
+        # 初始长度 l_e = δ / c_e
+        log_delta = math.log1p(epsilon) - math.log((1 + epsilon) * num_links) / epsilon
+        delta = math.exp(log_delta)
+        positive = link_capacity > 0
+        lengths = np.where(positive, delta / np.where(positive, link_capacity, 1), INF)
+        load = np.zeros(num_links)
+        routed = np.zeros(len(commodities))  # 各需求累计推送量（未缩放）
+        phase_limit = math.ceil(-log_delta / math.log1p(epsilon))  # 超过后需求加倍
+        phases = 0
+        sp_calls = 0
+
+        def total_length():
+            return float(np.dot(link_capacity[positive], lengths[positive]))
+
+        while total_length() < 1:
+            for s in sources:
+                group = np.asarray(by_source[s], dtype=np.intp)
+                remaining = scaled[group].copy()
+                while remaining.max() > 1e-12 and total_length() < 1:
+                    dist, pred = graph.dijkstra(s, lengths[arc_link])
+                    sp_calls += 1
+                    reached = [v for v in range(graph.num_nodes) if dist[v] < INF]
+                    # 沿最短路径树把各目标的剩余需求汇总到弧上（按距离从远到近，子节点先于父节点）
+                    node_demand = np.zeros(graph.num_nodes)
+                    np.add.at(node_demand, targets[group], remaining)
+                    node_demand = node_demand.tolist()
+                    arc_flow = np.zeros(graph.num_arcs)
+                    for v in sorted(reached, key=dist.__getitem__, reverse=True):
+                        if node_demand[v] > 0 and v != s:
+                            u = pred[v]
+                            arc_flow[pair_arc[(u, v)]] += node_demand[v]
+                            node_demand[u] += node_demand[v]
+                    link_flow = np.bincount(arc_link, weights=arc_flow, minlength=num_links)
+
+                    # 单次推送不超过任何链路的容量
+                    sigma = max(1.0, float((link_flow[positive] / link_capacity[positive]).max()))
+                    link_flow /= sigma
+                    load += link_flow
+                    lengths[positive] *= 1 + epsilon * link_flow[positive] / link_capacity[positive]
+                    routed[group] += remaining / sigma
+                    remaining -= remaining / sigma
+            phases += 1
+            if phases % phase_limit == 0:
+                # λ* 仍远大于 1：需求加倍以减少阶段数（Garg–Könemann 的加倍技巧）
+                scaled *= 2
+
+        # 按最大拥塞缩放得到可行流
+        congestion = float((load[positive] / link_capacity[positive]).max())
+        mu = max(congestion, 1e-300)
+        flow_ratio = routed / mu / demand
+        scaling_factor = float(flow_ratio.min())
+
+        # 对偶上界：λ* ≤ D(l) / Σ_j d_j·dist_l(s_j, t_j)
+        arc_lengths = lengths[arc_link]
+        if pool is None:
+            dists = [graph.dijkstra(s, arc_lengths)[0] for s in sources]
+        else:
+            dists = list(pool.map(_distance_task, [(s, arc_lengths) for s in sources]))
+        dist_of = dict(zip(sources, dists))
+        alpha = sum(d * dist_of[s][t] for s, t, d in commodities)
+        upper_bound = total_length() / alpha if alpha > 0 else INF
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    link_loads = []
+    scaled_load = load / mu
+    for e in range(num_links):
+        u, v = graph.arc_keys[link_arcs[e]]
+        capacity = float(link_capacity[e])
+        link_loads.append({
+            'from': u,
+            'to': v,
+            'capacity': capacity,
+            'load': float(scaled_load[e]),
+            'utilization': float(scaled_load[e] / capacity) if capacity > 0 else 0.0,
+        })
+
+    return {
+        'scaling_factor': scaling_factor,
+        'upper_bound': upper_bound,
+        'epsilon': epsilon,
+        'commodities': [
+            {
+                'source': graph.node_ids[s],
+                'target': graph.node_ids[t],
+                'demand': d,
+                'routed': float(routed[j] / mu),
+                'ratio': float(flow_ratio[j]),
+            }
+            for j, (s, t, d) in enumerate(commodities)
+        ],
+        'link_loads': link_loads,
+        'stats': {
+            'num_commodities': len(commodities),
+            'num_sources': len(sources),
+            'num_links': num_links,
+            'phases': phases,
+            'shortest_path_calls': sp_calls,
+            'workers': workers,
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000,
+        },
+    }
@@ -0,0 +1,386 @@
+"""
+源-目的节点连通可靠性的蒙特卡洛估计
+
+每条链路按各自的失效概率独立失效，估计两点之间：
+- 保持连通的概率
+- 最大流不低于 min_flow 的概率（可选）
+
+采样以 NumPy 布尔矩阵 (样本数, 链路数) 成批生成，每批在 (样本数, 节点数) 的父节点矩阵上
+运行按链路向量化的并查集判断连通性；最大流只对连通的样本计算，并按存活掩码去重。
+样本预算被切分为若干块，每块使用独立的随机子序列（结果与进程数无关），块较多时分发到进程池，
+估计值附带 Wilson 置信区间。
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+MAX_SAMPLES = 1000000          # 单次估计的样本数量硬上限
+DEFAULT_BATCH_SIZE = 1024      # 每批并查集同时处理的样本数
+BATCHES_PER_CHUNK = 8          # 每个进程池任务包含的批数
+PARALLEL_MIN_CHUNKS = 4        # 块数少于该值时在当前进程内串行计算
+PARENT_MATRIX_BUDGET = 1 << 22  # 父节点矩阵元素数上限（大拓扑自动缩小批大小）
+COMPRESS_INTERVAL = 64         # 每处理多少条链路对父节点矩阵做一次整体指针跳跃
+
+
+def _build_links(nodes, edges, failure_probability):
+    """
+    收集参与采样的物理链路（重边各自独立失效，自环忽略）
+
+    Returns:
+        (node_ids, index, link_u, link_v, capacity, probability)
+    """
+    node_ids = [node['id'] if isinstance(node, dict) else node for node in nodes]
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    link_u, link_v, capacity, probability = [], [], [], []
+    for edge in edges:
+        for node_id in (edge['from'], edge['to']):
+            if node_id not in index:
+                index[node_id] = len(node_ids)
+                node_ids.append(node_id)
+        u, v = index[edge['from']], index[edge['to']]
+        if u == v:
+            continue
+        p = float(edge.get('failure_probability', failure_probability))
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"链路 ({edge['from']}, {edge['to']}) 的失效概率必须在 [0, 1] 之间")
+        link_u.append(u)
+        link_v.append(v)
+        capacity.append(float(edge.get('capacity', 1000)))
+        probability.append(p)
+    return (
+        node_ids,
+        index,
+        np.asarray(link_u, dtype=np.intp),
+        np.asarray(link_v, dtype=np.intp),
+        np.asarray(capacity, dtype=float),
+        np.asarray(probability, dtype=float),
+    )
+
+
+def _find(parent, rows, x):
+    """批量查找：rows 中每个样本里节点 x 的根，并把 x 直接挂到根上"""
+    root = parent[rows, x]
+    while True:
+        up = parent[rows, root]
+        if np.array_equal(up, root):
+            break
+        root = up
+    parent[rows, x] = root
+    return root
+
+
+def batch_connected(alive, link_u, link_v, num_nodes, source, target):
+    """
+    向量化并查集：判断每个样本中 source 与 target 是否连通
+
+    Args:
+        alive: (B, E) 布尔矩阵，True 表示该样本中链路存活
+        link_u, link_v: 每条链路的端点内部下标
+        num_nodes: 节点数
+        source, target: 源/目的节点内部下标
+
+    Returns:
+        长度为 B 的布尔数组
+    """
+    batch = alive.shape[0]
+    parent = np.tile(np.arange(num_nodes, dtype=np.intp), (batch, 1))
+    for e in range(alive.shape[1]):
+        rows = np.flatnonzero(alive[:, e])
+        if rows.size:
+            ru = _find(parent, rows, link_u[e])
+            rv = _find(parent, rows, link_v[e])
+            # 编号较大的根挂到较小的根下（ru == rv 时为空操作）
+            parent[rows, np.maximum(ru, rv)] = np.minimum(ru, rv)
+        if (e + 1) % COMPRESS_INTERVAL == 0:
+            # 整体指针跳跃一次，树高减半，避免后续查找链过长
+            parent = np.take_along_axis(parent, parent, axis=1)
+    all_rows = np.arange(batch)
+    return _find(parent, all_rows, source) == _find(parent, all_rows, target)
+
+
+class _FlowNetwork:
+    """存活链路上的残量网络（链路 e 对应弧 2e: u->v 与 2e+1: v->u，结构只构建一次）"""
+
+    def __init__(self, link_u, link_v, capacity, num_nodes):
+        self.num_nodes = num_nodes
+        self.capacity = capacity
+        self.head = np.column_stack((link_v, link_u)).ravel().tolist()  # 弧终点
+        self.adj = [[] for _ in range(num_nodes)]
+        for e, (u, v) in enumerate(zip(link_u.tolist(), link_v.tolist())):
+            self.adj[u].append(2 * e)
+            self.adj[v].append(2 * e + 1)
+
+    def reaches(self, alive_row, source, target, demand):
+        """
+        判断单个样本中 source -> target 的最大流是否不低于 demand
+
+        Dinic 算法（迭代式 DFS），累计流量达到 demand 即停止，无需求出完整最大流。
+        """
+        residual = np.repeat(np.where(alive_row, self.capacity, 0.0), 2).tolist()
+        head, adj, n = self.head, self.adj, self.num_nodes
+        flow = 0.0
+        while True:
+            # BFS 分层
+            level = [-1] * n
+            level[source] = 0
+            queue = [source]
+            for u in queue:
+                for a in adj[u]:
+                    v = head[a]
+                    if residual[a] > 0 and level[v] < 0:
+                        level[v] = level[u] + 1
+                        queue.append(v)
+            if level[target] < 0:
+                return flow >= demand - 1e-9
+
+            it = [0] * n
+            while True:
+                # 沿层次图寻找一条增广路径（path 记录弧下标）
+                path = []
+                u = source
+                while u != target:
+                    arcs = adj[u]
+                    i = it[u]
+                    while i < len(arcs):
+                        a = arcs[i]
+                        if residual[a] > 0 and level[head[a]] == level[u] + 1:
+                            break
+                        i += 1
+                    it[u] = i
+                    if i < len(arcs):
+                        path.append(arcs[i])
+                        u = head[arcs[i]]
+                        continue
+                    # 死路：从层次图中剪掉 u 并回退一步
+                    level[u] = -1
+                    if not path:
+                        break
+                    a = path.pop()
+                    u = head[a ^ 1]
+                if u != target:
+                    break
+                pushed = min(demand - flow, min(residual[a] for a in path))
+                for a in path:
+                    residual[a] -= pushed
+                    residual[a ^ 1] += pushed
+                flow += pushed
+                if flow >= demand - 1e-9:
+                    return True
+
+
+def _wilson_interval(successes, samples, z):
+    """二项比例的 Wilson 置信区间"""
+    if samples == 0:
+        return 0.0, 1.0
+    p = successes / samples
+    denom = 1 + z * z / samples
+    center = (p + z * z / (2 * samples)) / denom
+    half = z * math.sqrt(p * (1 - p) / samples + z * z / (4 * samples * samples)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+# 进程池工作进程的共享上下文（由 initializer 设置，避免每个任务重复传输拓扑）
+_worker_context = {}
+
+
+def _make_context(link_u, link_v, capacity, probability, num_nodes, source, target, min_flow, batch_size):
+    return {
+        'link_u': link_u,
+        'link_v': link_v,
+        'capacity': capacity,
+        'probability': probability,
+        'num_nodes': num_nodes,
+        'source': source,
+        'target': target,
+        'min_flow': min_flow,
+        'batch_size': batch_size,
+    }
+
+
+def _init_worker(*args):
+    _worker_context.update(_make_context(*args))
+
+
+def _run_chunk(task, ctx=None):
+    """
+    计算一个样本块
+
+    Args:
+        task: (样本数, 随机子序列)
+
+    Returns:
+        (样本数, 连通样本数, 满足最小流样本数, 失效链路总数)
+    """
+    if ctx is None:
+        ctx = _worker_context
+    num_samples, seed_seq = task
+    rng = np.random.default_rng(seed_seq)
+    link_u, link_v = ctx['link_u'], ctx['link_v']
+    capacity, probability = ctx['capacity'], ctx['probability']
+    source, target, min_flow = ctx['source'], ctx['target'], ctx['min_flow']
+
+    # 相同存活掩码的判定结果只计算一次（失效概率较低时大量样本完全相同）
+    flow_cache = {}
+    if min_flow is not None:
+        network = ctx.get('network')
+        if network is None:
+            network = ctx['network'] = _FlowNetwork(link_u, link_v, capacity, ctx['num_nodes'])
+        cap_at_source = np.where(link_u == source, capacity, 0) + np.where(link_v == source, capacity, 0)
+        cap_at_target = np.where(link_u == target, capacity, 0) + np.where(link_v == target, capacity, 0)
+
+    connected_count = flow_count = failed_links = 0
+    remaining = num_samples
+    while remaining > 0:
+        batch = min(ctx['batch_size'], remaining)
+        remaining -= batch
+        alive = rng.random((batch, link_u.size)) >= probability
+        failed_links += int(alive.size - np.count_nonzero(alive))
+        connected = batch_connected(alive, link_u, link_v, ctx['num_nodes'], source, target)
+        connected_count += int(np.count_nonzero(connected))
+        if min_flow is None:
+            continue
+
+        candidates = np.flatnonzero(connected)
+        if candidates.size == 0:
+            continue
+        # 源/汇关联的存活容量之和是最大流的上界，不满足时无需求解
+        bound = np.minimum(alive[candidates] @ cap_at_source, alive[candidates] @ cap_at_target)
+        for row in candidates[bound >= min_flow]:
+            key = np.packbits(alive[row]).tobytes()
+            ok = flow_cache.get(key)
+            if ok is None:
+                ok = flow_cache[key] = network.reaches(alive[row], source, target, min_flow)
+            if ok:
+                flow_count += 1
+
+    return num_samples, connected_count, flow_count, failed_links
+
+
+def estimate_reliability(nodes, edges, source, target, failure_probability=0.01,
+                         samples=10000, min_flow=None, confidence=0.95,
+                         tolerance=None, batch_size=DEFAULT_BATCH_SIZE, seed=None, workers=None):
+    """
+    蒙特卡洛可靠性估计（供 /api/network/reliability 使用）
+
+    Args:
+        nodes: 节点列表
+        edges: 边列表（可用 'failure_probability' 字段覆盖单条链路的失效概率）
+        source: 源节点ID
+        target: 目的节点ID
+        failure_probability: 默认的链路独立失效概率
+        samples: 样本预算（不超过 MAX_SAMPLES）
+        min_flow: 给定时同时估计最大流不低于该值的概率
+        confidence: 置信水平
+        tolerance: 给定时置信区间半宽小于该值即提前停止（按块顺序判断，结果可复现）
+        batch_size: 每批样本数
+        seed: 随机种子
+        workers: 进程池大小（默认且最多为 CPU 核数；为 1 时串行）
+
+    Returns:
+        包含连通概率（及最小流满足概率）、置信区间与采样统计的字典
+    """
+    start_time = time.perf_counter()
+    samples = int(samples)
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f"样本数必须在 1 到 {MAX_SAMPLES} 之间")
+    if not 0 < confidence < 1:
+        raise ValueError("置信水平必须在 (0, 1) 之间")
+    if not 0.0 <= failure_probability <= 1.0:
+        raise ValueError("失效概率必须在 [0, 1] 之间")
+    if min_flow is not None and min_flow < 0:
+        raise ValueError("min_flow 不能为负数")
+
+    node_ids, index, link_u, link_v, capacity, probability = _build_links(nodes, edges, failure_probability)
+    if source not in index or target not in index:
+        raise ValueError("源节点或目的节点不存在")
+    if source == target:
+        raise ValueError("源节点与目的节点不能相同")
+    s, t = index[source], index[target]
+    num_nodes = len(node_ids)
+
+    # 父节点矩阵 (B, V) 的规模受限，大拓扑自动缩小批大小
+    batch_size = max(1, min(int(batch_size), PARENT_MATRIX_BUDGET // max(num_nodes, 1)))
+    chunk_size = batch_size * BATCHES_PER_CHUNK
+    num_chunks = -(-samples // chunk_size)
+    children = np.random.SeedSequence(seed).spawn(num_chunks)
+    tasks = [
+        (min(chunk_size, samples - i * chunk_size), children[i])
+        for i in range(num_chunks)
+    ]
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    totals = [0, 0, 0, 0]  # 样本数, 连通数, 满足最小流数, 失效链路数
+
+    def _done():
+        # 置信区间半宽（取需要估计的各项中最宽者）满足要求
+        if tolerance is None:
+            return False
+        counts = [totals[1]] if min_flow is None else [totals[1], totals[2]]
+        for count in counts:
+            low, high = _wilson_interval(count, totals[0], z)
+            if (high - low) / 2 > tolerance:
+                return False
+        return True
+
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = cpu_count
+    workers = max(1, min(int(workers), cpu_count, num_chunks))
+    init_args = (link_u, link_v, capacity, probability, num_nodes, s, t, min_flow, batch_size)
+    if workers == 1 or num_chunks < PARALLEL_MIN_CHUNKS:
+        workers = 1
+        ctx = _make_context(*init_args)
+        for task in tasks:
+            for i, value in enumerate(_run_chunk(task, ctx)):
+                totals[i] += value
+            if _done():
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            futures = [pool.submit(_run_chunk, task) for task in tasks]
+            # 按块顺序汇总，提前停止时取消尚未开始的块
+            for future in futures:
+                for i, value in enumerate(future.result()):
+                    totals[i] += value
+                if _done():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+    used, connected, flow_ok, failed_links = totals
+
+    def _estimate(count):
+        low, high = _wilson_interval(count, used, z)
+        return {
+            'probability': count / used,
+            'successes': count,
+            'ci_low': low,
+            'ci_high': high,
+        }
+
+    result = {
+        'source': source,
+        'target': target,
+        'connectivity': _estimate(connected),
+        'samples': used,
+        'sample_budget': samples,
+        'confidence': confidence,
+        'stats': {
+            'num_nodes': num_nodes,
+            'num_links': int(link_u.size),
+            'mean_failed_links': failed_links / used,
+            'batch_size': batch_size,
+            'chunks': -(-used // chunk_size),
+            'workers': workers,
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000,
+        },
+    }
+    if min_flow is not None:
+        result['min_flow'] = min_flow
+        result['flow'] = _estimate(flow_ok)
+    return result
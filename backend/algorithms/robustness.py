@@ -0,0 +1,192 @@
+"""
+网络鲁棒性分析（桥、割点、2-边连通分量、2-点连通分量）
+
+一次迭代式 Tarjan DFS（不使用递归，避免大规模校园网栈溢出）同时求出：
+- 桥（关键边）与割点（关键节点）
+- 2-边连通分量：去掉所有桥之后的连通块
+- 2-点连通分量（双连通分量）：按边划分的块
+总复杂度 O(V+E)，结果按拓扑哈希缓存。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from algorithms.routing_graph import topology_hash
+
+ROBUSTNESS_CACHE_SIZE = 32  # 最多缓存的拓扑数量
+
+
+def _sorted_ids(ids):
+    """节点ID排序（混合类型时按字符串排序）"""
+    ids = list(ids)
+    try:
+        return sorted(ids)
+    except TypeError:
+        return sorted(ids, key=str)
+
+
+def analyze_robustness(nodes, edges):
+    """
+    鲁棒性分析
+
+    Args:
+        nodes: 节点列表
+        edges: 边列表（按无向边处理，允许重边）
+
+    Returns:
+        {'bridges', 'articulation_points', 'two_edge_connected_components',
+         'biconnected_components', 'stats'}
+    """
+    start_time = time.perf_counter()
+    node_ids = [node['id'] if isinstance(node, dict) else node for node in nodes]
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    for edge in edges:
+        for node_id in (edge['from'], edge['to']):
+            if node_id not in index:
+                index[node_id] = len(node_ids)
+                node_ids.append(node_id)
+
+    n = len(node_ids)
+    # 邻接表中记录边编号：跳过父边时按编号判断，重边不会被误判为桥
+    adj = [[] for _ in range(n)]
+    edge_ends = []
+    for eid, edge in enumerate(edges):
+        u, v = index[edge['from']], index[edge['to']]
+        edge_ends.append((u, v))
+        if u == v:
+            continue  # 自环不影响连通性
+        adj[u].append((v, eid))
+        adj[v].append((u, eid))
+
+    disc = [-1] * n
+    low = [0] * n
+    timer = 0
+    bridges = []
+    articulation = set()
+    two_edge_components = []
+    biconnected = []
+    num_components = 0
+
+    for root in range(n):
+        if disc[root] != -1:
+            continue
+        num_components += 1
+        disc[root] = low[root] = timer
+        timer += 1
+        root_children = 0
+        node_stack = [root]   # 2-边连通分量的节点栈
+        edge_stack = []       # 双连通分量的边栈
+        stack = [(root, -1, 0)]  # (节点, 进入该节点的边编号, 下一条待访问邻边下标)
+
+        while stack:
+            u, parent_eid, i = stack[-1]
+            if i < len(adj[u]):
+                stack[-1] = (u, parent_eid, i + 1)
+                v, eid = adj[u][i]
+                if eid == parent_eid:
+                    continue
+                if disc[v] == -1:
+                    # 树边
+                    disc[v] = low[v] = timer
+                    timer += 1
+                    edge_stack.append(eid)
+                    node_stack.append(v)
+                    stack.append((v, eid, 0))
+                    if u == root:
+                        root_children += 1
+                elif disc[v] < disc[u]:
+                    # 指向祖先的回边
+                    low[u] = min(low[u], disc[v])
+                    edge_stack.append(eid)
+                continue
+
+            # u 的所有邻边处理完毕，回溯到父节点
+            stack.pop()
+            if not stack:
+                break
+            p = stack[-1][0]
+            low[p] = min(low[p], low[u])
+
+            if low[u] >= disc[p]:
+                # p 将 u 所在子树与其余部分分隔：弹出一个双连通分量
+                if p != root:
+                    articulation.add(p)
+                block_edges = []
+                while True:
+                    eid = edge_stack.pop()
+                    block_edges.append(eid)
+                    if eid == parent_eid:
+                        break
+                biconnected.append(block_edges)
+
+            if low[u] > disc[p]:
+                # (p, u) 是桥：u 子树中尚未归属的节点构成一个 2-边连通分量
+                bridges.append(parent_eid)
+                component = []
+                while True:
+                    x = node_stack.pop()
+                    component.append(x)
+                    if x == u:
+                        break
+                two_edge_components.append(component)
+
+        if root_children > 1:
+            articulation.add(root)
+        two_edge_components.append(node_stack)
+
+    bridge_list = [
+        {'from': edges[eid]['from'], 'to': edges[eid]['to']}
+        for eid in bridges
+    ]
+    biconnected_list = []
+    for block_edges in biconnected:
+        block_nodes = set()
+        for eid in block_edges:
+            block_nodes.update(edge_ends[eid])
+        biconnected_list.append({
+            'nodes': _sorted_ids(node_ids[i] for i in block_nodes),
+            'edges': [{'from': edges[eid]['from'], 'to': edges[eid]['to']} for eid in block_edges],
+        })
+    two_edge_list = [_sorted_ids(node_ids[i] for i in comp) for comp in two_edge_components]
+
+    return {
+        'bridges': bridge_list,
+        'articulation_points': _sorted_ids(node_ids[i] for i in articulation),
+        'two_edge_connected_components': two_edge_list,
+        'biconnected_components': biconnected_list,
+        'stats': {
+            'num_nodes': n,
+            'num_edges': len(edges),
+            'connected_components': num_components,
+            'num_bridges': len(bridge_list),
+            'num_articulation_points': len(articulation),
+            'num_two_edge_connected_components': len(two_edge_list),
+            'num_biconnected_components': len(biconnected_list),
+            'is_two_edge_connected': num_components == 1 and not bridge_list,
+            'is_biconnected': num_components == 1 and n >= 2 and not articulation,
+            'time_ms': (time.perf_counter() - start_time) * 1000,
+        },
+    }
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_robustness(nodes, edges):
+    """按拓扑哈希获取（或计算并缓存）鲁棒性分析结果，返回 (结果, 是否命中缓存)"""
+    key = topology_hash(nodes, edges)
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            return result, True
+
+    result = analyze_robustness(nodes, edges)
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > ROBUSTNESS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result, False
@@ -0,0 +1,201 @@
+"""
+紧凑路由图（CSR 邻接 + 并行属性数组）
+
+LoadBalancer 每次请求都重建 NetworkX 有向图的开销较大，这里改为：
+- 按拓扑哈希缓存只读的 RoutingGraph（节点编号、CSR 邻接、weight/capacity/cost 数组）
+- 每次请求只需构造与链路占用相关的权重数组，再在 CSR 上运行 Dijkstra
+"""
+
+import hashlib
+import heapq
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+INF = float('inf')
+
+ROUTING_GRAPH_CACHE_SIZE = 32  # 最多缓存的拓扑数量
+
+
+def topology_hash(nodes, edges):
+    """计算拓扑哈希（节点ID + 边端点与 weight/capacity/cost 属性）"""
+    h = hashlib.blake2b(digest_size=16)
+    node_ids = [node['id'] if isinstance(node, dict) else node for node in nodes]
+    h.update(repr(node_ids).encode('utf-8'))
+    h.update(repr([
+        (
+            edge['from'],
+            edge['to'],
+            edge.get('weight', 1),
+            edge.get('capacity', 1000),
+            edge.get('cost', edge.get('weight', 1)),
+        )
+        for edge in edges
+    ]).encode('utf-8'))
+    return h.hexdigest()
+
+
+class RoutingGraph:
+    """只读的紧凑路由图（无向边展开为两条有向弧）"""
+
+    def __init__(self, nodes, edges, key=None):
+        self.key = key
+        self.node_ids = [node['id'] if isinstance(node, dict) else node for node in nodes]
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+
+        # 收集有向弧：同一方向重复出现时后者覆盖前者（与 DiGraph.add_edge 行为一致）
+        arcs = {}
+        for edge in edges:
+            attrs = (
+                edge.get('weight', 1),
+                edge.get('capacity', 1000),
+                edge.get('cost', edge.get('weight', 1)),
+            )
+            for u, v in ((edge['from'], edge['to']), (edge['to'], edge['from'])):
+                for node_id in (u, v):
+                    if node_id not in self.index:
+                        self.index[node_id] = len(self.node_ids)
+                        self.node_ids.append(node_id)
+                arcs[(u, v)] = attrs
+
+        n = len(self.node_ids)
+        # 按源节点排序得到 CSR 布局
+        order = sorted(arcs, key=lambda uv: self.index[uv[0]])
+        self.num_nodes = n
+        self.num_arcs = len(order)
+        self.arc_keys = order  # 弧下标 -> (u, v)，节点为原始ID
+        self.arc_index = {uv: a for a, uv in enumerate(order)}
+
+        self.arc_src = np.fromiter((self.index[u] for u, _ in order), dtype=np.int64, count=self.num_arcs)
+        self.indices = np.fromiter((self.index[v] for _, v in order), dtype=np.int64, count=self.num_arcs)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(self.indptr, self.arc_src + 1, 1)
+        np.cumsum(self.indptr, out=self.indptr)
+
+        self.weight = np.fromiter((arcs[uv][0] for uv in order), dtype=float, count=self.num_arcs)
+        self.capacity = np.fromiter((arcs[uv][1] for uv in order), dtype=float, count=self.num_arcs)
+        self.cost = np.fromiter((arcs[uv][2] for uv in order), dtype=float, count=self.num_arcs)
+        self._capacity_values = [arcs[uv][1] for uv in order]  # 保留原始数值类型，便于直接输出
+        # 反向弧下标（无向链路的另一方向）
+        self.reverse_arc = np.fromiter((self.arc_index[(v, u)] for u, v in order), dtype=np.int64,
+                                       count=self.num_arcs)
+
+        # Dijkstra 内循环使用 Python 列表，避免逐元素访问 NumPy 数组的开销
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+
+    def has_node(self, node_id):
+        return node_id in self.index
+
+    def arc(self, u, v):
+        """返回弧 (u,v) 的下标，不存在时返回 None"""
+        return self.arc_index.get((u, v))
+
+    def capacity_of(self, u, v, default=1000):
+        a = self.arc_index.get((u, v))
+        return default if a is None else self._capacity_values[a]
+
+    def failure_mask(self, failed_links=None, failed_nodes=None):
+        """
+        返回失效元素对应的弧掩码（True 表示该弧不可用）
+
+        Args:
+            failed_links: 失效链路 [(u, v), ...]（无向，两个方向同时失效）
+            failed_nodes: 失效节点 [node_id, ...]（所有关联弧失效）
+        """
+        mask = np.zeros(self.num_arcs, dtype=bool)
+        for u, v in failed_links or ():
+            a = self.arc_index.get((u, v))
+            if a is not None:
+                mask[a] = True
+                mask[self.reverse_arc[a]] = True
+        node_idx = [self.index[n] for n in failed_nodes or () if n in self.index]
+        if node_idx:
+            mask |= np.isin(self.arc_src, node_idx) | np.isin(self.indices, node_idx)
+        return mask
+
+    def dijkstra(self, source_idx, weights, target_idx=None):
+        """
+        在 CSR 上运行 Dijkstra（权重为 inf 的弧视为不存在）
+
+        Args:
+            source_idx: 源节点内部下标
+            weights: 每条弧的权重（NumPy 数组或列表）
+            target_idx: 目标节点内部下标，给定时到达目标即停止
+
+        Returns:
+            (dist, pred): 距离列表与前驱节点列表（均按内部下标）
+        """
+        w = weights.tolist() if isinstance(weights, np.ndarray) else weights
+        indptr, indices = self._indptr, self._indices
+        dist = [INF] * self.num_nodes
+        pred = [-1] * self.num_nodes
+        dist[source_idx] = 0.0
+        heap = [(0.0, source_idx)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == target_idx:
+                break
+            for a in range(indptr[u], indptr[u + 1]):
+                wa = w[a]
+                if wa == INF:
+                    continue
+                nd = d + wa
+                v = indices[a]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return dist, pred
+
+    def walk_back(self, pred, source_idx, target_idx):
+        """根据前驱列表还原路径（原始节点ID），不可达时返回 None"""
+        if source_idx == target_idx:
+            return [self.node_ids[source_idx]]
+        if pred[target_idx] < 0:
+            return None
+        path = [target_idx]
+        node = target_idx
+        while node != source_idx:
+            node = pred[node]
+            path.append(node)
+        path.reverse()
+        return [self.node_ids[i] for i in path]
+
+    def shortest_path(self, source, target, weights):
+        """按给定权重求 source -> target 最短路径（原始节点ID列表），不可达返回 None"""
+        s = self.index.get(source)
+        t = self.index.get(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return [source]
+        dist, pred = self.dijkstra(s, weights, t)
+        if dist[t] == INF:
+            return None
+        return self.walk_back(pred, s, t)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_routing_graph(nodes, edges):
+    """按拓扑哈希获取（或构建并缓存）RoutingGraph"""
+    key = topology_hash(nodes, edges)
+    with _cache_lock:
+        graph = _cache.get(key)
+        if graph is not None:
+            _cache.move_to_end(key)
+            return graph
+
+    graph = RoutingGraph(nodes, edges, key=key)
+    with _cache_lock:
+        _cache[key] = graph
+        _cache.move_to_end(key)
+        while len(_cache) > ROUTING_GRAPH_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return graph
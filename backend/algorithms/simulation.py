@@ -0,0 +1,248 @@
+"""
+时间步进的流量仿真引擎（离散事件：流到达 / 流离开）
+
+基于 traffic.py 中的路径计算与流量分配逻辑：
+- 每条流带有到达时间、持续时间与需求量，到达时按当前链路占用进行分配
+- 流结束时释放其占用的带宽，离开事件在每个时间步开始时批量处理
+- 链路使用量保存在 NumPy 数组中，逐时间步输出利用率汇总
+"""
+
+import math
+import random
+import time
+
+import numpy as np
+
+from algorithms.ledger import UsageLedger
+from algorithms.routing_graph import topology_hash
+from algorithms.traffic import LoadBalancer, _allocate_on_balancer
+
+MAX_FLOWS = 100000  # 单次仿真的流数量硬上限
+MAX_TICKS = 100000  # 单次仿真的时间步数量硬上限（逐时间步输出汇总，决定响应大小）
+
+
+def generate_random_flows(nodes, num_flows, horizon=3600.0, demand_range=(10, 200),
+                          mean_duration=60.0, seed=None):
+    """
+    生成随机流序列（泊松到达、指数分布持续时间）
+
+    Args:
+        nodes: 节点列表
+        num_flows: 流数量
+        horizon: 到达时间窗口长度（秒）
+        demand_range: 需求量范围 [min, max]
+        mean_duration: 平均持续时间（秒）
+        seed: 随机种子
+
+    Returns:
+        流列表 [{'source', 'target', 'demand', 'arrival', 'duration'}, ...]（按到达时间排序）
+    """
+    rng = random.Random(seed)
+    node_ids = [node['id'] if isinstance(node, dict) else node for node in nodes]
+    if len(node_ids) < 2:
+        return []
+
+    arrivals = sorted(rng.uniform(0, horizon) for _ in range(num_flows))
+    flows = []
+    for arrival in arrivals:
+        source, target = rng.sample(node_ids, 2)
+        flows.append({
+            'source': source,
+            'target': target,
+            'demand': rng.uniform(demand_range[0], demand_range[1]),
+            'arrival': arrival,
+            'duration': rng.expovariate(1.0 / mean_duration) if mean_duration > 0 else 0.0,
+        })
+    return flows
+
+
+class TrafficSimulator:
+    """离散时间步流量仿真器"""
+
+    def __init__(self, nodes, edges, strategy='balanced', num_paths=3, auto_k=False,
+                 tick=1.0, congestion_threshold=0.8, ledger=None):
+        """
+        Args:
+            nodes: 节点列表
+            edges: 边列表
+            strategy: 单条流的分配策略 ('single' / 'balanced' / 'maxmin' / 'ecmp')
+            num_paths: 每条流的路径数量上限
+            auto_k: 是否智能选择k值（默认关闭：每条到达的流都要做路径搜索，固定 k 可省去逐个 k 的试探）
+            tick: 时间步长（秒）
+            congestion_threshold: 统计拥塞链路时使用的利用率阈值
+            ledger: 写入的 UsageLedger（需与 nodes/edges 为同一拓扑；默认新建）。
+                共享账本中已有的使用量与预留作为背景负载保留，仿真只撤销自己记入的流量
+        """
+        if tick <= 0:
+            raise ValueError("时间步长必须为正数")
+        self.strategy = strategy
+        self.num_paths = num_paths
+        self.auto_k = auto_k
+        self.tick = tick
+        self.congestion_threshold = congestion_threshold
+
+        # 链路使用量保存在账本的数组中（无向链路，同一对端点只保留一条）
+        if ledger is None:
+            ledger = UsageLedger(nodes, edges)
+        elif ledger.key != topology_hash(nodes, edges):
+            raise ValueError("账本与仿真拓扑不一致")
+        self.ledger = ledger
+        self.link_index = ledger.link_index
+        self.links = ledger.links
+        self.capacity = ledger.capacity
+        self.usage = ledger.usage
+
+        self.balancer = LoadBalancer(nodes, edges)
+        self.balancer.edge_usage = ledger
+
+    def _utilization(self):
+        return np.divide(self.usage, self.capacity, out=np.zeros_like(self.usage), where=self.capacity > 0)
+
+    def _admit(self, flow):
+        """为一条到达的流分配路径，返回 (链路下标数组, 各链路流量数组, 实际分配流量)"""
+        source, target = flow['source'], flow['target']
+        graph = self.balancer.graph
+        if source == target or not graph.has_node(source) or not graph.has_node(target):
+            return None, None, 0.0
+
+        result = _allocate_on_balancer(
+            self.balancer, source, target, flow['demand'],
+            self.strategy, self.num_paths, self.auto_k
+        )
+        if 'error' in result or result['actual_flow'] <= 0:
+            return None, None, 0.0
+
+        link_ids = []
+        amounts = []
+        for path, allocation in zip(result['paths'], result['path_allocations']):
+            if allocation['flow'] <= 0:
+                continue
+            for i in range(len(path) - 1):
+                link_ids.append(self.link_index[(path[i], path[i + 1])])
+                amounts.append(allocation['flow'])
+        if not link_ids:
+            return None, None, 0.0
+
+        link_ids = np.asarray(link_ids, dtype=np.intp)
+        amounts = np.asarray(amounts, dtype=float)
+        self.ledger.add(link_ids, amounts)
+        self.balancer.invalidate_usage()
+        return link_ids, amounts, float(result['actual_flow'])
+
+    def run(self, flows, horizon=None):
+        """
+        运行仿真
+
+        Args:
+            flows: 流列表 [{'source', 'target', 'demand', 'arrival', 'duration'}, ...]
+            horizon: 仿真总时长（秒），默认运行到最后一条流离开
+
+        Returns:
+            包含逐时间步汇总、链路峰值利用率与整体统计的字典
+
+        Raises:
+            ValueError: 仿真时长或流的结束时间超过 MAX_TICKS 个时间步
+        """
+        start_time = time.perf_counter()
+        self.balancer.invalidate_usage()
+
+        # 按时间步分桶：到达桶与离开桶
+        arrivals_by_tick = {}
+        last_tick = 0
+        for flow_id, flow in enumerate(flows):
+            arrival_tick = int(math.floor(flow['arrival'] / self.tick))
+            end_tick = int(math.ceil((flow['arrival'] + flow.get('duration', 0)) / self.tick))
+            end_tick = max(end_tick, arrival_tick + 1)  # 至少占用一个时间步
+            if end_tick > MAX_TICKS:
+                raise ValueError(f"流的结束时间超过 {MAX_TICKS} 个时间步")
+            arrivals_by_tick.setdefault(arrival_tick, []).append((flow_id, end_tick))
+            last_tick = max(last_tick, end_tick)
+        num_ticks = int(math.ceil(horizon / self.tick)) if horizon is not None else last_tick + 1
+        if num_ticks > MAX_TICKS:
+            raise ValueError(f"仿真时长超过 {MAX_TICKS} 个时间步")
+
+        departures_by_tick = {}  # {tick: [(link_ids, amounts), ...]}，即仿真自己记入账本的全部流量
+        try:
+            return self._run_ticks(flows, num_ticks, arrivals_by_tick, departures_by_tick, start_time)
+        finally:
+            # 只撤销仿真自己记入的流量（含结束时仍活跃的流），不影响共享账本上其他请求的使用量与预留
+            remaining = [d for departing in departures_by_tick.values() for d in departing]
+            if remaining:
+                self.ledger.add(np.concatenate([d[0] for d in remaining]),
+                                -np.concatenate([d[1] for d in remaining]))
+                self.balancer.invalidate_usage()
+
+    def _run_ticks(self, flows, num_ticks, arrivals_by_tick, departures_by_tick, start_time):
+        """逐时间步处理离开/到达事件并汇总利用率（已离开的流会从 departures_by_tick 中移除）"""
+        peak_utilization = np.zeros_like(self.usage)
+        ticks = []
+        active_flows = 0
+        admitted = blocked = limited = 0
+        total_requested = total_allocated = 0.0
+
+        for t in range(num_ticks):
+            # 1. 批量处理离开事件：一次性释放所有到期流占用的带宽
+            departing = departures_by_tick.pop(t, [])
+            if departing:
+                link_ids = np.concatenate([d[0] for d in departing])
+                amounts = np.concatenate([d[1] for d in departing])
+                self.ledger.add(link_ids, -amounts)
+                self.balancer.invalidate_usage()
+                active_flows -= len(departing)
+
+            # 2. 处理到达事件：按到达顺序依次分配，后到达的流能看到先到达的占用
+            arriving = arrivals_by_tick.pop(t, [])
+            tick_allocated = 0.0
+            for flow_id, end_tick in arriving:
+                flow = flows[flow_id]
+                total_requested += flow['demand']
+                link_ids, amounts, allocated = self._admit(flow)
+                if link_ids is None:
+                    blocked += 1
+                    continue
+                admitted += 1
+                if allocated < flow['demand'] - 1e-9:
+                    limited += 1
+                total_allocated += allocated
+                tick_allocated += allocated
+                active_flows += 1
+                departures_by_tick.setdefault(end_tick, []).append((link_ids, amounts))
+
+            # 3. 本时间步的利用率汇总（整体向量化计算）
+            utilization = self._utilization()
+            np.maximum(peak_utilization, utilization, out=peak_utilization)
+            ticks.append({
+                'tick': t,
+                'time': t * self.tick,
+                'arrivals': len(arriving),
+                'departures': len(departing),
+                'active_flows': active_flows,
+                'allocated_flow': tick_allocated,
+                'total_load': float(self.usage.sum()),
+                'mean_utilization': float(utilization.mean()) if utilization.size else 0.0,
+                'max_utilization': float(utilization.max()) if utilization.size else 0.0,
+                'congested_links': int(np.count_nonzero(utilization >= self.congestion_threshold)),
+            })
+
+        peak_links = [
+            {'from': u, 'to': v, 'capacity': float(cap), 'peak_utilization': float(peak)}
+            for (u, v), cap, peak in zip(self.links, self.capacity, peak_utilization)
+        ]
+
+        return {
+            'ticks': ticks,
+            'link_peaks': peak_links,
+            'summary': {
+                'num_flows': len(flows),
+                'num_ticks': num_ticks,
+                'tick': self.tick,
+                'admitted_flows': admitted,
+                'blocked_flows': blocked,
+                'limited_flows': limited,
+                'total_requested': total_requested,
+                'total_allocated': total_allocated,
+                'peak_utilization': float(peak_utilization.max()) if peak_utilization.size else 0.0,
+                'strategy': self.strategy,
+                'elapsed_ms': (time.perf_counter() - start_time) * 1000,
+            },
+        }
@@ -2,141 +2,326 @@
 简化后的流量路径与分配模块（仅保留前端实际使用的功能）
 """
 
-import networkx as nx
+from collections import OrderedDict
+
+import numpy as np
+
+from algorithms.routing_graph import INF, get_routing_graph, topology_hash
+from algorithms.contraction import get_contraction_hierarchy, peek_contraction_hierarchy
+from algorithms.disjoint import find_disjoint_paths
+from algorithms.ledger import LedgerConflict
+
+SPT_CACHE_SIZE = 64       # 每个 LoadBalancer 最多缓存的最短路径树数量（按源节点）
+PATH_CACHE_SIZE = 1024    # 每个 LoadBalancer 最多缓存的候选路径集合数量（按源/目标节点对）
+COMMIT_RETRIES = 5        # 在共享账本上提交分配时，版本冲突后的最大尝试次数
+
+# 单条流的分配策略：单路径 / 按可用容量比例 / max-min 公平 / 等价多路径
+STRATEGIES = ('single', 'balanced', 'maxmin', 'ecmp')
+
+# 多路径查找模式：惩罚启发式 / 链路不相交 / 节点不相交
+PATH_MODES = ('penalty', 'edge-disjoint', 'node-disjoint')
+
+# ECMP 下一跳分流方式：均分 / 按链路容量加权
+ECMP_SPLITS = ('uniform', 'weighted')
+
+# 链路利用率惩罚的分段阈值
+MODERATE_THRESHOLD = 0.5     # 超过该值给予较小惩罚
+UTILIZATION_THRESHOLD = 0.8  # 超过该值按超出程度大幅惩罚
+SATURATION_THRESHOLD = 0.95  # 超过该值视为接近饱和，几乎完全避开
+
+
+def compute_penalized_weights(weight, utilization, moderate_threshold=MODERATE_THRESHOLD,
+                              utilization_threshold=UTILIZATION_THRESHOLD,
+                              saturation_threshold=SATURATION_THRESHOLD):
+    """
+    对所有链路一次性计算带利用率惩罚的权重
+
+    Args:
+        weight: 基础权重数组
+        utilization: 与 weight 对齐的利用率数组
+        moderate_threshold: 轻度惩罚阈值（默认0.5）
+        utilization_threshold: 拥塞惩罚阈值（默认0.8）
+        saturation_threshold: 饱和惩罚阈值（默认0.95）
+
+    Returns:
+        (penalized, factor): 惩罚后的权重数组与惩罚系数数组
+    """
+    factor = np.select(
+        [
+            utilization >= saturation_threshold,   # 接近饱和：极高惩罚，几乎不可能被选中
+            utilization >= utilization_threshold,  # 超过阈值：根据超出程度大幅惩罚
+            utilization > moderate_threshold,      # 中等占用：较小惩罚
+        ],
+        [
+            np.maximum(1 + (utilization - saturation_threshold) * 200, 100),
+            1 + (utilization - utilization_threshold) * 100,
+            1 + (utilization - moderate_threshold) * 3,
+        ],
+        default=1.0,
+    )
+    return weight * factor, factor
 
 
 class LoadBalancer:
     """多路径负载均衡器（用于路径计算）"""
 
-    def __init__(self, nodes, edges, edge_usage=None):
+    def __init__(self, nodes, edges, edge_usage=None, use_ch=None,
+                 moderate_threshold=MODERATE_THRESHOLD,
+                 utilization_threshold=UTILIZATION_THRESHOLD,
+                 saturation_threshold=SATURATION_THRESHOLD,
+                 failed_links=None, failed_nodes=None):
+        """
+        Args:
+            nodes: 节点列表
+            edges: 边列表
+            edge_usage: 边使用情况字典 {(u,v): used_flow}
+            use_ch: 是否使用收缩层次索引查询首条路径。True 时按需构建；None 表示只使用已构建好的索引
+                （由 /api/traffic/routing-index 预先构建），请求内不会触发耗时的预处理
+            moderate_threshold: 轻度惩罚阈值
+            utilization_threshold: 拥塞惩罚阈值
+            saturation_threshold: 饱和惩罚阈值（超过时备选路径会直接移除该链路）
+            failed_links: 失效链路 [(u, v), ...]，路径搜索时视为不存在
+            failed_nodes: 失效节点 [node_id, ...]，其所有关联链路视为不存在
+        """
         self.nodes = nodes
         self.edges = edges
         self.edge_usage = edge_usage or {}  # 边使用情况字典 {(u,v): used_flow}
-        self.G = self._build_graph()
-
-    def _build_graph(self):
-        """构建带权重与容量的有向图（无向边双向添加）"""
-        G = nx.DiGraph()
-        for node in self.nodes:
-            G.add_node(node['id'])
-        for edge in self.edges:
-            # 正向与反向边（便于无向拓扑）
-            for u, v in [(edge['from'], edge['to']), (edge['to'], edge['from'])]:
-                G.add_edge(
-                    u,
-                    v,
-                    weight=edge.get('weight', 1),
-                    capacity=edge.get('capacity', 1000),
-                    cost=edge.get('cost', edge.get('weight', 1)),
-                )
-        return G
-
-    def find_k_shortest_paths(self, source, target, k=3, utilization_threshold=0.8):
+        # 按拓扑哈希复用的紧凑路由图（CSR + weight/capacity/cost 数组）
+        self.graph = get_routing_graph(nodes, edges)
+        self.use_ch = use_ch
+        self.moderate_threshold = moderate_threshold
+        self.utilization_threshold = utilization_threshold
+        self.saturation_threshold = saturation_threshold
+        # 失效元素只作用于本实例的权重覆盖层，缓存的路由图保持不变
+        self.failed_arcs = None
+        if failed_links or failed_nodes:
+            self.failed_arcs = self.graph.failure_mask(failed_links, failed_nodes)
+
+        # 使用账本版本号：账本变化时递增，惩罚权重缓存据此失效
+        self.usage_version = 0
+        self._overlay_key = None
+        self._overlay = None
+        # 覆盖层版本号：仅当惩罚后的权重真正改变时递增，最短路径树缓存据此失效
+        self.overlay_version = 0
+        self._spt_cache = OrderedDict()  # {(源节点下标, 覆盖层版本): (dist, pred)}
+        self.spt_hits = 0
+        self.spt_misses = 0
+        self._residual_key = None
+        self._residual = None
+        self._path_cache = OrderedDict()  # {(源, 目标, k, 路径模式, 覆盖层版本): 候选路径列表}
+        self.path_hits = 0
+        self.path_misses = 0
+
+    def invalidate_usage(self):
+        """通知使用账本已被外部修改（直接改写 edge_usage 后需调用）"""
+        self.usage_version += 1
+
+    def record_flow(self, path, flow):
+        """将一条路径上的流量记入使用账本（无向链路，两个方向同时累加）"""
+        if flow <= 0:
+            return
+        for i in range(len(path) - 1):
+            u, v = path[i], path[i + 1]
+            used = self.edge_usage.get((u, v), 0) + flow
+            self.edge_usage[(u, v)] = used
+            self.edge_usage[(v, u)] = used
+        self.invalidate_usage()
+
+    def _arc_usage(self):
+        """按弧下标对齐的已用流量数组"""
+        usage = self.edge_usage
+        if hasattr(usage, 'arc_array'):
+            # 数组形式的账本可直接按弧取值
+            return usage.arc_array(self.graph)
+        return np.fromiter((usage.get(key, 0) for key in self.graph.arc_keys), dtype=float,
+                           count=self.graph.num_arcs)
+
+    def _arc_utilization(self):
+        """按弧下标对齐的链路利用率数组"""
+        capacity = self.graph.capacity
+        used = self._arc_usage()
+        return np.divide(used, capacity, out=np.zeros_like(used), where=capacity > 0)
+
+    def arc_residual(self):
+        """
+        按弧下标对齐的剩余容量列表（两个方向取较大的占用，结果不小于 0）
+
+        按账本版本缓存，分配时逐链路查询只需一次列表下标访问；返回的列表不应被修改。
+        """
+        if self._residual_key != self.usage_version:
+            used = self._arc_usage()
+            used = np.maximum(used, used[self.graph.reverse_arc])
+            self._residual = np.maximum(self.graph.capacity - used, 0).tolist()
+            self._residual_key = self.usage_version
+        return self._residual
+
+    def weight_overlay(self, utilization_threshold=None):
+        """
+        返回当前账本下的 (利用率数组, 惩罚权重数组, 惩罚是否生效)
+
+        结果按 (账本版本, 阈值) 缓存，账本未变化时直接复用；返回的数组不应被原地修改。
+        """
+        if utilization_threshold is None:
+            utilization_threshold = self.utilization_threshold
+        key = (self.usage_version, self.moderate_threshold, utilization_threshold, self.saturation_threshold)
+        if self._overlay_key != key:
+            utilization = self._arc_utilization()
+            weighted, factor = compute_penalized_weights(
+                self.graph.weight, utilization,
+                self.moderate_threshold, utilization_threshold, self.saturation_threshold
+            )
+            penalized = bool((factor != 1.0).any())
+            if self.failed_arcs is not None:
+                weighted = np.where(self.failed_arcs, INF, weighted)
+                penalized = True  # 失效弧不在预处理索引中体现，需走覆盖权重搜索
+            # 账本变化但所有链路仍处于同一惩罚档位时权重不变，已缓存的最短路径树继续有效
+            if self._overlay is None or not np.array_equal(weighted, self._overlay[1]):
+                self.overlay_version += 1
+                self._spt_cache.clear()
+                self._path_cache.clear()
+            self._overlay = (utilization, weighted, penalized)
+            self._overlay_key = key
+        return self._overlay
+
+    def shortest_path_tree(self, source_idx, utilization_threshold=None):
+        """
+        返回当前覆盖权重下以 source_idx 为根的最短路径树 (dist, pred)
+
+        按 (源节点, 覆盖层版本) 缓存：同一源节点到任意目标的后续查询只需沿前驱回溯。
+        """
+        self.weight_overlay(utilization_threshold)
+        key = (source_idx, self.overlay_version)
+        tree = self._spt_cache.get(key)
+        if tree is not None:
+            self._spt_cache.move_to_end(key)
+            self.spt_hits += 1
+            return tree
+        self.spt_misses += 1
+        tree = self.graph.dijkstra(source_idx, self._overlay[1])
+        self._spt_cache[key] = tree
+        while len(self._spt_cache) > SPT_CACHE_SIZE:
+            self._spt_cache.popitem(last=False)
+        return tree
+
+    def shortest_path(self, source, target, utilization_threshold=None):
+        """当前覆盖权重下的最短路径（原始节点ID列表），不可达返回 None"""
+        graph = self.graph
+        s = graph.index.get(source)
+        t = graph.index.get(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return [source]
+        dist, pred = self.shortest_path_tree(s, utilization_threshold)
+        if dist[t] == INF:
+            return None
+        return graph.walk_back(pred, s, t)
+
+    def find_k_shortest_paths(self, source, target, k=3, utilization_threshold=None, path_mode='penalty'):
         """基于加惩罚的多条最短路径搜索，考虑链路利用率阈值
         
         Args:
             source: 源节点
             target: 目标节点
             k: 最多返回k条路径
-            utilization_threshold: 链路利用率阈值（默认0.8，即80%）
+            utilization_threshold: 链路利用率阈值（默认使用实例配置，即80%）
+            path_mode: 'penalty'（惩罚启发式，默认）、'edge-disjoint' 或 'node-disjoint'
+                （在惩罚权重上求总代价最小的 k 条不相交路径）
+
+        候选路径只取决于惩罚后的权重，按 (源, 目标, k, 模式, 覆盖层版本) 缓存：
+        账本变化但惩罚档位不变时，同一节点对的重复查询直接复用上次结果。
         """
+        self.weight_overlay(utilization_threshold)
+        key = (source, target, k, path_mode, self.overlay_version)
+        paths = self._path_cache.get(key)
+        if paths is not None:
+            self._path_cache.move_to_end(key)
+            self.path_hits += 1
+        else:
+            self.path_misses += 1
+            paths = self._search_k_paths(source, target, k, utilization_threshold, path_mode)
+            self._path_cache[key] = paths
+            while len(self._path_cache) > PATH_CACHE_SIZE:
+                self._path_cache.popitem(last=False)
+        return [list(path) for path in paths]
+
+    def _search_k_paths(self, source, target, k, utilization_threshold, path_mode):
+        """find_k_shortest_paths 的实际搜索（不经过缓存）"""
         try:
+            graph = self.graph
+            saturation = self.saturation_threshold
             paths = []
             
-            # 创建考虑链路占用率的临时图
-            G_weighted = self.G.copy()
-            for u, v in G_weighted.edges():
-                capacity = G_weighted[u][v].get('capacity', 1000)
-                used_flow = self.edge_usage.get((u, v), 0)
-                utilization = used_flow / capacity if capacity > 0 else 0
-                
-                # 如果链路占用率超过阈值，大幅增加权重惩罚
-                original_weight = G_weighted[u][v]['weight']
-                if utilization >= 0.95:  # 接近饱和（95%+）
-                    # 极高惩罚，几乎不可能被选中
-                    penalty_factor = 1 + (utilization - 0.95) * 200
-                    G_weighted[u][v]['weight'] = original_weight * max(penalty_factor, 100)
-                elif utilization >= utilization_threshold:  # 80%-95%
-                    # 根据超出阈值的程度增加惩罚（指数增长）
-                    penalty_factor = 1 + (utilization - utilization_threshold) * 100
-                    G_weighted[u][v]['weight'] = original_weight * penalty_factor
-                elif utilization > 0.5:  # 50%-80%之间也给予较小的惩罚
-                    penalty_factor = 1 + (utilization - 0.5) * 3
-                    G_weighted[u][v]['weight'] = original_weight * penalty_factor
+            # 考虑链路占用率的权重数组（账本未变化时复用缓存）
+            utilization, weighted, penalized = self.weight_overlay(utilization_threshold)
             
+            if path_mode != 'penalty':
+                return find_disjoint_paths(graph, source, target, k, weighted,
+                                           node_disjoint=(path_mode == 'node-disjoint'))
+
             # 第一条最短路径（考虑链路占用）
-            try:
-                shortest = nx.shortest_path(G_weighted, source, target, weight='weight')
-                paths.append(shortest)
-            except nx.NetworkXNoPath:
+            # 惩罚未生效时权重等于基础权重，可直接使用预处理的收缩层次索引
+            index = None
+            if not penalized and self.use_ch is not False:
+                index = get_contraction_hierarchy(graph) if self.use_ch else peek_contraction_hierarchy(graph)
+            if index is not None:
+                shortest, _ = index.query(source, target)
+            else:
+                shortest = self.shortest_path(source, target, utilization_threshold)
+            if shortest is None:
                 return []
+            paths.append(shortest)
 
             # 策略1：避免已用边（边不相交），同时考虑链路占用率
-            used_edges = set()
+            used_arcs = set()
             for path in paths:
                 for i in range(len(path) - 1):
-                    used_edges.add((path[i], path[i + 1]))
+                    used_arcs.add(graph.arc(path[i], path[i + 1]))
 
             for _ in range(1, k):
-                G_temp = G_weighted.copy()  # 使用已经考虑链路占用的图
+                temp = weighted.copy()  # 使用已经考虑链路占用的权重
                 
                 # 移除已使用的边（但如果链路未饱和，仍可作为备选）
-                for u, v in used_edges:
-                    if G_temp.has_edge(u, v):
-                        capacity = self.G[u][v].get('capacity', 1000)
-                        used_flow = self.edge_usage.get((u, v), 0)
-                        utilization = used_flow / capacity if capacity > 0 else 0
-                        
-                        # 如果链路已接近饱和（>95%），则移除；否则保留但增加惩罚
-                        if utilization >= 0.95:
-                            G_temp.remove_edge(u, v)
-                        else:
-                            # 继续增加惩罚，避免重复使用
-                            G_temp[u][v]['weight'] *= 5
+                for a in used_arcs:
+                    # 如果链路已接近饱和（>95%），则移除；否则保留但增加惩罚
+                    if utilization[a] >= saturation:
+                        temp[a] = INF
+                    else:
+                        # 继续增加惩罚，避免重复使用
+                        temp[a] *= 5
                 
-                try:
-                    path = nx.shortest_path(G_temp, source, target, weight='weight')
-                    if path not in paths:
-                        paths.append(path)
-                        for i in range(len(path) - 1):
-                            used_edges.add((path[i], path[i + 1]))
-                        if len(paths) >= k:
-                            break
-                except nx.NetworkXNoPath:
+                path = graph.shortest_path(source, target, temp)
+                if path is None or path in paths:
+                    break  # 已用边集合未变化时再次搜索只会得到同一条路径
+                paths.append(path)
+                for i in range(len(path) - 1):
+                    used_arcs.add(graph.arc(path[i], path[i + 1]))
+                if len(paths) >= k:
                     break
 
             # 策略2：对已使用边增加权重惩罚（同时考虑链路占用率）
             if len(paths) < k:
-                edge_penalty = {}
+                arc_penalty = {}
                 for path in paths:
                     for i in range(len(path) - 1):
-                        e = (path[i], path[i + 1])
-                        edge_penalty[e] = edge_penalty.get(e, 0) + 1
+                        a = graph.arc(path[i], path[i + 1])
+                        arc_penalty[a] = arc_penalty.get(a, 0) + 1
 
                 for _ in range(len(paths), k):
-                    G_temp = G_weighted.copy()  # 基于已考虑链路占用的图
-                    for (u, v), penalty in edge_penalty.items():
-                        if G_temp.has_edge(u, v):
-                            # 检查链路占用率
-                            capacity = self.G[u][v].get('capacity', 1000)
-                            used_flow = self.edge_usage.get((u, v), 0)
-                            utilization = used_flow / capacity if capacity > 0 else 0
-                            
-                            # 如果接近饱和，大幅增加惩罚；否则适度增加
-                            if utilization >= 0.95:
-                                G_temp[u][v]['weight'] *= (1 + penalty * 100)
-                            else:
-                                original = G_temp[u][v]['weight']
-                                G_temp[u][v]['weight'] = original * (1 + penalty * 10)
-                    try:
-                        path = nx.shortest_path(G_temp, source, target, weight='weight')
-                        if path not in paths:
-                            paths.append(path)
-                            for i in range(len(path) - 1):
-                                e = (path[i], path[i + 1])
-                                edge_penalty[e] = edge_penalty.get(e, 0) + 1
-                    except nx.NetworkXNoPath:
-                        break
+                    temp = weighted.copy()  # 基于已考虑链路占用的权重
+                    for a, penalty in arc_penalty.items():
+                        # 如果接近饱和，大幅增加惩罚；否则适度增加
+                        if utilization[a] >= saturation:
+                            temp[a] *= (1 + penalty * 100)
+                        else:
+                            temp[a] *= (1 + penalty * 10)
+                    path = graph.shortest_path(source, target, temp)
+                    if path is None or path in paths:
+                        break  # 惩罚未变化时再次搜索只会得到同一条路径
+                    paths.append(path)
+                    for i in range(len(path) - 1):
+                        a = graph.arc(path[i], path[i + 1])
+                        arc_penalty[a] = arc_penalty.get(a, 0) + 1
 
             return paths
         except Exception:
@@ -145,7 +330,7 @@ class LoadBalancer:
             return []
 
 
-def _determine_optimal_k(balancer, source, target, total_flow, max_k, edge_usage):
+def _determine_optimal_k(balancer, source, target, total_flow, max_k, edge_usage, path_mode='penalty'):
     """
     智能确定最优的路径数量k
     
@@ -162,6 +347,7 @@ def _determine_optimal_k(balancer, source, target, total_flow, max_k, edge_usage
         total_flow: 总流量需求
         max_k: 最大路径数
         edge_usage: 边使用情况
+        path_mode: 多路径查找模式
     
     Returns:
         最优的k值（最小为3）
@@ -174,7 +360,7 @@ def _determine_optimal_k(balancer, source, target, total_flow, max_k, edge_usage
     
     for k in range(MIN_K, max_k + 1):
         # 尝试找到 k 条路径
-        paths = balancer.find_k_shortest_paths(source, target, k)
+        paths = balancer.find_k_shortest_paths(source, target, k, path_mode=path_mode)
         
         if len(paths) < k:
             # 无法找到更多路径，返回当前k
@@ -182,17 +368,14 @@ def _determine_optimal_k(balancer, source, target, total_flow, max_k, edge_usage
             break
         
         # 计算当前k下的总可用容量
+        graph = balancer.graph
+        residual = balancer.arc_residual()
         total_available = 0
         for path in paths:
             min_available = float('inf')
             for i in range(len(path) - 1):
                 u, v = path[i], path[i + 1]
-                capacity = balancer.G[u][v].get('capacity', 1000)
-                used_flow = max(
-                    edge_usage.get((u, v), 0) if edge_usage else 0,
-                    edge_usage.get((v, u), 0) if edge_usage else 0
-                )
-                available = max(0, capacity - used_flow)
+                available = residual[graph.arc(u, v)]
                 min_available = min(min_available, available)
             total_available += min_available
         
@@ -227,6 +410,12 @@ def calculate_paths_with_allocation(
     num_paths=3,
     edge_usage=None,
     auto_k=True,
+    use_ch=None,
+    penalty_thresholds=None,
+    path_mode='penalty',
+    ecmp_tolerance=0.0,
+    ecmp_split='uniform',
+    ledger=None,
 ):
     """
     计算路径和流量分配（供 /api/traffic/calculate-paths 使用）
@@ -237,12 +426,273 @@ def calculate_paths_with_allocation(
         source: 源节点
         target: 目标节点
         total_flow: 总流量需求
-        strategy: 分配策略 ('single' 或 'balanced')
+        strategy: 分配策略 ('single' / 'balanced' / 'maxmin' / 'ecmp')
         num_paths: 路径数量上限（当auto_k=True时作为最大值）
         edge_usage: 当前边使用情况字典 {(u,v): used_flow}，用于多次调用时累积
         auto_k: 是否智能选择k值（默认True）
+        use_ch: 是否使用收缩层次索引（None 表示仅在索引已构建时使用）
+        penalty_thresholds: 惩罚阈值字典，可包含 moderate_threshold / utilization_threshold /
+            saturation_threshold（默认 0.5 / 0.8 / 0.95）
+        path_mode: 多路径查找模式 ('penalty' | 'edge-disjoint' | 'node-disjoint')
+        ecmp_tolerance: strategy='ecmp' 时的代价容差（0 表示严格等价）
+        ecmp_split: strategy='ecmp' 时的分流方式 ('uniform' | 'weighted')
+        ledger: 共享的 UsageLedger；给定时忽略 edge_usage，在账本上计算并原子提交本次分配
+            （结果附带 reservation_id，可用于释放）
+    """
+    if path_mode not in PATH_MODES:
+        raise ValueError(f"未知的路径模式: {path_mode}")
+    if ecmp_split not in ECMP_SPLITS:
+        raise ValueError(f"未知的 ECMP 分流方式: {ecmp_split}")
+    if ecmp_tolerance < 0:
+        raise ValueError("ECMP 代价容差不能为负数")
+    balancer_options = dict(use_ch=use_ch, **(penalty_thresholds or {}))
+    allocate_args = (strategy, num_paths, auto_k, path_mode, ecmp_tolerance, ecmp_split)
+    if ledger is not None:
+        return _commit_on_ledger(ledger, nodes, edges, source, target, total_flow, balancer_options, allocate_args)
+    balancer = LoadBalancer(nodes, edges, edge_usage, **balancer_options)
+    return _allocate_on_balancer(balancer, source, target, total_flow, *allocate_args)
+
+
+def _commit_on_ledger(ledger, nodes, edges, source, target, total_flow, balancer_options, allocate_args):
+    """
+    在共享账本上分配并提交（乐观并发）
+
+    每次尝试先复制账本当前状态，在副本上不持锁地计算分配，再按所经链路的版本号原子预留。
+    只有本次分配实际经过的链路被其他请求修改过时才会冲突并重算；
+    其他链路的变化不影响结果的可行性，因此并发请求只在提交的短暂临界区内互斥。
+
+    Raises:
+        LedgerConflict: 连续 COMMIT_RETRIES 次冲突
+    """
+    if ledger.key != topology_hash(nodes, edges):
+        raise ValueError("账本与请求拓扑不一致")
+    for attempt in range(1, COMMIT_RETRIES + 1):
+        view = ledger.view()
+        balancer = LoadBalancer(nodes, edges, view, **balancer_options)
+        result = _allocate_on_balancer(balancer, source, target, total_flow, *allocate_args)
+        if 'error' in result:
+            return result
+        link_ids, amounts = ledger.path_links(result['paths'], [a['flow'] for a in result['path_allocations']])
+        reservation_id = None
+        if link_ids.size:
+            try:
+                # 版本一致说明所经链路的使用量与计算时相同，容量约束已由分配策略保证
+                reservation_id = ledger.reserve(link_ids, amounts, expected_versions=view.link_version[link_ids],
+                                                enforce_capacity=False)
+            except LedgerConflict:
+                continue
+        result.update({
+            'reservation_id': reservation_id,
+            'commit_attempts': attempt,
+            'ledger_version': ledger.version,
+        })
+        return result
+    raise LedgerConflict(f"连续 {COMMIT_RETRIES} 次与其他请求冲突，请稍后重试")
+
+
+def _maxmin_allocation(balancer, paths, total_flow):
+    """
+    max-min 公平分配（渐进填充 / 注水）
+
+    所有未冻结路径的速率同步增长，直到某条链路的剩余容量耗尽或总流量达到需求；
+    经过饱和链路的路径被冻结，其余路径继续增长。链路剩余容量保存在数组中，
+    每轮的增量是受影响链路上 剩余容量/活跃路径数 的向量化最小值。
+
+    Args:
+        balancer: LoadBalancer实例（读取其 edge_usage 计算剩余容量）
+        paths: 候选路径列表
+        total_flow: 总流量需求
+
+    Returns:
+        每条路径分配的流量列表
+    """
+    graph = balancer.graph
+    arc_residual = balancer.arc_residual()
+
+    # 路径 x 链路 关联矩阵（无向链路，两个方向映射到同一列）
+    link_index = {}
+    residual = []
+    rows, cols = [], []
+    for path_idx, path in enumerate(paths):
+        for i in range(len(path) - 1):
+            u, v = path[i], path[i + 1]
+            idx = link_index.get((u, v))
+            if idx is None:
+                idx = len(residual)
+                link_index[(u, v)] = link_index[(v, u)] = idx
+                residual.append(arc_residual[graph.arc(u, v)])
+            rows.append(path_idx)
+            cols.append(idx)
+
+    incidence = np.zeros((len(paths), len(residual)))
+    np.add.at(incidence, (rows, cols), 1)
+    residual = np.asarray(residual, dtype=float)
+    tolerance = 1e-9 * np.maximum(residual, 1)  # 相对误差内视为饱和
+    rates = np.zeros(len(paths))
+    active = np.ones(len(paths), dtype=bool)
+    remaining = float(total_flow)
+
+    while remaining > 1e-9:
+        # 冻结经过饱和链路的路径
+        saturated = residual <= tolerance
+        if saturated.any():
+            active &= ~incidence[:, saturated].any(axis=1)
+        num_active = int(np.count_nonzero(active))
+        if num_active == 0:
+            break
+
+        load = active @ incidence  # 每条链路上的活跃路径数（路径重复经过时按次数计）
+        affected = load > 0
+        step = min(float((residual[affected] / load[affected]).min()), remaining / num_active)
+        rates[active] += step
+        residual -= step * load
+        remaining -= step * num_active
+
+    return rates.tolist()
+
+
+def _ecmp_allocation(balancer, source, target, total_flow, tolerance=0.0, split='uniform'):
     """
-    balancer = LoadBalancer(nodes, edges, edge_usage)
+    ECMP 等价多路径分配
+
+    从源/目标各取一棵最短路径树（复用 LoadBalancer 的缓存），满足
+    dist_s[u] + w(u,v) + dist_t[v] <= (1 + tolerance) * D 的弧构成等价 DAG；
+    tolerance=0 时 DAG 恰为全部最短路径，大于 0 时每条弧都位于某条代价不超过上限的路径上
+    （逐跳组合出的路径可能略超上限，与路由器的非等价负载分担相同）。
+    流量按拓扑序逐跳在下一跳之间均分或按链路容量加权分流，最后整体按链路剩余容量等比缩放。
+
+    Args:
+        balancer: LoadBalancer实例
+        source: 源节点
+        target: 目标节点
+        total_flow: 总流量需求
+        tolerance: 代价容差（0 表示严格等价）
+        split: 'uniform'（均分）或 'weighted'（按链路容量加权）
+
+    Returns:
+        与其他策略相同结构的分配结果，额外包含逐链路流量 link_flows
+    """
+    graph = balancer.graph
+    s, t = graph.index.get(source), graph.index.get(target)
+    if s is None or t is None:
+        return {'error': 'No path found', 'paths': [], 'path_allocations': []}
+    weighted = balancer.weight_overlay()[1]
+    dist_s = np.asarray(balancer.shortest_path_tree(s)[0])
+    # 覆盖权重两个方向相同（无向链路、账本双向记录），到目标的距离即以目标为根的最短路径树
+    dist_t = np.asarray(balancer.shortest_path_tree(t)[0])
+    shortest = dist_s[t]
+    if shortest == INF:
+        return {'error': 'No path found', 'paths': [], 'path_allocations': []}
+
+    # 等价 DAG：沿弧前进总代价不超过容差上限，且 (dist_t, 下标) 严格递减以保证无环
+    u, v = graph.arc_src, graph.indices
+    bound = shortest * (1 + tolerance) + 1e-9 * max(shortest, 1.0)
+    with np.errstate(invalid='ignore'):
+        in_dag = (
+            (weighted < INF)
+            & (dist_s[u] + weighted + dist_t[v] <= bound)
+            & ((dist_t[v] < dist_t[u]) | ((dist_t[v] == dist_t[u]) & (v < u)))
+        )
+
+    # 按拓扑序（dist_t、下标降序）逐跳分流
+    share_weight = graph.capacity if split == 'weighted' else np.ones(graph.num_arcs)
+    indptr = graph.indptr.tolist()
+    arc_flow = np.zeros(graph.num_arcs)
+    inflow = np.zeros(graph.num_nodes)
+    inflow[s] = 1.0  # 先按单位流量计算分流比例
+    for x in np.lexsort((np.arange(graph.num_nodes), dist_t))[::-1].tolist():
+        if inflow[x] <= 0 or x == t:
+            continue
+        arcs = np.flatnonzero(in_dag[indptr[x]:indptr[x + 1]]) + indptr[x]
+        if arcs.size == 0:
+            continue
+        shares = share_weight[arcs]
+        total_share = shares.sum()
+        shares = shares / total_share if total_share > 0 else np.full(arcs.size, 1.0 / arcs.size)
+        arc_flow[arcs] += inflow[x] * shares
+        np.add.at(inflow, v[arcs], inflow[x] * shares)
+
+    # 按链路剩余容量等比缩放（可承载的最大需求 = 各弧 剩余容量/分流比例 的最小值）
+    # 剩余容量与其他策略一致：无向链路两个方向取较大的占用
+    capacity = graph.capacity
+    available = np.asarray(balancer.arc_residual())
+    carrying = arc_flow > 1e-12
+    max_flow = float((available[carrying] / arc_flow[carrying]).min()) if carrying.any() else 0.0
+    actual_flow = min(float(total_flow), max_flow)
+    arc_flow *= actual_flow
+
+    # 把 DAG 上的流分解为路径（每次沿剩余流量最大的弧前进，取瓶颈值），路径数不超过承载流量的弧数
+    remaining = arc_flow.copy()
+    paths, path_allocations = [], []
+    while True:
+        x = s
+        path, path_arcs = [s], []
+        while x != t:
+            out = np.arange(indptr[x], indptr[x + 1])
+            if out.size == 0:
+                break
+            a = int(out[remaining[out].argmax()])
+            if remaining[a] <= 1e-9 * max(actual_flow, 1.0):
+                break
+            path_arcs.append(a)
+            x = int(v[a])
+            path.append(x)
+        if x != t or not path_arcs:
+            break
+        flow = float(remaining[path_arcs].min())
+        remaining[path_arcs] -= flow
+        path_capacity = float(capacity[path_arcs].min())
+        paths.append([graph.node_ids[i] for i in path])
+        path_allocations.append({
+            'flow': flow,
+            'capacity': graph.capacity_of(*graph.arc_keys[path_arcs[int(capacity[path_arcs].argmin())]]),
+            'available_capacity': float(available[path_arcs].min()),
+            'utilization': flow / path_capacity if path_capacity > 0 else 0,
+        })
+
+    # 承载流量的弧剩余容量必为正，已用流量即 容量 - 剩余容量
+    link_flows = []
+    for a in np.flatnonzero(arc_flow > 0).tolist():
+        a_u, a_v = graph.arc_keys[a]
+        link_flows.append({
+            'from': a_u,
+            'to': a_v,
+            'flow': float(arc_flow[a]),
+            'capacity': graph.capacity_of(a_u, a_v),
+            'utilization': float((capacity[a] - available[a] + arc_flow[a]) / capacity[a]) if capacity[a] > 0 else 0,
+        })
+
+    return {
+        'paths': paths,
+        'path_allocations': path_allocations,
+        'link_flows': link_flows,
+        'total_capacity': sum(a['capacity'] for a in path_allocations),
+        'total_available_capacity': max_flow,
+        'requested_flow': total_flow,
+        'actual_flow': actual_flow,
+        'is_limited': actual_flow < total_flow,
+        'num_paths': len(paths),
+        'ecmp': {
+            'tolerance': tolerance,
+            'split': split,
+            'shortest_distance': float(shortest),
+            'dag_arcs': int(np.count_nonzero(in_dag)),
+        },
+    }
+
+
+def _allocate_on_balancer(balancer, source, target, total_flow, strategy='balanced', num_paths=3, auto_k=True,
+                          path_mode='penalty', ecmp_tolerance=0.0, ecmp_split='uniform'):
+    """
+    在已构建的 LoadBalancer 上计算路径和流量分配
+
+    边使用情况直接读取 balancer.edge_usage，便于批量分配时复用同一张图与同一份使用账本。
+    """
+    edge_usage = balancer.edge_usage
+
+    if strategy == 'ecmp':
+        # ECMP 不做 k 路径搜索，直接在等价 DAG 上逐跳分流
+        return _ecmp_allocation(balancer, source, target, total_flow, ecmp_tolerance, ecmp_split)
 
     # 根据策略确定路径数量
     if strategy == 'single':
@@ -250,16 +700,18 @@ def calculate_paths_with_allocation(
     else:
         # 智能选择k值
         if auto_k:
-            k = _determine_optimal_k(balancer, source, target, total_flow, num_paths, edge_usage)
+            k = _determine_optimal_k(balancer, source, target, total_flow, num_paths, edge_usage, path_mode)
         else:
             k = num_paths
 
     # 查找 k 条路径
-    paths = balancer.find_k_shortest_paths(source, target, k)
+    paths = balancer.find_k_shortest_paths(source, target, k, path_mode=path_mode)
     if not paths:
         return {'error': 'No path found', 'paths': [], 'path_allocations': []}
 
     # 计算每条路径的可用容量（考虑已占用的流量）
+    graph = balancer.graph
+    residual = balancer.arc_residual()
     path_capacities = []
     path_available_capacities = []  # 实际可用容量
     
@@ -271,16 +723,12 @@ def calculate_paths_with_allocation(
             u, v = path[i], path[i + 1]
             
             # 获取边的总容量
-            capacity = balancer.G[u][v].get('capacity', 1000)
+            a = graph.arc(u, v)
+            capacity = graph.capacity_of(u, v)
             min_capacity = min(min_capacity, capacity)
             
-            # 计算剩余容量（考虑当前占用）
-            # 无向图，需要检查两个方向
-            used_flow = max(
-                edge_usage.get((u, v), 0) if edge_usage else 0,
-                edge_usage.get((v, u), 0) if edge_usage else 0
-            )
-            available = max(0, capacity - used_flow)  # 确保不为负
+            # 计算剩余容量（考虑当前占用，无向图两个方向取较大占用，确保不为负）
+            available = residual[a]
             min_available = min(min_available, available)
         
         path_capacities.append(min_capacity)  # 原始容量（用于显示）
@@ -317,6 +765,18 @@ def calculate_paths_with_allocation(
             'available_capacity': available,  # 实际可用容量
             'utilization': flow / path_capacities[0] if path_capacities[0] > 0 else 0,
         })
+    elif strategy == 'maxmin':
+        # max-min 公平策略：渐进填充，链路剩余容量约束已在填充过程中满足
+        flow_allocations = _maxmin_allocation(balancer, paths, total_flow)
+        for capacity, available, flow in zip(path_capacities, path_available_capacities, flow_allocations):
+            path_allocations.append({
+                'flow': flow,
+                'capacity': capacity,  # 原始容量
+                'available_capacity': available,  # 实际可用容量
+                'utilization': flow / capacity if capacity > 0 else 0,
+            })
+        actual_flow = sum(flow_allocations)
+        is_limited = actual_flow < total_flow - 1e-9
     else:
         # 多路径负载均衡策略：按照可用容量比例分配流量，并考虑共享边约束
         
@@ -342,18 +802,9 @@ def calculate_paths_with_allocation(
                     total_edge_flow = sum(flow_allocations[idx] for idx in path_indices)
                     
                     # 获取这条边的可用容量
-                    u, v = edge_key
-                    edge = next((e for e in edges if 
-                               (e['from'] == u and e['to'] == v) or 
-                               (e['from'] == v and e['to'] == u)), None)
-                    
-                    if edge:
-                        capacity = edge['capacity']
-                        used_flow = max(
-                            edge_usage.get((u, v), 0) if edge_usage else 0,
-                            edge_usage.get((v, u), 0) if edge_usage else 0
-                        )
-                        available_capacity = max(0, capacity - used_flow)
+                    a = graph.arc(*edge_key)
+                    if a is not None:
+                        available_capacity = residual[a]
                         
                         # 如果总流量超过可用容量，需要按比例减少
                         if total_edge_flow > available_capacity + 0.01:
@@ -393,3 +844,132 @@ def calculate_paths_with_allocation(
         'is_limited': is_limited,
         'num_paths': len(paths),
     }
+
+
+MATRIX_ORDERS = ('largest-first', 'shortest-first', 'random')
+
+
+def _order_demands(balancer, demands, order, seed=None):
+    """按排序策略返回需求的处理顺序（下标列表）"""
+    indices = list(range(len(demands)))
+    if order == 'largest-first':
+        indices.sort(key=lambda i: -demands[i]['demand'])
+    elif order == 'shortest-first':
+        # 按基础权重下的最短路长度排序，同一源节点只跑一次 Dijkstra
+        graph = balancer.graph
+        dist_cache = {}
+        def distance(i):
+            s, t = demands[i]['source'], demands[i]['target']
+            if s not in graph.index or t not in graph.index:
+                return INF
+            if s not in dist_cache:
+                dist_cache[s] = graph.dijkstra(graph.index[s], graph.weight)[0]
+            return dist_cache[s][graph.index[t]]
+        indices.sort(key=distance)
+    elif order == 'random':
+        import random
+        random.Random(seed).shuffle(indices)
+    else:
+        raise ValueError(f"未知的排序策略: {order}")
+    return indices
+
+
+def allocate_traffic_matrix(
+    nodes,
+    edges,
+    demands,
+    order='largest-first',
+    strategy='balanced',
+    num_paths=3,
+    edge_usage=None,
+    auto_k=True,
+    seed=None,
+):
+    """
+    批量分配流量矩阵（供 /api/traffic/allocate-matrix 使用）
+
+    所有需求共享同一个 LoadBalancer 与同一份使用账本，按 order 顺序逐个分配，
+    每次分配后立即把流量记入账本，后续需求会看到前面需求造成的链路占用。
+
+    Args:
+        nodes: 节点列表
+        edges: 边列表
+        demands: 需求列表 [{'source': s, 'target': t, 'demand': d}, ...]
+        order: 处理顺序 ('largest-first' | 'shortest-first' | 'random')
+        strategy: 单个需求的分配策略 ('single' / 'balanced' / 'maxmin' / 'ecmp')
+        num_paths: 每个需求的路径数量上限
+        edge_usage: 初始边使用情况字典 {(u,v): used_flow}（不会被修改）
+        auto_k: 是否智能选择k值
+        seed: random 顺序使用的随机种子
+
+    Returns:
+        包含逐需求结果、最终链路利用率与汇总统计的字典
+    """
+    if order not in MATRIX_ORDERS:
+        raise ValueError(f"未知的排序策略: {order}")
+
+    balancer = LoadBalancer(nodes, edges, dict(edge_usage or {}))
+    processing_order = _order_demands(balancer, demands, order, seed)
+
+    results = [None] * len(demands)
+    total_requested = 0
+    total_allocated = 0
+    satisfied = 0
+    for position, idx in enumerate(processing_order):
+        item = demands[idx]
+        source, target, demand = item['source'], item['target'], item['demand']
+        total_requested += demand
+
+        if not balancer.graph.has_node(source) or not balancer.graph.has_node(target):
+            result = {'error': 'Unknown source or target', 'paths': [], 'path_allocations': []}
+        elif source == target:
+            result = {'error': 'Source equals target', 'paths': [], 'path_allocations': []}
+        else:
+            result = _allocate_on_balancer(balancer, source, target, demand, strategy, num_paths, auto_k)
+
+        if 'error' not in result:
+            for path, allocation in zip(result['paths'], result['path_allocations']):
+                balancer.record_flow(path, allocation['flow'])
+            total_allocated += result['actual_flow']
+            if not result['is_limited']:
+                satisfied += 1
+
+        result.update({
+            'index': idx,
+            'order': position,
+            'source': source,
+            'target': target,
+            'demand': demand,
+        })
+        results[idx] = result
+
+    # 最终链路利用率（按原始无向边输出）
+    link_utilizations = []
+    max_utilization = 0
+    for edge in edges:
+        u, v = edge['from'], edge['to']
+        capacity = edge.get('capacity', 1000)
+        flow = max(balancer.edge_usage.get((u, v), 0), balancer.edge_usage.get((v, u), 0))
+        utilization = flow / capacity if capacity > 0 else 0
+        max_utilization = max(max_utilization, utilization)
+        link_utilizations.append({
+            'from': u,
+            'to': v,
+            'flow': flow,
+            'capacity': capacity,
+            'utilization': utilization,
+        })
+
+    return {
+        'results': results,
+        'link_utilizations': link_utilizations,
+        'summary': {
+            'num_demands': len(demands),
+            'satisfied_demands': satisfied,
+            'total_requested': total_requested,
+            'total_allocated': total_allocated,
+            'max_utilization': max_utilization,
+            'order': order,
+            'strategy': strategy,
+        },
+    }
@@ -1,27 +1,48 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
 import base64
+import shutil
+import tempfile
 # Force headless Matplotlib for server-side rendering before any pyplot import
 os.environ.setdefault("MPLBACKEND", "Agg")
 import matplotlib
 matplotlib.use("Agg")
 from algorithms.mst import kruskal_mst, prim_mst
 from algorithms.maxflow import main as maxflow_main
-from algorithms.aes_encrypt import AES128
-from algorithms.utils import validate_graph_data, save_plot, draw_mst_result, draw_maxflow_result, draw_original_graph, draw_original_graph_directed
+from algorithms.aes_encrypt import (get_cipher, key_cache_info, fastest_backend, crypt_file, MODES as AES_MODES,
+                                   BACKENDS as AES_BACKENDS, BATCH_MAX_ITEMS as AES_BATCH_MAX_ITEMS,
+                                   FILE_CHUNK as AES_FILE_CHUNK, NONCE_SIZES as AES_NONCE_SIZES,
+                                   GCM_TAG_SIZE as AES_GCM_TAG_SIZE)
+from algorithms.utils import validate_graph_data, save_plot, draw_mst_result, draw_maxflow_result, draw_original_graph, draw_original_graph_directed, draw_robustness_result
 from algorithms.generate_graph import generate_random_planar_network, draw_campus_network
 from config.network_config import NetworkConfig, DEFAULT_CONFIG
-from algorithms.traffic import calculate_paths_with_allocation
+from algorithms.traffic import calculate_paths_with_allocation, allocate_traffic_matrix, MATRIX_ORDERS, PATH_MODES, ECMP_SPLITS, \
+    STRATEGIES as TRAFFIC_STRATEGIES
+from algorithms.simulation import TrafficSimulator, generate_random_flows, MAX_FLOWS as SIMULATION_MAX_FLOWS
+from algorithms.routing_graph import get_routing_graph
+from algorithms.contraction import get_contraction_hierarchy
+from algorithms.failure import analyze_failures, MAX_SCENARIOS
+from algorithms.robustness import get_robustness
+from algorithms.reliability import estimate_reliability, MAX_SAMPLES
+from algorithms.ledger import create_ledger, get_ledger, delete_ledger, LedgerConflict, LedgerRegistryFull
+from algorithms.multicommodity import max_concurrent_flow
 
 app = Flask(__name__)
-CORS(app)  # 允许跨域请求
+CORS(app, expose_headers=['X-AES-Mode', 'X-AES-Backend', 'X-AES-Nonce'])  # 允许跨域请求；二进制加解密的元数据放在响应头中
 
 # 静态文件路径
 PLOT_FOLDER = os.path.join(os.path.dirname(__file__), 'static', 'plots')
 os.makedirs(PLOT_FOLDER, exist_ok=True)
 app.config['PLOT_FOLDER'] = PLOT_FOLDER
 
+# 文件加解密端点允许访问的服务器本地目录（可用环境变量 AES_FILE_FOLDER 覆盖）
+AES_FILE_FOLDER = os.path.realpath(
+    os.environ.get('AES_FILE_FOLDER', os.path.join(os.path.dirname(__file__), 'static', 'aes_files'))
+)
+os.makedirs(AES_FILE_FOLDER, exist_ok=True)
+app.config['AES_FILE_FOLDER'] = AES_FILE_FOLDER
+
 
 
 
@@ -258,6 +279,25 @@ def calculate_dinic():
         return jsonify({'error': str(e)}), 500
 
 
+def _aes_key_bytes(key):
+    """把字符串密钥转换为 16 字节（UTF-8 编码后不足补零、超出截断）"""
+    key_bytes = key.encode('utf-8')
+    if len(key_bytes) < 16:
+        key_bytes = key_bytes + b'\x00' * (16 - len(key_bytes))
+    elif len(key_bytes) > 16:
+        key_bytes = key_bytes[:16]
+    return key_bytes
+
+
+def _aes_aad_bytes(aad):
+    """把 GCM 附加认证数据（文本）转换为 bytes，缺省或 null 视为空；非字符串抛出 ValueError"""
+    if aad is None:
+        return b''
+    if not isinstance(aad, str):
+        raise ValueError('aad must be a string')
+    return aad.encode('utf-8')
+
+
 @app.route('/api/aes/encrypt', methods=['POST'])
 def aes_encrypt():
     """AES加密，返回十六进制字符串"""
@@ -265,28 +305,49 @@ def aes_encrypt():
         data = request.get_json()
         plaintext = data.get('plaintext', '')
         key = data.get('key', '')
+        mode = data.get('mode', 'ecb')  # 'ecb' | 'ctr' | 'gcm'
+        nonce_hex = data.get('nonce')   # CTR / GCM 可选：hex 编码的 nonce，缺省时随机生成
+        aad = _aes_aad_bytes(data.get('aad'))  # GCM 可选：只认证、不加密的附加数据（文本）
+        backend = data.get('backend')   # 可选：'pure' | 'ttable' | 'numpy' | 'openssl'，输出与实现无关
+        verify = bool(data.get('verify', False))  # 可选：用 pure 实现抽查分组
         
         if not plaintext or not key:
             return jsonify({'error': 'Plaintext and key are required'}), 400
         
-        # 确保key是16字节
-        key_bytes = key.encode('utf-8')
-        if len(key_bytes) < 16:
-            key_bytes = key_bytes + b'\x00' * (16 - len(key_bytes))
-        elif len(key_bytes) > 16:
-            key_bytes = key_bytes[:16]
+        if mode not in AES_MODES:
+            return jsonify({'error': f'mode must be one of {list(AES_MODES)}'}), 400
         
-        cipher = AES128(key_bytes)
-        encrypted_bytes = cipher.encrypt(plaintext)
+        if backend is not None and backend not in AES_BACKENDS:
+            return jsonify({'error': f'backend must be one of {list(AES_BACKENDS)}'}), 400
+        
+        nonce = None
+        if mode in AES_NONCE_SIZES:
+            try:
+                nonce = bytes.fromhex(nonce_hex) if nonce_hex else os.urandom(AES_NONCE_SIZES[mode])
+            except ValueError:
+                return jsonify({'error': '无效的 nonce 十六进制字符串'}), 400
+        
+        # 密钥扩展结果按密钥缓存，重复使用同一密钥时跳过扩展
+        cipher = get_cipher(_aes_key_bytes(key), backend, verify)
+        encrypted_bytes = cipher.encrypt(plaintext, mode=mode, nonce=nonce, aad=aad)
         # 直接返回十六进制字符串
         encrypted_hex = encrypted_bytes.hex()
         
-        return jsonify({
+        result = {
             'plaintext': plaintext,
             'encrypted': encrypted_hex,
             'key_length': len(key),
+            'mode': mode,
+            'backend': cipher.backend,
             'format': 'hex'
-        })
+        }
+        if nonce is not None:
+            result['nonce'] = nonce.hex()
+        if mode == 'gcm':
+            result['tag'] = encrypted_bytes[-AES_GCM_TAG_SIZE:].hex()  # 已包含在 encrypted 末尾
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -298,36 +359,315 @@ def aes_decrypt():
         data = request.get_json()
         encrypted = data.get('encrypted', '')
         key = data.get('key', '')
+        mode = data.get('mode', 'ecb')  # 'ecb' | 'ctr' | 'gcm'
+        nonce_hex = data.get('nonce')   # CTR / GCM 必填：加密时返回的 nonce
+        aad = _aes_aad_bytes(data.get('aad'))  # GCM：与加密时相同的附加数据
+        backend = data.get('backend')
+        verify = bool(data.get('verify', False))
         
         if not encrypted or not key:
             return jsonify({'error': 'Encrypted text and key are required'}), 400
         
-        # 确保key是16字节
-        key_bytes = key.encode('utf-8')
-        if len(key_bytes) < 16:
-            key_bytes = key_bytes + b'\x00' * (16 - len(key_bytes))
-        elif len(key_bytes) > 16:
-            key_bytes = key_bytes[:16]
+        if mode not in AES_MODES:
+            return jsonify({'error': f'mode must be one of {list(AES_MODES)}'}), 400
+        
+        if backend is not None and backend not in AES_BACKENDS:
+            return jsonify({'error': f'backend must be one of {list(AES_BACKENDS)}'}), 400
         
-        cipher = AES128(key_bytes)
+        nonce = None
+        if mode in AES_NONCE_SIZES:
+            if not nonce_hex:
+                return jsonify({'error': f'nonce is required for {mode} mode'}), 400
+            try:
+                nonce = bytes.fromhex(nonce_hex)
+            except ValueError:
+                return jsonify({'error': '无效的 nonce 十六进制字符串'}), 400
+        
+        # 密钥扩展结果按密钥缓存，重复使用同一密钥时跳过扩展
+        cipher = get_cipher(_aes_key_bytes(key), backend, verify)
         # 从十六进制转换回字节
         try:
             encrypted_bytes = bytes.fromhex(encrypted)
         except ValueError:
             return jsonify({'error': '无效的十六进制字符串'}), 400
         
-        decrypted_bytes = cipher.decrypt(encrypted_bytes)
+        # GCM 认证失败时抛出 InvalidTag（ValueError 子类），不返回任何明文
+        decrypted_bytes = cipher.decrypt(encrypted_bytes, mode=mode, nonce=nonce, aad=aad)
         decrypted = decrypted_bytes.decode('utf-8')
         
         return jsonify({
             'encrypted': encrypted,
             'decrypted': decrypted,
+            'mode': mode,
+            'backend': cipher.backend,
             'format': 'hex'
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/aes/batch', methods=['POST'])
+def aes_batch():
+    """批量加解密：一次请求处理多条消息，密钥只扩展一次，所有分组合并后批量运算"""
+    try:
+        import time
+        start_time = time.perf_counter()
+        data = request.get_json()
+        key = data.get('key', '')
+        operation = data.get('operation', 'encrypt')  # 'encrypt' | 'decrypt'
+        items = data.get('items', [])  # 加密为明文字符串列表，解密为 hex 密文列表
+        mode = data.get('mode', 'ecb')
+        nonces_hex = data.get('nonces')  # CTR / GCM：与 items 一一对应的 hex nonce（加密时可省略，随机生成）
+        aads_text = data.get('aads')  # GCM 可选：与 items 一一对应的附加认证数据（文本）
+        backend = data.get('backend') or fastest_backend()
+
+        if not key:
+            return jsonify({'error': 'Key is required'}), 400
+
+        if operation not in ('encrypt', 'decrypt'):
+            return jsonify({'error': "operation must be 'encrypt' or 'decrypt'"}), 400
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+
+        if len(items) > AES_BATCH_MAX_ITEMS:
+            return jsonify({'error': f'At most {AES_BATCH_MAX_ITEMS} items per batch'}), 400
+
+        if mode not in AES_MODES:
+            return jsonify({'error': f'mode must be one of {list(AES_MODES)}'}), 400
+
+        if backend not in AES_BACKENDS:
+            return jsonify({'error': f'backend must be one of {list(AES_BACKENDS)}'}), 400
+
+        decrypt = operation == 'decrypt'
+        if mode in AES_NONCE_SIZES:
+            if nonces_hex is None and not decrypt:
+                nonces_hex = [os.urandom(AES_NONCE_SIZES[mode]).hex() for _ in items]
+            if not isinstance(nonces_hex, list) or len(nonces_hex) != len(items):
+                return jsonify({'error': 'nonces must be a list of the same length as items'}), 400
+
+        # GCM：aads 逐条指定附加认证数据，或用 aad 为所有消息指定同一段
+        aads = None
+        if mode == 'gcm':
+            if aads_text is None:
+                aads = [_aes_aad_bytes(data.get('aad'))] * len(items)
+            elif not isinstance(aads_text, list) or len(aads_text) != len(items):
+                return jsonify({'error': 'aads must be a list of the same length as items'}), 400
+            else:
+                aads = [b''] * len(items)
+
+        # 逐条解析输入，格式错误只影响该条消息
+        errors = [None] * len(items)
+        payloads = [b''] * len(items)
+        nonces = [b''] * len(items) if mode in AES_NONCE_SIZES else None
+        for i, item in enumerate(items):
+            try:
+                if not isinstance(item, str):
+                    raise ValueError('item must be a string')
+                payloads[i] = bytes.fromhex(item) if decrypt else item.encode('utf-8')
+                if nonces is not None:
+                    nonces[i] = bytes.fromhex(nonces_hex[i])
+                if mode == 'gcm' and aads_text is not None:
+                    aads[i] = _aes_aad_bytes(aads_text[i])
+            except (ValueError, TypeError) as e:
+                errors[i] = str(e)
+
+        cipher = get_cipher(_aes_key_bytes(key), backend)
+        valid = [i for i in range(len(items)) if errors[i] is None]
+        outputs = cipher.crypt_batch(
+            [payloads[i] for i in valid],
+            decrypt=decrypt,
+            mode=mode,
+            nonces=[nonces[i] for i in valid] if nonces is not None else None,
+            aads=[aads[i] for i in valid] if aads is not None else None
+        )
+
+        results = [{'index': i, 'error': errors[i]} for i in range(len(items))]
+        for i, (output, error) in zip(valid, outputs):
+            if error is not None:
+                results[i]['error'] = error
+                continue
+            if decrypt:
+                try:
+                    results[i]['decrypted'] = output.decode('utf-8')
+                except UnicodeDecodeError:
+                    results[i]['error'] = '解密结果不是有效的 UTF-8 文本'
+                    continue
+            else:
+                results[i]['encrypted'] = output.hex()
+            if nonces is not None:
+                results[i]['nonce'] = nonces_hex[i]
+        for result in results:
+            if result['error'] is None:
+                del result['error']
+
+        return jsonify({
+            'results': results,
+            'count': len(items),
+            'failed': sum(1 for result in results if 'error' in result),
+            'operation': operation,
+            'mode': mode,
+            'backend': cipher.backend,
+            'format': 'hex',
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000,
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _aes_stream_options(options, decrypt):
+    """解析二进制/文件端点的 mode、nonce、aad、backend 选项，返回 (mode, nonce, aad, backend) 或抛出 ValueError"""
+    mode = options.get('mode', 'ecb')
+    if mode not in AES_MODES:
+        raise ValueError(f'mode must be one of {list(AES_MODES)}')
+    backend = options.get('backend') or fastest_backend()
+    if backend not in AES_BACKENDS:
+        raise ValueError(f'backend must be one of {list(AES_BACKENDS)}')
+    nonce = None
+    if mode in AES_NONCE_SIZES:
+        nonce_hex = options.get('nonce')
+        if not nonce_hex:
+            if decrypt:
+                raise ValueError(f'nonce is required for {mode} mode')
+            nonce = os.urandom(AES_NONCE_SIZES[mode])
+        else:
+            nonce = bytes.fromhex(nonce_hex)
+    aad = _aes_aad_bytes(options.get('aad'))  # GCM 附加认证数据
+    return mode, nonce, aad, backend
+
+
+def _stream_file_and_remove(path, work_dir):
+    """分块读出文件内容，响应结束（或客户端断开）时删除所在的临时目录"""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(AES_FILE_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _aes_local_path(relative_path):
+    """把相对路径解析到 AES_FILE_FOLDER 内，越界时抛出 ValueError"""
+    if not relative_path or not isinstance(relative_path, str):
+        raise ValueError('path is required')
+    folder = app.config['AES_FILE_FOLDER']
+    path = os.path.realpath(os.path.join(folder, relative_path))
+    if os.path.commonpath([folder, path]) != folder or path == folder:
+        raise ValueError('path must be inside the AES file folder')
+    return path
+
+
+@app.route('/api/aes/binary/<operation>', methods=['POST'])
+def aes_binary(operation):
+    """
+    二进制加解密：请求体为原始字节（或 multipart 的 file 字段），响应为原始字节（application/octet-stream）
+
+    密钥通过请求头 X-AES-Key 传入，mode / nonce / aad / backend 通过查询参数传入；
+    上传内容先落盘，再以内存映射经流式接口处理，内存占用与文件大小无关。
+    """
+    if operation not in ('encrypt', 'decrypt'):
+        return jsonify({'error': "operation must be 'encrypt' or 'decrypt'"}), 404
+    work_dir = None
+    try:
+        key = request.headers.get('X-AES-Key', '')  # 只从请求头读取，避免密钥出现在 URL 与访问日志中
+        if not key:
+            return jsonify({'error': 'Key is required (X-AES-Key header)'}), 400
+        decrypt = operation == 'decrypt'
+        mode, nonce, aad, backend = _aes_stream_options(request.args, decrypt)
+
+        work_dir = tempfile.mkdtemp(prefix='aes-')
+        src_path = os.path.join(work_dir, 'input')
+        dst_path = os.path.join(work_dir, 'output')
+        upload = request.files.get('file')
+        with open(src_path, 'wb') as src_file:
+            shutil.copyfileobj(upload.stream if upload else request.stream, src_file, AES_FILE_CHUNK)
+
+        cipher = get_cipher(_aes_key_bytes(key), backend)
+        crypt_file(cipher, src_path, dst_path, decrypt=decrypt, mode=mode, nonce=nonce, aad=aad)
+
+        headers = {
+            'Content-Length': str(os.path.getsize(dst_path)),
+            'Content-Disposition': f'attachment; filename={operation}ed.bin',
+            'X-AES-Mode': mode,
+            'X-AES-Backend': cipher.backend,
+        }
+        if nonce is not None:
+            headers['X-AES-Nonce'] = nonce.hex()
+        # 临时目录交给响应生成器，发送完毕后删除
+        body = _stream_file_and_remove(dst_path, work_dir)
+        work_dir = None
+        return Response(body, mimetype='application/octet-stream', headers=headers)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+@app.route('/api/aes/file', methods=['POST'])
+def aes_file():
+    """服务器本地文件加解密：输入/输出为 AES_FILE_FOLDER 下的相对路径，内存映射 + 流式处理"""
+    try:
+        import time
+        start_time = time.perf_counter()
+        data = request.get_json()
+        key = data.get('key', '')
+        operation = data.get('operation', 'encrypt')
+
+        if not key:
+            return jsonify({'error': 'Key is required'}), 400
+
+        if operation not in ('encrypt', 'decrypt'):
+            return jsonify({'error': "operation must be 'encrypt' or 'decrypt'"}), 400
+
+        decrypt = operation == 'decrypt'
+        mode, nonce, aad, backend = _aes_stream_options(data, decrypt)
+        src_path = _aes_local_path(data.get('input_path'))
+        dst_path = _aes_local_path(data.get('output_path'))
+        if not os.path.isfile(src_path):
+            return jsonify({'error': 'Input file not found'}), 404
+        if src_path == dst_path:
+            return jsonify({'error': 'output_path must differ from input_path'}), 400
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+
+        cipher = get_cipher(_aes_key_bytes(key), backend)
+        bytes_in, bytes_out = crypt_file(cipher, src_path, dst_path, decrypt=decrypt, mode=mode, nonce=nonce,
+                                         aad=aad)
+
+        result = {
+            'operation': operation,
+            'input_path': data.get('input_path'),
+            'output_path': data.get('output_path'),
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'mode': mode,
+            'backend': cipher.backend,
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000,
+        }
+        if nonce is not None:
+            result['nonce'] = nonce.hex()
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/aes/cache-stats', methods=['GET'])
+def aes_cache_stats():
+    """密钥扩展缓存的大小与命中统计"""
+    return jsonify(key_cache_info())
+
+
 @app.route('/api/plots/<filename>')
 def get_plot(filename):
     """获取生成的图像文件"""
@@ -396,6 +736,110 @@ def generate_network():
 
 
 
+@app.route('/api/network/robustness', methods=['POST'])
+def network_robustness():
+    """网络鲁棒性分析：桥、割点、2-边/2-点连通分量（图像可选）"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        render = bool(data.get('render', False))
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        result, cached = get_robustness(nodes, edges)
+        response = dict(result)
+        response['cached'] = cached
+
+        # 可视化开销远大于 O(V+E) 的分析本身，仅在请求时生成
+        if render:
+            response['visualization'] = draw_robustness_result(
+                nodes, edges, result['bridges'], result['articulation_points']
+            )
+
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/network/reliability', methods=['POST'])
+def network_reliability():
+    """蒙特卡洛估计两点保持连通（或最大流不低于 min_flow）的概率，附置信区间"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        source = data.get('source')
+        target = data.get('target')
+        samples = data.get('samples', 10000)
+        min_flow = data.get('min_flow')
+        tolerance = data.get('tolerance')
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        if source is None or target is None:
+            return jsonify({'error': 'Missing source or target'}), 400
+
+        if not isinstance(samples, int) or not 1 <= samples <= MAX_SAMPLES:
+            return jsonify({'error': f'samples must be between 1 and {MAX_SAMPLES}'}), 400
+
+        result = estimate_reliability(
+            nodes, edges, source, target,
+            failure_probability=float(data.get('failure_probability', 0.01)),
+            samples=samples,
+            min_flow=float(min_flow) if min_flow is not None else None,
+            confidence=float(data.get('confidence', 0.95)),
+            tolerance=float(tolerance) if tolerance is not None else None,
+            seed=data.get('seed'),
+            workers=data.get('workers')
+        )
+
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+def _is_number(value):
+    """是否为 JSON 数值（排除布尔值）"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _parse_edge_usage(edge_usage_list):
+    """将前端传入的边使用列表 [{'from': u, 'to': v, 'flow': f}, ...] 转换为双向字典"""
+    edge_usage = {}
+    for item in edge_usage_list or []:
+        u, v = item['from'], item['to']
+        flow = item.get('flow', 0)
+        # 无向图，需要同时记录两个方向
+        edge_usage[(u, v)] = flow
+        edge_usage[(v, u)] = flow
+    return edge_usage
+
+
+def _parse_demands(demands_list):
+    """解析需求列表，兼容 [s, t, d] 三元组与 {'source', 'target', 'demand'} 字典两种格式；
+    格式错误或需求量不是非负数时返回 None"""
+    demands = []
+    for item in demands_list:
+        if isinstance(item, (list, tuple)):
+            if len(item) != 3:
+                return None
+            source, target, demand = item
+        else:
+            source, target = item.get('source'), item.get('target')
+            demand = item.get('demand', item.get('flow'))
+        if source is None or target is None or not _is_number(demand) or demand < 0:
+            return None
+        demands.append({'source': source, 'target': target, 'demand': demand})
+    return demands
+
+
 @app.route('/api/traffic/calculate-paths', methods=['POST'])
 def calculate_traffic_paths():
     """计算路径和流量分配（用于交互式仿真）"""
@@ -406,18 +850,27 @@ def calculate_traffic_paths():
         source = data.get('source')
         target = data.get('target')
         total_flow = data.get('total_flow', 1000)
-        strategy = data.get('strategy', 'balanced')  # 'single' or 'balanced'
+        strategy = data.get('strategy', 'balanced')  # 'single', 'balanced', 'maxmin' or 'ecmp'
         num_paths = data.get('num_paths', 3)
+        use_ch = data.get('use_ch')  # 可选：是否使用收缩层次索引（默认仅在已通过 routing-index 构建时使用）
+        # 可选：惩罚阈值 {'moderate_threshold', 'utilization_threshold', 'saturation_threshold'}
+        penalty_thresholds = data.get('penalty_thresholds') or {}
+        # 可选：多路径查找模式 'penalty' | 'edge-disjoint' | 'node-disjoint'
+        path_mode = data.get('path_mode', 'penalty')
+        # 可选：ECMP 代价容差与分流方式（仅 strategy='ecmp' 时生效）
+        ecmp_tolerance = data.get('ecmp_tolerance', 0.0)
+        ecmp_split = data.get('ecmp_split', 'uniform')
         
         # 获取当前边使用情况（由前端传入，用于多次调用时累积）
-        edge_usage_list = data.get('edge_usage', [])  # 格式: [{'from': u, 'to': v, 'flow': f}, ...]
-        edge_usage = {}
-        for item in edge_usage_list:
-            u, v = item['from'], item['to']
-            flow = item.get('flow', 0)
-            # 无向图，需要同时记录两个方向
-            edge_usage[(u, v)] = flow
-            edge_usage[(v, u)] = flow
+        edge_usage = _parse_edge_usage(data.get('edge_usage', []))
+        
+        # 可选：共享账本，给定时忽略 edge_usage，分配结果原子提交到账本
+        ledger = None
+        ledger_id = data.get('ledger_id')
+        if ledger_id is not None:
+            ledger = get_ledger(ledger_id)
+            if ledger is None:
+                return jsonify({'error': 'Unknown ledger_id'}), 404
         
         if not validate_graph_data(nodes, edges):
             return jsonify({'error': 'Invalid graph data'}), 400
@@ -425,24 +878,373 @@ def calculate_traffic_paths():
         if source is None or target is None:
             return jsonify({'error': 'Missing source or target'}), 400
         
+        unknown = set(penalty_thresholds) - {'moderate_threshold', 'utilization_threshold', 'saturation_threshold'}
+        if unknown:
+            return jsonify({'error': f'Unknown penalty thresholds: {sorted(unknown)}'}), 400
+        
+        if path_mode not in PATH_MODES:
+            return jsonify({'error': f'path_mode must be one of {list(PATH_MODES)}'}), 400
+        
+        if ecmp_split not in ECMP_SPLITS:
+            return jsonify({'error': f'ecmp_split must be one of {list(ECMP_SPLITS)}'}), 400
+        
+        if not isinstance(ecmp_tolerance, (int, float)) or ecmp_tolerance < 0:
+            return jsonify({'error': 'ecmp_tolerance must be a non-negative number'}), 400
+        
         # 计算路径和流量分配（传入edge_usage）
         result = calculate_paths_with_allocation(
             nodes, edges, source, target, total_flow,
             strategy=strategy,
             num_paths=num_paths,
-            edge_usage=edge_usage
+            edge_usage=edge_usage,
+            use_ch=use_ch,
+            penalty_thresholds=penalty_thresholds,
+            path_mode=path_mode,
+            ecmp_tolerance=ecmp_tolerance,
+            ecmp_split=ecmp_split,
+            ledger=ledger
         )
         
         if 'error' in result:
             return jsonify(result), 400
         
         return jsonify(result)
+    except LedgerConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+
+@app.route('/api/traffic/routing-index', methods=['POST'])
+def build_routing_index():
+    """构建（或从缓存获取）拓扑的收缩层次索引，返回索引规模与构建耗时"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        graph = get_routing_graph(nodes, edges)
+        index = get_contraction_hierarchy(graph)
+
+        return jsonify({
+            'topology_hash': graph.key,
+            'index': index.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/allocate-matrix', methods=['POST'])
+def allocate_traffic_matrix_api():
+    """批量分配流量矩阵（所有需求共享同一份使用账本，单次请求完成）"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        demands_list = data.get('demands', [])  # 格式: [{'source': s, 'target': t, 'demand': d}, ...]
+        order = data.get('order', 'largest-first')
+        strategy = data.get('strategy', 'balanced')
+        num_paths = data.get('num_paths', 3)
+        seed = data.get('seed')
+        edge_usage = _parse_edge_usage(data.get('edge_usage', []))
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        if not demands_list:
+            return jsonify({'error': 'Missing demands'}), 400
+
+        if order not in MATRIX_ORDERS:
+            return jsonify({'error': f'Invalid order, expected one of {list(MATRIX_ORDERS)}'}), 400
+
+        if strategy not in TRAFFIC_STRATEGIES:
+            return jsonify({'error': f'Invalid strategy, expected one of {list(TRAFFIC_STRATEGIES)}'}), 400
+
+        demands = _parse_demands(demands_list)
+        if demands is None:
+            return jsonify({'error': 'Invalid demand entry'}), 400
+
+        result = allocate_traffic_matrix(
+            nodes, edges, demands,
+            order=order,
+            strategy=strategy,
+            num_paths=num_paths,
+            edge_usage=edge_usage,
+            seed=seed
+        )
+
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/traffic/simulate', methods=['POST'])
+def simulate_traffic():
+    """时间步进流量仿真（流到达/离开），返回逐时间步的利用率汇总"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        flows = data.get('flows')  # 格式: [{'source', 'target', 'demand', 'arrival', 'duration'}, ...]
+        random_config = data.get('random')  # 未提供 flows 时按参数随机生成
+        tick = data.get('tick', 1.0)
+        horizon = data.get('horizon')
+        num_paths = data.get('num_paths', 3)
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        if not _is_number(tick) or tick <= 0:
+            return jsonify({'error': 'tick must be a positive number'}), 400
+        if horizon is not None and (not _is_number(horizon) or horizon <= 0):
+            return jsonify({'error': 'horizon must be a positive number'}), 400
+        if not isinstance(num_paths, int) or isinstance(num_paths, bool) or num_paths < 1:
+            return jsonify({'error': 'num_paths must be a positive integer'}), 400
+
+        if flows is None:
+            if not random_config:
+                return jsonify({'error': 'Missing flows or random config'}), 400
+            num_flows = int(random_config.get('num_flows', 1000))
+            if not 0 <= num_flows <= SIMULATION_MAX_FLOWS:
+                return jsonify({'error': f'num_flows must be between 0 and {SIMULATION_MAX_FLOWS}'}), 400
+            flows = generate_random_flows(
+                nodes,
+                num_flows=num_flows,
+                horizon=float(random_config.get('horizon', 3600)),
+                demand_range=tuple(random_config.get('demand_range', [10, 200])),
+                mean_duration=float(random_config.get('mean_duration', 60)),
+                seed=random_config.get('seed')
+            )
+
+        if len(flows) > SIMULATION_MAX_FLOWS:
+            return jsonify({'error': f'At most {SIMULATION_MAX_FLOWS} flows per simulation'}), 400
+
+        for flow in flows:
+            if not isinstance(flow, dict) or any(flow.get(k) is None for k in ('source', 'target', 'demand', 'arrival')):
+                return jsonify({'error': 'Invalid flow entry'}), 400
+            if not all(_is_number(flow[k]) for k in ('demand', 'arrival')) or \
+                    not _is_number(flow.get('duration', 0)):
+                return jsonify({'error': 'Flow demand, arrival and duration must be numbers'}), 400
+
+        # 可选：写入服务端账本，仿真运行期间可通过 /api/traffic/ledger/<id>/utilization 轮询
+        ledger = None
+        ledger_id = data.get('ledger_id')
+        if ledger_id is not None:
+            ledger = get_ledger(ledger_id)
+            if ledger is None:
+                return jsonify({'error': 'Unknown ledger_id'}), 404
+
+        simulator = TrafficSimulator(
+            nodes, edges,
+            strategy=data.get('strategy', 'balanced'),
+            num_paths=num_paths,
+            tick=tick,
+            congestion_threshold=data.get('congestion_threshold', 0.8),
+            ledger=ledger
+        )
+        result = simulator.run(flows, horizon=horizon)
+        if ledger_id is not None:
+            result['ledger_id'] = ledger_id
+
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/ledger', methods=['POST'])
+def create_usage_ledger():
+    """创建服务端链路使用账本（仿真写入、仪表盘轮询利用率快照）"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        edge_usage = _parse_edge_usage(data.get('edge_usage', []))
+        ledger_id, ledger = create_ledger(nodes, edges, edge_usage)
+
+        return jsonify({
+            'ledger_id': ledger_id,
+            'num_links': len(ledger.links),
+            'version': ledger.version,
+        })
+    except LedgerRegistryFull as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/ledger/<ledger_id>/utilization', methods=['GET'])
+def ledger_utilization(ledger_id):
+    """账本利用率快照：逐链路利用率、直方图分桶与 Top-N 热点链路"""
+    try:
+        ledger = get_ledger(ledger_id)
+        if ledger is None:
+            return jsonify({'error': 'Unknown ledger_id'}), 404
+
+        top_n = request.args.get('top', 10, type=int)
+        bins = request.args.get('bins', 10, type=int)
+        include_links = request.args.get('links', '1') not in ('0', 'false')
+        since_version = request.args.get('since_version', type=int)
+
+        if top_n is None or top_n < 0 or bins is None or not 1 <= bins <= 100:
+            return jsonify({'error': 'top must be >= 0 and bins between 1 and 100'}), 400
+
+        # 轮询时账本未变化则只返回版本号
+        if since_version is not None and since_version == ledger.version:
+            return jsonify({'version': ledger.version, 'unchanged': True})
+
+        return jsonify(ledger.snapshot(top_n=top_n, bins=bins, include_links=include_links))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/ledger/<ledger_id>/reserve', methods=['POST'])
+def ledger_reserve(ledger_id):
+    """在共享账本上原子预留一组路径的带宽（全部链路校验通过才生效）"""
+    try:
+        ledger = get_ledger(ledger_id)
+        if ledger is None:
+            return jsonify({'error': 'Unknown ledger_id'}), 404
+
+        data = request.get_json()
+        paths = data.get('paths', [])  # 格式: [[n1, n2, ...], ...]
+        flows = data.get('flows', [])  # 与 paths 一一对应的流量
+        enforce_capacity = bool(data.get('enforce_capacity', True))
+
+        if not paths or len(paths) != len(flows):
+            return jsonify({'error': 'paths and flows must be non-empty and of equal length'}), 400
+
+        link_ids, amounts = ledger.path_links(paths, [float(flow) for flow in flows])
+        reservation_id = ledger.reserve(link_ids, amounts, enforce_capacity=enforce_capacity)
+
+        return jsonify({'reservation_id': reservation_id, 'version': ledger.version})
+    except LedgerConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/ledger/<ledger_id>/release', methods=['POST'])
+def ledger_release(ledger_id):
+    """释放账本上的一次预留（calculate-paths 提交的分配或 reserve 返回的预留）"""
+    try:
+        ledger = get_ledger(ledger_id)
+        if ledger is None:
+            return jsonify({'error': 'Unknown ledger_id'}), 404
+
+        data = request.get_json()
+        reservation_id = data.get('reservation_id')
+        if not reservation_id:
+            return jsonify({'error': 'Missing reservation_id'}), 400
+
+        if not ledger.release(reservation_id):
+            return jsonify({'error': 'Unknown reservation_id'}), 404
+
+        return jsonify({'released': reservation_id, 'version': ledger.version})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/ledger/<ledger_id>', methods=['DELETE'])
+def ledger_delete(ledger_id):
+    """删除账本，释放服务端登记表中的位置"""
+    try:
+        if not delete_ledger(ledger_id):
+            return jsonify({'error': 'Unknown ledger_id'}), 404
+        return jsonify({'deleted': ledger_id})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/failure-analysis', methods=['POST'])
+def traffic_failure_analysis():
+    """链路/节点失效 what-if 分析：逐场景重路由全部活动流，统计丢失流量与峰值利用率"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        flows_list = data.get('flows', [])  # 格式: [{'source': s, 'target': t, 'demand': d}, ...]
+        max_scenarios = data.get('max_scenarios', 200)
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        flows = _parse_demands(flows_list)
+        if not flows:
+            return jsonify({'error': 'Missing or invalid flows'}), 400
+
+        if not isinstance(max_scenarios, int) or not 1 <= max_scenarios <= MAX_SCENARIOS:
+            return jsonify({'error': f'max_scenarios must be between 1 and {MAX_SCENARIOS}'}), 400
+
+        result = analyze_failures(
+            nodes, edges, flows,
+            strategy=data.get('strategy', 'balanced'),
+            num_paths=data.get('num_paths', 3),
+            include_nodes=bool(data.get('include_nodes', True)),
+            include_double=bool(data.get('include_double', False)),
+            max_scenarios=max_scenarios
+        )
+
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/traffic/multicommodity', methods=['POST'])
+def traffic_multicommodity():
+    """最大并发多商品流：整个需求矩阵同时按同一比例满足时的最大比例（(1-ε) 近似）"""
+    try:
+        data = request.get_json()
+        nodes = data.get('nodes', [])
+        edges = data.get('edges', [])
+        demands_list = data.get('demands', [])  # 格式: [{'source': s, 'target': t, 'demand': d}, ...]
+        epsilon = data.get('epsilon', 0.1)
+        workers = data.get('workers')
+
+        if not validate_graph_data(nodes, edges):
+            return jsonify({'error': 'Invalid graph data'}), 400
+
+        demands = _parse_demands(demands_list)
+        if not demands:
+            return jsonify({'error': 'Missing or invalid demands'}), 400
+
+        if not isinstance(epsilon, (int, float)):
+            return jsonify({'error': 'epsilon must be a number'}), 400
+
+        result = max_concurrent_flow(nodes, edges, demands, epsilon=float(epsilon), workers=workers)
+
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
 
 
 if __name__ == '__main__':
@@ -0,0 +1,260 @@
+"""AES128 各实现的已知答案测试（FIPS-197 / NIST SP 800-38A / GCM）与吞吐量基准，结果以 JSON 输出
+
+用法（在 backend 目录下运行）:
+    python benchmark_aes.py                          # 全部实现、模式与默认规模，输出到标准输出
+    python benchmark_aes.py --sizes 16 65536 --backends numpy openssl -o aes_bench.json
+    python benchmark_aes.py --conformance-only
+
+已知答案测试失败时退出码为 1，便于在持续集成中追踪回归。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from algorithms.aes_encrypt import (AES128, BACKENDS, MODES, NONCE_SIZES, CTR_PARALLEL_THRESHOLD, InvalidTag,
+                                   openssl_available)
+
+# NIST SP 800-38A 附录 F 的四个明文分组（ECB 与 CTR 共用）
+SP800_38A_KEY = '2b7e151628aed2a6abf7158809cf4f3c'
+SP800_38A_PLAINTEXT = ('6bc1bee22e409f96e93d7e117393172a'
+                       'ae2d8a571e03ac9c9eb76fac45af8e51'
+                       '30c81c46a35ce411e5fbc1191a0a52ef'
+                       'f69f2445df4f9b17ad2b417be66c3710')
+
+# 已知答案向量：(名称, 模式, 密钥, nonce/初始计数器, 明文, 密文)，全部为十六进制
+VECTORS = [
+    ('FIPS-197 C.1', 'ecb', '000102030405060708090a0b0c0d0e0f', None,
+     '00112233445566778899aabbccddeeff', '69c4e0d86a7b0430d8cdb78070b4c55a'),
+    ('SP 800-38A F.1.1/F.1.2 ECB-AES128', 'ecb', SP800_38A_KEY, None, SP800_38A_PLAINTEXT,
+     '3ad77bb40d7a3660a89ecaf32466ef97'
+     'f5d3d58503b9699de785895a96fdbaaf'
+     '43b1cd7f598ece23881b00e3ed030688'
+     '7b0c785e27e8ad3f8223207104725dd4'),
+    ('SP 800-38A F.5.1/F.5.2 CTR-AES128', 'ctr', SP800_38A_KEY, 'f0f1f2f3f4f5f6f7f8f9fafbfcfdfeff',
+     SP800_38A_PLAINTEXT,
+     '874d6191b620e3261bef6864990db6ce'
+     '9806f66b7970fdff8617187bb9fffdff'
+     '5ae4df3edbd5d35e5b4f09020db03eab'
+     '1e031dda2fbe03d1792170a0f3009cee'),
+]
+
+# GCM 规范（McGrew & Viega）AES-128 测试用例：(名称, 密钥, IV, 附加数据, 明文, 密文, 标签)
+GCM_KEY = 'feffe9928665731c6d6a8f9467308308'
+GCM_PLAINTEXT = ('d9313225f88406e5a55909c5aff5269a86a7a9531534f7da2e4c303d8a318a72'
+                 '1c3c0c95956809532fcf0e2449a6b525b16aedf5aa0de657ba637b391aafd255')
+GCM_AAD = 'feedfacedeadbeeffeedfacedeadbeefabaddad2'
+GCM_VECTORS = [
+    ('GCM Test Case 1', '00' * 16, '00' * 12, '', '', '', '58e2fccefa7e3061367f1d57a4e7455a'),
+    ('GCM Test Case 2', '00' * 16, '00' * 12, '', '00' * 16,
+     '0388dace60b6a392f328c2b971b2fe78', 'ab6e47d42cec13bdf53a67b21257bddf'),
+    ('GCM Test Case 3', GCM_KEY, 'cafebabefacedbaddecaf888', '', GCM_PLAINTEXT,
+     '42831ec2217774244b7221b784d0d49ce3aa212f2c02a4e035c17e2329aca12e'
+     '21d514b25466931c7d8f6a5aac84aa051ba30b396a0aac973d58e091473f5985',
+     '4d5c2af327cd64a62cf35abd2ba6fab4'),
+    ('GCM Test Case 4', GCM_KEY, 'cafebabefacedbaddecaf888', GCM_AAD, GCM_PLAINTEXT[:120],
+     '42831ec2217774244b7221b784d0d49ce3aa212f2c02a4e035c17e2329aca12e'
+     '21d514b25466931c7d8f6a5aac84aa051ba30b396a0aac973d58e091',
+     '5bc94fbc3221a5db94fae95ae7121a47'),
+    ('GCM Test Case 5 (64-bit IV)', GCM_KEY, 'cafebabefacedbad', GCM_AAD, GCM_PLAINTEXT[:120],
+     '61353b4c2806934a777ff51fa22a4755699b2a714fcdc6f83766e5f97b6c7423'
+     '73806900e49f24b22b097544d4896b424989b5e1ebac0f07c23f4598',
+     '3612d2e79e3b0785561be14aaca2fccb'),
+    ('GCM Test Case 6 (480-bit IV)', GCM_KEY,
+     '9313225df88406e555909c5aff5269aa6a7a9538534f7da1e4c303d2a318a728'
+     'c3c0c95156809539fcf0e2429a6b525416aedbf5a0de6a57a637b39b', GCM_AAD, GCM_PLAINTEXT[:120],
+     '8ce24998625615b603a033aca13fb894be9112a5c3a211a8ba262a3cca7e2ca7'
+     '01e4a9a4fba43c90ccdcb281d48c7c6fd62875d2aca417034c34aee5',
+     '619cc5aefffe0bfa462af43c1699d050'),
+]
+
+DEFAULT_SIZES = [16, 256, 4096, 1 << 16, 1 << 20, 1 << 24, 1 << 26]  # 16 B ~ 64 MB
+BENCH_KEY = bytes(range(16))
+BENCH_NONCES = {mode: bytes(range(size)) for mode, size in NONCE_SIZES.items()}
+
+
+def _run(aes, mode, data, decrypt=False, workers=1):
+    """按模式加密或解密一次（ECB 含 PKCS#7 填充、GCM 含标签生成与校验，与 API 行为一致）"""
+    nonce = BENCH_NONCES.get(mode)
+    if decrypt:
+        return aes.decrypt(data, mode=mode, nonce=nonce, workers=workers)
+    return aes.encrypt(data, mode=mode, nonce=nonce, workers=workers)
+
+
+def _known_answer(aes, mode, nonce, plaintext, decrypt=False):
+    """不带填充地处理已知答案向量（ECB 直接调用 crypt_blocks，CTR 以 nonce 为完整初始计数器块）"""
+    if mode == 'ctr':
+        return aes.ctr_crypt(plaintext, nonce, workers=1)
+    out = bytearray(len(plaintext))
+    aes.crypt_blocks(memoryview(plaintext), memoryview(out), decrypt=decrypt)
+    return bytes(out)
+
+
+def check_conformance(backends):
+    """对每个实现运行全部已知答案向量（加密与解密两个方向）"""
+    results = []
+    for backend in backends:
+        for name, mode, key, nonce, plaintext, ciphertext in VECTORS:
+            aes = AES128(bytes.fromhex(key), backend=backend)
+            nonce = bytes.fromhex(nonce) if nonce else None
+            plaintext, ciphertext = bytes.fromhex(plaintext), bytes.fromhex(ciphertext)
+            for direction, src, expected in (('encrypt', plaintext, ciphertext), ('decrypt', ciphertext, plaintext)):
+                try:
+                    got = _known_answer(aes, mode, nonce, src, decrypt=direction == 'decrypt')
+                    error = None if got == expected else f'expected {expected.hex()}, got {got.hex()}'
+                except Exception as e:
+                    error = f'{type(e).__name__}: {e}'
+                results.append({
+                    'vector': name,
+                    'backend': backend,
+                    'mode': mode,
+                    'direction': direction,
+                    'passed': error is None,
+                    **({'error': error} if error else {}),
+                })
+        for name, key, iv, aad, plaintext, ciphertext, tag in GCM_VECTORS:
+            aes = AES128(bytes.fromhex(key), backend=backend)
+            iv, aad = bytes.fromhex(iv), bytes.fromhex(aad)
+            plaintext, sealed = bytes.fromhex(plaintext), bytes.fromhex(ciphertext + tag)
+            tampered = bytearray(sealed)
+            tampered[-1] ^= 1
+            checks = (
+                ('encrypt', lambda: aes.encrypt(plaintext, mode='gcm', nonce=iv, aad=aad), sealed),
+                ('decrypt', lambda: aes.decrypt(sealed, mode='gcm', nonce=iv, aad=aad), plaintext),
+                ('reject-tampered', lambda: aes.decrypt(bytes(tampered), mode='gcm', nonce=iv, aad=aad), InvalidTag),
+            )
+            for direction, func, expected in checks:
+                try:
+                    got = func()
+                    if expected is InvalidTag:
+                        error = 'tampered ciphertext was accepted'
+                    else:
+                        error = None if got == expected else f'expected {expected.hex()}, got {got.hex()}'
+                except InvalidTag as e:
+                    error = None if expected is InvalidTag else f'InvalidTag: {e}'
+                except Exception as e:
+                    error = f'{type(e).__name__}: {e}'
+                results.append({
+                    'vector': name,
+                    'backend': backend,
+                    'mode': 'gcm',
+                    'direction': direction,
+                    'passed': error is None,
+                    **({'error': error} if error else {}),
+                })
+    return results
+
+
+def _measure(func, nbytes, min_time):
+    """重复调用 func 直到累计耗时不少于 min_time 秒，返回 (MB/s, 每次耗时秒数, 次数, 最后一次结果)"""
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        result = func()
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    per_call = elapsed / iterations
+    return nbytes / per_call / 1e6, per_call, iterations, result
+
+
+def benchmark(backends, modes, sizes, worker_counts, min_time=0.2, max_seconds=10.0):
+    """
+    吞吐量基准
+
+    Args:
+        backends: 参与测试的实现
+        modes: 工作模式
+        sizes: 明文字节数列表（升序）
+        worker_counts: CTR / GCM 的进程数列表（GCM 只有密钥流部分并行，GHASH 是顺序的）；只有数据
+            不小于 CTR_PARALLEL_THRESHOLD 时 workers > 1 才会生效，小数据只测 workers=1
+        min_time: 每项测量的最短累计时间（秒），小数据会重复多次
+        max_seconds: 按上一规模的速率预估单次耗时，超过该值的规模跳过（避免 pure 实现处理 64 MB）
+
+    Returns:
+        每个 (实现, 模式, 规模, 进程数) 一条记录
+    """
+    rng = np.random.default_rng(0)
+    records = []
+    for backend in backends:
+        aes = AES128(BENCH_KEY, backend=backend)
+        for mode in modes:
+            workers_list = worker_counts if mode != 'ecb' else [1]
+            rate = None  # 最近一次测量的速率（字节/秒，加解密取慢者），用于预估；各进程数之间共用
+            for workers in workers_list:
+                for size in sizes:
+                    record = {'backend': backend, 'mode': mode, 'size': size, 'workers': workers}
+                    if workers > 1 and size < CTR_PARALLEL_THRESHOLD:
+                        continue
+                    if rate is not None and size / rate > max_seconds:
+                        record['skipped'] = f'estimated {size / rate:.1f}s per call exceeds {max_seconds}s'
+                        records.append(record)
+                        continue
+                    data = rng.integers(0, 256, size, dtype=np.uint8).tobytes()
+                    enc_mbps, enc_time, enc_iters, ciphertext = _measure(
+                        lambda: _run(aes, mode, data, workers=workers), size, min_time)
+                    dec_mbps, dec_time, dec_iters, plaintext = _measure(
+                        lambda: _run(aes, mode, ciphertext, decrypt=True, workers=workers), size, min_time)
+                    rate = size / max(enc_time, dec_time)
+                    record.update({
+                        'encrypt_mbps': enc_mbps,
+                        'decrypt_mbps': dec_mbps,
+                        'encrypt_ms': enc_time * 1000,
+                        'decrypt_ms': dec_time * 1000,
+                        'iterations': [enc_iters, dec_iters],
+                        'roundtrip_ok': plaintext == data,
+                    })
+                    records.append(record)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help='明文字节数')
+    parser.add_argument('--workers', nargs='+', type=int, default=sorted({1, os.cpu_count() or 1}),
+                        help='CTR / GCM 模式的进程数')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每项测量的最短累计时间（秒）')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='预估单次耗时超过该值的规模跳过')
+    parser.add_argument('--conformance-only', action='store_true', help='只运行已知答案测试')
+    parser.add_argument('-o', '--output', help='JSON 输出文件（默认标准输出）')
+    args = parser.parse_args(argv)
+
+    # openssl 不可用时 AES128 会回退到 numpy，结果与 numpy 重复，直接剔除
+    backends = [b for b in args.backends if b != 'openssl' or openssl_available()]
+    conformance = check_conformance(backends)
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'openssl_available': openssl_available(),
+        },
+        'conformance': {
+            'passed': all(r['passed'] for r in conformance),
+            'results': conformance,
+        },
+    }
+    if not args.conformance_only:
+        report['throughput'] = benchmark(backends, args.modes, sorted(args.sizes), args.workers,
+                                         min_time=args.min_time, max_seconds=args.max_seconds)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0 if report['conformance']['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -49,18 +49,86 @@ export const api = {
   },
 
   // AES 加密/解密
-  aesEncrypt(plaintext, key) {
+  aesEncrypt(plaintext, key, { mode = 'ecb', nonce = null, aad = null, backend = null } = {}) {
     return request('/aes/encrypt', {
       method: 'POST',
-      body: JSON.stringify({ plaintext, key }),
+      body: JSON.stringify({
+        plaintext,
+        key,
+        mode,
+        ...(nonce ? { nonce } : {}),
+        ...(aad ? { aad } : {}),
+        ...(backend ? { backend } : {}),
+      }),
     })
   },
-  aesDecrypt(encrypted, key) {
+  aesDecrypt(encrypted, key, { mode = 'ecb', nonce = null, aad = null, backend = null } = {}) {
     return request('/aes/decrypt', {
       method: 'POST',
-      body: JSON.stringify({ encrypted, key }),
+      body: JSON.stringify({
+        encrypted,
+        key,
+        mode,
+        ...(nonce ? { nonce } : {}),
+        ...(aad ? { aad } : {}),
+        ...(backend ? { backend } : {}),
+      }),
+    })
+  },
+  aesBatch(key, items, { operation = 'encrypt', mode = 'ecb', nonces = null, aads = null, backend = null } = {}) {
+    return request('/aes/batch', {
+      method: 'POST',
+      body: JSON.stringify({
+        key,
+        items,
+        operation,
+        mode,
+        ...(nonces ? { nonces } : {}),
+        ...(aads ? { aads } : {}),
+        ...(backend ? { backend } : {}),
+      }),
     })
   },
+  // 二进制加解密：data 为 Blob / ArrayBuffer，返回 { blob, mode, backend, nonce }
+  async aesBinary(key, data, { operation = 'encrypt', mode = 'ecb', nonce = null, aad = null, backend = null } = {}) {
+    const params = new URLSearchParams({ mode })
+    if (nonce) params.set('nonce', nonce)
+    if (aad) params.set('aad', aad)
+    if (backend) params.set('backend', backend)
+    const response = await fetch(`${API_BASE_URL}/aes/binary/${operation}?${params}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/octet-stream', 'X-AES-Key': key },
+      body: data,
+    })
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}))
+      throw new Error(error.error || 'Request failed')
+    }
+    return {
+      blob: await response.blob(),
+      mode: response.headers.get('X-AES-Mode'),
+      backend: response.headers.get('X-AES-Backend'),
+      nonce: response.headers.get('X-AES-Nonce'),
+    }
+  },
+  aesFile(key, inputPath, outputPath, { operation = 'encrypt', mode = 'ecb', nonce = null, aad = null, backend = null } = {}) {
+    return request('/aes/file', {
+      method: 'POST',
+      body: JSON.stringify({
+        key,
+        operation,
+        input_path: inputPath,
+        output_path: outputPath,
+        mode,
+        ...(nonce ? { nonce } : {}),
+        ...(aad ? { aad } : {}),
+        ...(backend ? { backend } : {}),
+      }),
+    })
+  },
+  getAesCacheStats() {
+    return request('/aes/cache-stats')
+  },
 
   // 网络配置与生成
   getDefaultNetworkConfig() {
@@ -81,8 +149,34 @@ export const api = {
     })
   },
 
+  // 网络鲁棒性分析（桥、割点、连通分量）
+  analyzeRobustness(nodes, edges, render = false) {
+    return request('/network/robustness', {
+      method: 'POST',
+      body: JSON.stringify({ nodes, edges, render }),
+    })
+  },
+
+  // 蒙特卡洛连通可靠性估计
+  estimateReliability(nodes, edges, source, target, { failureProbability = 0.01, samples = 10000, minFlow = null, confidence = 0.95, seed = null } = {}) {
+    return request('/network/reliability', {
+      method: 'POST',
+      body: JSON.stringify({
+        nodes,
+        edges,
+        source,
+        target,
+        failure_probability: failureProbability,
+        samples,
+        min_flow: minFlow,
+        confidence,
+        seed,
+      }),
+    })
+  },
+
   // 交互式仿真 - 计算路径与分配
-  calculateTrafficPaths(nodes, edges, source, target, totalFlow, strategy = 'balanced', numPaths = 3, edgeUsage = []) {
+  calculateTrafficPaths(nodes, edges, source, target, totalFlow, strategy = 'balanced', numPaths = 3, edgeUsage = [], pathMode = 'penalty', ledgerId = null) {
     return request('/traffic/calculate-paths', {
       method: 'POST',
       body: JSON.stringify({
@@ -94,7 +188,111 @@ export const api = {
         strategy,
         num_paths: numPaths,
         edge_usage: edgeUsage,  // 传入当前链路使用情况
+        path_mode: pathMode,    // 'penalty' | 'edge-disjoint' | 'node-disjoint'
+        ...(ledgerId ? { ledger_id: ledgerId } : {}),  // 共享账本：分配结果提交到服务端
+      }),
+    })
+  },
+
+  // 交互式仿真 - 构建收缩层次索引（返回索引规模与构建耗时）
+  buildRoutingIndex(nodes, edges) {
+    return request('/traffic/routing-index', {
+      method: 'POST',
+      body: JSON.stringify({ nodes, edges }),
+    })
+  },
+
+  // 交互式仿真 - 流量矩阵批量分配
+  allocateTrafficMatrix(nodes, edges, demands, order = 'largest-first', strategy = 'balanced', numPaths = 3, edgeUsage = []) {
+    return request('/traffic/allocate-matrix', {
+      method: 'POST',
+      body: JSON.stringify({
+        nodes,
+        edges,
+        demands,
+        order,
+        strategy,
+        num_paths: numPaths,
+        edge_usage: edgeUsage,
       }),
     })
   },
+
+  // 交互式仿真 - 链路/节点失效分析
+  analyzeTrafficFailures(nodes, edges, flows, { includeNodes = true, includeDouble = false, maxScenarios = 200, strategy = 'balanced' } = {}) {
+    return request('/traffic/failure-analysis', {
+      method: 'POST',
+      body: JSON.stringify({
+        nodes,
+        edges,
+        flows,
+        include_nodes: includeNodes,
+        include_double: includeDouble,
+        max_scenarios: maxScenarios,
+        strategy,
+      }),
+    })
+  },
+
+  // 交互式仿真 - 最大并发多商品流（整个需求矩阵的一致缩放因子）
+  solveMulticommodity(nodes, edges, demands, { epsilon = 0.1 } = {}) {
+    return request('/traffic/multicommodity', {
+      method: 'POST',
+      body: JSON.stringify({ nodes, edges, demands, epsilon }),
+    })
+  },
+
+  // 交互式仿真 - 时间步进流量仿真
+  simulateTraffic(nodes, edges, { flows = null, random = null, tick = 1.0, strategy = 'balanced', numPaths = 3, ledgerId = null } = {}) {
+    return request('/traffic/simulate', {
+      method: 'POST',
+      body: JSON.stringify({
+        nodes,
+        edges,
+        ...(flows ? { flows } : { random }),
+        tick,
+        strategy,
+        num_paths: numPaths,
+        ...(ledgerId ? { ledger_id: ledgerId } : {}),
+      }),
+    })
+  },
+
+  // 交互式仿真 - 创建服务端链路使用账本
+  createUsageLedger(nodes, edges, edgeUsage = []) {
+    return request('/traffic/ledger', {
+      method: 'POST',
+      body: JSON.stringify({ nodes, edges, edge_usage: edgeUsage }),
+    })
+  },
+
+  // 交互式仿真 - 删除服务端链路使用账本
+  deleteUsageLedger(ledgerId) {
+    return request(`/traffic/ledger/${ledgerId}`, { method: 'DELETE' })
+  },
+
+  // 交互式仿真 - 账本利用率快照（逐链路利用率、直方图、Top-N 热点）
+  getLedgerUtilization(ledgerId, { top = 10, bins = 10, links = true, sinceVersion = null } = {}) {
+    const params = new URLSearchParams({ top, bins, links: links ? '1' : '0' })
+    if (sinceVersion !== null) {
+      params.set('since_version', sinceVersion)
+    }
+    return request(`/traffic/ledger/${ledgerId}/utilization?${params}`)
+  },
+
+  // 交互式仿真 - 在共享账本上原子预留路径带宽
+  reserveOnLedger(ledgerId, paths, flows, { enforceCapacity = true } = {}) {
+    return request(`/traffic/ledger/${ledgerId}/reserve`, {
+      method: 'POST',
+      body: JSON.stringify({ paths, flows, enforce_capacity: enforceCapacity }),
+    })
+  },
+
+  // 交互式仿真 - 释放共享账本上的预留
+  releaseOnLedger(ledgerId, reservationId) {
+    return request(`/traffic/ledger/${ledgerId}/release`, {
+      method: 'POST',
+      body: JSON.stringify({ reservation_id: reservationId }),
+    })
+  },
 }